@@ -0,0 +1,194 @@
+"""命令行批处理：对目录/通配符匹配的所有图片执行同一个操作（不启动界面）
+
+用法示例：
+    python batch_cli.py photos/ -o out/ --op gaussian --param radius=3
+    python batch_cli.py "data/**/*.jpg" -o edges/ --op canny --param canny_low=40 --param canny_high=120 -j 8
+    python batch_cli.py photos/ -o out/ --pipeline "gaussian:radius=2 | canny | close:kernel_size=5"
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# 与界面“加载图片”对话框一致的图片扩展名
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff")
+
+
+def collect_inputs(patterns):
+    """展开输入：目录（取其中所有图片）/ 通配符（支持**递归）/ 单个文件，去重后按路径排序"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for name in os.listdir(pattern):
+                path = os.path.join(pattern, name)
+                if os.path.isfile(path) and name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.add(path)
+        elif os.path.isfile(pattern):
+            paths.add(pattern)
+        else:
+            for path in glob.glob(pattern, recursive=True):
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.add(path)
+    return sorted(paths)
+
+
+def output_path(input_path, output_dir, fmt, suffix):
+    """输出文件路径：输出目录/原文件名+后缀.格式"""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, f"{stem}{suffix}.{fmt}")
+
+
+def _init_worker():
+    """工作进程初始化：OpenCV内部只用单线程，并行度由进程数决定，避免线程过量竞争；不记录分阶段耗时"""
+    import cv2
+    from timing import stage_profiler
+    cv2.setNumThreads(1)
+    stage_profiler.enabled = False
+
+
+def process_one(input_path, target_path, steps, options=None):
+    """工作进程：解码 → 依次执行各步骤 → 编码写出（与界面导出相同的编码，见exporter.write_image），
+    返回（读入字节数, 写出字节数, 耗时秒）
+    """
+    import numpy as np
+    import operations
+    from exporter import write_image
+    from image_io import read_image
+    begin = time.perf_counter()
+    image = read_image(input_path)
+    if image.mode not in ("L", "RGB", "RGBA"):
+        image = image.convert("RGB")
+    # 每张图片内容不同，中间结果不跨图片复用，各步骤直接执行（不经过流水线的缓存和哈希）
+    result = np.asarray(image)
+    for step in steps:
+        result = operations.apply_operation(step.op, result, **step.params)
+    write_image(result, target_path, options)
+    return os.path.getsize(input_path), os.path.getsize(target_path), time.perf_counter() - begin
+
+
+def run_batch(inputs, output_dir, steps, workers=None, prefetch=None, fmt="png", suffix="",
+              overwrite=False, out=sys.stdout, options=None):
+    """批处理主流程（steps为PipelineStep列表，单个操作即只有一步），返回统计信息dict
+
+    options为编码参数（exporter.ExportOptions，默认与界面导出相同）；
+    进程池大小默认等于CPU核数；同时在途（已提交未完成）的图片最多prefetch张，
+    解码/编码都在工作进程中进行，内存占用与输入总数无关
+    """
+    workers = workers or os.cpu_count() or 1
+    prefetch = max(workers, prefetch or workers * 2)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    skipped = 0
+    for path in inputs:
+        target = output_path(path, output_dir, fmt, suffix)
+        if not overwrite and os.path.exists(target):
+            skipped += 1
+            continue
+        jobs.append((path, target))
+
+    total = len(jobs)
+    done = failed = 0
+    bytes_in = bytes_out = 0
+    begin = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = {}
+        job_iter = iter(jobs)
+
+        def submit_next():
+            job = next(job_iter, None)
+            if job is not None:
+                pending[pool.submit(process_one, job[0], job[1], steps, options)] = job[0]
+            return job is not None
+
+        while len(pending) < prefetch and submit_next():
+            pass
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = pending.pop(future)
+                done += 1
+                try:
+                    size_in, size_out, seconds = future.result()
+                    bytes_in += size_in
+                    bytes_out += size_out
+                    print(f"[{done}/{total}] {path}  {seconds * 1000:.1f} ms", file=out)
+                except Exception as e:
+                    failed += 1
+                    print(f"[{done}/{total}] {path}  失败：{str(e)}", file=out)
+                submit_next()
+
+    elapsed = time.perf_counter() - begin
+    succeeded = total - failed
+    stats = {
+        "images": succeeded,
+        "failed": failed,
+        "skipped": skipped,
+        "seconds": elapsed,
+        "images_per_s": succeeded / elapsed if elapsed > 0 else 0.0,
+        "mb_per_s": bytes_in / 1e6 / elapsed if elapsed > 0 else 0.0,
+        "mb_in": bytes_in / 1e6,
+        "mb_out": bytes_out / 1e6,
+    }
+    print(
+        f"完成：{succeeded} 张成功，{failed} 张失败，{skipped} 张已存在跳过；"
+        f"耗时 {elapsed:.2f} s，{stats['images_per_s']:.1f} 张/s，"
+        f"读入 {stats['mb_per_s']:.1f} MB/s（共 {stats['mb_in']:.1f} MB，写出 {stats['mb_out']:.1f} MB）",
+        file=out
+    )
+    return stats
+
+
+def build_parser():
+    import operations
+    parser = argparse.ArgumentParser(description="图像批处理（与界面各Tab相同的计算）")
+    parser.add_argument("inputs", nargs="+", help="输入目录、文件或通配符（如 \"data/**/*.jpg\"）")
+    parser.add_argument("-o", "--output-dir", required=True, help="输出目录")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--op", choices=sorted(operations.OPERATIONS), help="要执行的操作")
+    action.add_argument("--pipeline", help="多步流水线，如 \"gaussian:radius=2 | canny | close:kernel_size=5\"")
+    parser.add_argument("--param", action="append", metavar="KEY=VALUE",
+                        help="--op的参数，可重复，如 --param kernel_size=7")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="工作进程数（默认CPU核数）")
+    parser.add_argument("--prefetch", type=int, default=None, help="同时在途的最大图片数（默认进程数×2）")
+    parser.add_argument("--format", default="png", help="输出格式扩展名（默认png）")
+    parser.add_argument("--png-compression", type=int, default=None, choices=range(10), metavar="0-9",
+                        help="PNG压缩级别（默认与界面导出相同）")
+    parser.add_argument("--jpeg-quality", type=int, default=None, choices=range(1, 101), metavar="1-100",
+                        help="JPEG质量（默认与界面导出相同）")
+    parser.add_argument("--suffix", default="", help="输出文件名后缀")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已存在的输出文件")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    from pipeline import PipelineStep, parse_params, parse_pipeline
+    try:
+        if args.pipeline:
+            steps = parse_pipeline(args.pipeline)
+            if not steps:
+                raise ValueError("流水线中没有步骤")
+        else:
+            steps = [PipelineStep(args.op, **parse_params(",".join(args.param or [])))]
+    except ValueError as e:
+        parser.error(str(e))
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("没有找到输入图片", file=sys.stderr)
+        return 1
+    from exporter import ExportOptions
+    options = ExportOptions()
+    if args.png_compression is not None:
+        options.png_compression = args.png_compression
+    if args.jpeg_quality is not None:
+        options.jpeg_quality = args.jpeg_quality
+    stats = run_batch(inputs, args.output_dir, steps, args.workers, args.prefetch,
+                      args.format.lstrip("."), args.suffix, args.overwrite, options=options)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""基准测试：对各Tab的每个操作和参数预设，在合成图像上测量耗时、吞吐量和峰值内存（不启动界面）
+
+PRESETS中的用例直接调用operations.apply_operation（界面各Tab、批处理、流水线共用的同一套函数）；
+ENGINE_PRESETS中的用例走界面处理大图时的路径（分块并行、中间结果缓存引擎），
+不包含界面线程上的QImage转换/显示。
+
+用法示例：
+    python benchmark.py --quick                              # 小图快速跑一遍
+    python benchmark.py -o bench.json                        # 完整测试（0.5~100MP），结果写入JSON
+    python benchmark.py --ops lpf canny --sizes 8 25 --baseline bench.json --threshold 0.15
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+# 默认图像尺寸（百万像素），宽高比4:3
+DEFAULT_SIZES = (0.5, 2, 8, 25, 100)
+QUICK_SIZES = (0.5, 2)
+MODES = ("gray", "rgb")
+
+# 操作 → 参数预设（默认值 + 界面滑块两端的典型取值）
+PRESETS = {
+    # 均值滤波耗时应与半径无关：半径1和50的结果可直接对比
+    "mean": [{"radius": 1}, {"radius": 5}, {"radius": 15}, {"radius": 50}],
+    "gaussian": [{"radius": 2}, {"radius": 10}, {"radius": 30}],
+    "sharpen": [{"amount": 1.0}, {"amount": 3.0}],
+    # 中值/双边滤波同样应随窗口增大保持平稳（常数时间直方图算法 / 降采样分层近似）
+    "median": [{"radius": 1}, {"radius": 5}, {"radius": 15}, {"radius": 50}],
+    "bilateral": [{"sigma_space": 3, "sigma_color": 30}, {"sigma_space": 10, "sigma_color": 30},
+                  {"sigma_space": 50, "sigma_color": 30}],
+    # color=True：彩色模式（RGB三通道批量处理，只在rgb模式下测试），与同一参数的灰度结果对比即可看出比逐通道三次快多少
+    "lpf": [{"cutoff": 10}, {"cutoff": 30}, {"cutoff": 100}, {"cutoff": 30, "color": True}],
+    "hpf": [{"cutoff": 30}],
+    "band_reject": [{"center_freq": 50, "bandwidth": 10}],
+    # 大核（半径100）的圆盘/十字/直线走快速算法，耗时应与小核同一数量级
+    "erode": [{"kernel_size": 3}, {"kernel_size": 9}, {"kernel_size": 21}, {"kernel_size": 201, "shape": "disk"},
+              {"kernel_size": 201, "shape": "cross"}, {"kernel_size": 201, "shape": "line", "angle": 30},
+              {"kernel_size": 9, "color": True}],
+    "dilate": [{"kernel_size": 3}, {"kernel_size": 9}, {"kernel_size": 21}, {"kernel_size": 201, "shape": "disk"}],
+    "open": [{"kernel_size": 5}, {"kernel_size": 21}, {"kernel_size": 101, "shape": "ellipse"}],
+    "close": [{"kernel_size": 5}, {"kernel_size": 21}, {"kernel_size": 101, "shape": "ellipse"}],
+    "gradient": [{"kernel_size": 5}, {"kernel_size": 21}],
+    "tophat": [{"kernel_size": 15}, {"kernel_size": 101, "shape": "disk"}],
+    "blackhat": [{"kernel_size": 15}],
+    "open_rec": [{"kernel_size": 15}],
+    "sobel_x": [{"sobel_ksize": 3}, {"sobel_ksize": 7}],
+    "sobel_y": [{"sobel_ksize": 3}, {"sobel_ksize": 7}],
+    "sobel_mag": [{"sobel_ksize": 3}, {"sobel_ksize": 7}, {"sobel_ksize": 3, "color": True}],
+    "sobel_dir": [{"sobel_ksize": 3}],
+    "canny": [{"canny_low": 50, "canny_high": 150}, {"canny_low": 10, "canny_high": 40}],
+    "canny_inc": [{"canny_low": 50, "canny_high": 150}, {"canny_low": 10, "canny_high": 40}],
+    "laplacian": [{"laplacian_ksize": 1}, {"laplacian_ksize": 5}],
+}
+
+# 界面大图路径 → 参数预设；名称为“路径:操作序列”（见engine_case），每次计时都从空缓存开始，
+# 按顺序执行一遍界面上的操作（如依次查看梯度→顶帽→黑帽），后面的操作应几乎不增加耗时。
+# 灰度模式输入灰度图；rgb模式只测color=True的预设（与界面的彩色模式相同，输入RGB图）
+ENGINE_PRESETS = {
+    "tiled:erode": [{"kernel_size": 21}, {"kernel_size": 201, "shape": "disk"}, {"kernel_size": 21, "color": True}],
+    "tiled:close": [{"kernel_size": 21}],
+    "tiled:sobel_mag": [{"sobel_ksize": 3}],
+    "tiled:laplacian": [{"laplacian_ksize": 5}],
+    "morph_engine:gradient,tophat,blackhat": [{"kernel_size": 15}, {"kernel_size": 101, "shape": "disk"},
+                                              {"kernel_size": 15, "color": True}],
+    "morph_engine:erode,open_rec": [{"kernel_size": 15}],
+    "edge_engine:sobel_x,sobel_y,sobel_mag,sobel_dir": [{"sobel_ksize": 3}, {"sobel_ksize": 3, "color": True}],
+    "edge_engine:auto_thresholds,canny_inc": [{"canny_low": 50, "canny_high": 150},
+                                              {"canny_low": 50, "canny_high": 150, "color": True}],
+}
+
+
+def synthetic_image(megapixels, mode, seed=0):
+    """生成确定性的合成图像（渐变 + 异或纹理 + 噪声，同时含平坦区域和大量边缘），uint8"""
+    import numpy as np
+    w = max(1, int(round((megapixels * 1e6 * 4 / 3) ** 0.5)))
+    h = max(1, int(round(megapixels * 1e6 / w)))
+    y = np.arange(h, dtype=np.uint32)[:, None]
+    x = np.arange(w, dtype=np.uint32)[None, :]
+    base = ((x ^ y) & 0x3F) * 2 + (x * 96 // w) + (y * 32 // h)
+    noise = np.random.default_rng(seed).integers(0, 16, size=(h, w), dtype=np.uint8)
+    gray = (base.astype(np.uint8) + noise).astype(np.uint8)
+    del base, noise
+    if mode == "gray":
+        return gray
+    # 三个通道各自平移，避免RGB三通道完全相同
+    return np.ascontiguousarray(np.dstack([gray, np.roll(gray, 7, axis=1), np.roll(gray, 13, axis=0)]))
+
+
+def engine_case(name, image, params):
+    """界面大图路径的用例 → 计时函数（见ENGINE_PRESETS）
+
+    tiled：tiling.tiled_operation（分块并行）；morph_engine：MorphologyEngine（分块并行 + 腐蚀/膨胀缓存）；
+    edge_engine：EdgeEngine（分块模糊/求导 + 导数缓存，auto_thresholds为自动阈值）
+    """
+    import operations
+    import tiling
+    from edge_engine import EdgeEngine
+    from morph_engine import MorphologyEngine
+    path, ops = name.split(":")
+    ops = ops.split(",")
+    # 与界面相同：彩色模式输入RGB图，否则输入缓存的灰度图（转换不计入耗时）
+    source = operations.to_rgb(image) if params.get("color") else operations.to_gray(image)
+    if path == "tiled":
+        return functools.partial(tiling.tiled_operation, ops[0], source, **params)
+    if path == "morph_engine":
+        def run():
+            engine = MorphologyEngine(tiling.tiled_operation)
+            for op in ops:
+                engine.run(0, source, op, **params)
+        return run
+    if path == "edge_engine":
+        # 边缘检测引擎按输入的通道数决定是否为彩色模式
+        edge_params = {k: v for k, v in params.items() if k != "color"}
+
+        def run():
+            engine = EdgeEngine()
+            for op in ops:
+                if op == "auto_thresholds":
+                    engine.suggest_thresholds(0, source)
+                else:
+                    engine.run(0, source, op, **edge_params)
+        return run
+    raise ValueError(f"未知的基准测试路径：{path}")
+
+
+def case_key(op, params, mode, megapixels):
+    """测试用例的唯一键（用于与基线对比）"""
+    param_text = ",".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return f"{op}[{param_text}]/{mode}/{megapixels}MP"
+
+
+def measure(func, repeat, warmup):
+    """执行func，返回（各次耗时秒列表, 峰值内存字节）
+
+    峰值内存用tracemalloc统计（Python对象和NumPy数组，包括OpenCV输出的数组；
+    不包括OpenCV内部的临时缓冲区），只在最后一次执行时开启，不影响计时
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - begin)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+def run_benchmarks(ops, sizes, modes, repeat=3, warmup=1, out=sys.stdout):
+    """逐个用例执行基准测试，返回结果dict（可直接写为JSON）"""
+    import operations
+    from timing import stage_profiler
+    stage_profiler.enabled = False  # 只测计算本身，不记录分阶段耗时
+    results = []
+    for megapixels in sizes:
+        for mode in modes:
+            image = synthetic_image(megapixels, mode)
+            for op in ops:
+                engine = op in ENGINE_PRESETS
+                for params in (ENGINE_PRESETS if engine else PRESETS)[op]:
+                    if mode == "gray" and params.get("color"):
+                        continue  # 灰度图上彩色模式与灰度用例完全相同，只会重复计时
+                    if engine and mode == "rgb" and not params.get("color"):
+                        continue  # 界面上非彩色模式时引擎的输入总是灰度图，与gray模式相同
+                    key = case_key(op, params, mode, megapixels)
+                    try:
+                        if engine:
+                            func = engine_case(op, image, params)
+                        else:
+                            func = functools.partial(operations.apply_operation, op, image, **params)
+                        times, peak = measure(func, repeat, warmup)
+                    except Exception as e:
+                        print(f"{key:<48} 失败：{str(e)}", file=out)
+                        results.append({"case": key, "op": op, "params": params, "mode": mode,
+                                        "megapixels": megapixels, "error": str(e)})
+                        continue
+                    median = statistics.median(times)
+                    actual_mp = image.shape[0] * image.shape[1] / 1e6
+                    result = {
+                        "case": key,
+                        "op": op,
+                        "params": params,
+                        "mode": mode,
+                        "megapixels": megapixels,
+                        "shape": list(image.shape),
+                        "seconds_min": min(times),
+                        "seconds_median": median,
+                        "mp_per_s": actual_mp / median if median > 0 else 0.0,
+                        "mb_per_s": image.nbytes / 1e6 / median if median > 0 else 0.0,
+                        "peak_mb": peak / 1e6,
+                    }
+                    results.append(result)
+                    print(f"{key:<48} {median * 1000:10.1f} ms  {result['mp_per_s']:8.1f} MP/s  "
+                          f"峰值 {result['peak_mb']:8.1f} MB", file=out)
+            image = None  # 生成下一张测试图前释放本张
+    return {"meta": environment_info(repeat, warmup), "results": results}
+
+
+def environment_info(repeat, warmup):
+    """运行环境（对比基线时提示两次测试的环境是否一致）"""
+    import numpy as np
+    import cv2
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "opencv_threads": cv2.getNumThreads(),
+        "cpu_count": os.cpu_count(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "warmup": warmup,
+    }
+
+
+def compare_with_baseline(report, baseline, threshold, out=sys.stdout):
+    """与基线逐个用例对比中位耗时，返回变慢超过threshold（比例）的用例列表"""
+    baseline_cases = {r["case"]: r for r in baseline.get("results", []) if "seconds_median" in r}
+    regressions = []
+    compared = 0
+    for result in report["results"]:
+        old = baseline_cases.get(result["case"])
+        if old is None or "seconds_median" not in result or old["seconds_median"] <= 0:
+            continue
+        compared += 1
+        ratio = result["seconds_median"] / old["seconds_median"]
+        if ratio > 1 + threshold:
+            regressions.append({"case": result["case"], "baseline_s": old["seconds_median"],
+                                "current_s": result["seconds_median"], "ratio": ratio})
+            print(f"变慢  {result['case']:<48} {old['seconds_median'] * 1000:9.1f} ms → "
+                  f"{result['seconds_median'] * 1000:9.1f} ms（×{ratio:.2f}）", file=out)
+        elif ratio < 1 - threshold:
+            print(f"变快  {result['case']:<48} {old['seconds_median'] * 1000:9.1f} ms → "
+                  f"{result['seconds_median'] * 1000:9.1f} ms（×{ratio:.2f}）", file=out)
+    old_meta = baseline.get("meta", {})
+    for key in ("cpu_count", "opencv", "numpy", "opencv_threads"):
+        if key in old_meta and old_meta[key] != report["meta"].get(key):
+            print(f"注意：基线的{key}为{old_meta[key]}，本次为{report['meta'].get(key)}，对比结果仅供参考", file=out)
+    print(f"共对比 {compared} 个用例，{len(regressions)} 个变慢超过 {threshold:.0%}", file=out)
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="图像处理操作基准测试（合成图像，不启动界面）")
+    parser.add_argument("--ops", nargs="+", choices=sorted(PRESETS) + sorted(ENGINE_PRESETS), default=None,
+                        help="要测试的操作或界面大图路径（默认全部）")
+    parser.add_argument("--sizes", nargs="+", type=float, default=None,
+                        help="图像尺寸，单位百万像素（默认 0.5 2 8 25 100）")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES), help="灰度/RGB（默认两者）")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例计时次数（取中位数，默认3）")
+    parser.add_argument("--warmup", type=int, default=1, help="计时前的预热次数（默认1）")
+    parser.add_argument("--quick", action="store_true", help="快速模式：只测0.5MP和2MP，每个用例计时1次")
+    parser.add_argument("-o", "--output", help="结果写入的JSON文件（可作为之后的基线）")
+    parser.add_argument("--baseline", help="基线JSON文件（之前用-o保存的结果）")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="中位耗时比基线慢超过该比例即视为性能回退（默认0.10）")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    repeat = 1 if args.quick else max(1, args.repeat)
+    ops = args.ops or list(PRESETS) + list(ENGINE_PRESETS)
+    report = run_benchmarks(ops, sizes, args.modes, repeat, max(0, args.warmup))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare_with_baseline(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+import operations
+import tiling
+
+
+class EdgeEngine:
+    """边缘检测中间结果缓存：同一图像只做一次高斯模糊，每种Sobel孔径只求一次dx/dy
+
+    Sobel X/Y、梯度幅值、梯度方向都由同一对导数得到（见operations.derived_edges），
+    在它们之间切换只需逐像素的取绝对值/求幅值，不再卷积。
+    增量Canny（canny_inc）用单独缓存的一对3×3导数（复制边界，与cv2.Canny相同；Sobel各视图保持默认边界），
+    调阈值时不重新模糊和求导；
+    自动阈值所需的局部极大值幅值直方图也按图像缓存。
+    tiled=True时模糊和求导分块并行（tiling.tiled_apply，结果与整图计算一致）。
+    """
+
+    def __init__(self, tiled=True, max_gradients=2):
+        self.tiled = tiled
+        self.max_gradients = max_gradients  # 最多缓存几种孔径的导数（大图一对导数就有数百MB）
+        self._image_key = None
+        self._blurred = None
+        self._gradients = OrderedDict()     # {Sobel孔径或operations.CANNY_GRADIENTS: (dx, dy)}（LRU）
+        self._histogram = None              # Canny局部极大值的幅值直方图
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """清空缓存（例如加载了新图片）"""
+        with self._lock:
+            self._image_key = None
+            self._blurred = None
+            self._gradients = OrderedDict()
+            self._histogram = None
+
+    def run(self, image_key, gray, op, **params):
+        """计算边缘检测op；image_key标识gray的内容（如图像版本号），换图后旧的中间结果全部作废"""
+        with self._lock:
+            if image_key != self._image_key:
+                self._image_key, self._blurred, self._gradients = image_key, None, OrderedDict()
+                self._histogram = None
+        return operations.derived_edges(
+            op, lambda: self.blurred(image_key, gray), lambda key: self.gradients(image_key, gray, key), **params
+        )
+
+    def blurred(self, image_key, gray):
+        """模糊后的灰度图（每张图只算一次）"""
+        with self._lock:
+            if image_key == self._image_key and self._blurred is not None:
+                return self._blurred
+        blurred = self._apply(gray, operations.edge_blur, 1)
+        with self._lock:
+            if image_key == self._image_key:
+                self._blurred = blurred
+        return blurred
+
+    def gradients(self, image_key, gray, key):
+        """导数(dx, dy)（每个键只算一次）；key为Sobel孔径或operations.CANNY_GRADIENTS（见operations.gradient_spec）"""
+        with self._lock:
+            if image_key == self._image_key and key in self._gradients:
+                self._gradients.move_to_end(key)
+                return self._gradients[key]
+        blurred = self.blurred(image_key, gray)
+        ksize, replicate = operations.gradient_spec(key)
+        halo = max(1, ksize // 2)
+        dx = self._apply(blurred, lambda tile: operations.sobel_derivative(tile, ksize, 1, replicate), halo)
+        dy = self._apply(blurred, lambda tile: operations.sobel_derivative(tile, ksize, 0, replicate), halo)
+        with self._lock:
+            if image_key == self._image_key:
+                self._gradients[key] = (dx, dy)
+                while len(self._gradients) > self.max_gradients:
+                    self._gradients.popitem(last=False)
+        return dx, dy
+
+    def suggest_thresholds(self, image_key, gray, method="median"):
+        """按局部极大值幅值直方图给出Canny的(低阈值, 高阈值)，method为"median"或"otsu"（见operations.canny_auto_thresholds）"""
+        with self._lock:
+            histogram = self._histogram if image_key == self._image_key else None
+        if histogram is None:
+            dx, dy = self.gradients(image_key, gray, operations.CANNY_GRADIENTS)
+            histogram = operations.canny_histogram(dx, dy)
+            with self._lock:
+                if image_key == self._image_key:
+                    self._histogram = histogram
+        return operations.canny_auto_thresholds(histogram, method)
+
+    def _apply(self, image, func, halo):
+        return tiling.tiled_apply(image, func, halo) if self.tiled else func(image)
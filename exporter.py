@@ -0,0 +1,115 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# cv2.imencode支持的扩展名（其余扩展名交给PIL保存）
+OPENCV_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+# 能保存透明通道的扩展名（其余格式写出RGBA图时先去掉透明通道）
+ALPHA_EXTENSIONS = (".png", ".bmp", ".tif", ".tiff", ".webp", ".gif", ".ico", ".tga")
+
+
+class ExportOptions:
+    """导出编码参数：PNG压缩级别（0~9，越大文件越小、编码越慢）、JPEG质量（1~100）"""
+
+    def __init__(self, png_compression=3, jpeg_quality=95):
+        self.png_compression = png_compression
+        self.jpeg_quality = jpeg_quality
+
+
+def write_image(array, path, options=None):
+    """把uint8数组（灰度/RGB/RGBA）按扩展名编码后写入文件（不支持透明通道的格式如JPEG写出RGB）
+
+    OpenCV编码时释放GIL，多个文件可在线程池中并行编码；先编码到内存再写文件，支持中文路径
+    """
+    options = options or ExportOptions()
+    ext = os.path.splitext(path)[1].lower()
+    if array.ndim == 3 and array.shape[2] == 4 and ext not in ALPHA_EXTENSIONS:
+        array = array[:, :, :3]
+    if ext not in OPENCV_EXTENSIONS:
+        from PIL import Image
+        Image.fromarray(array).save(path)
+        return
+    import cv2
+    if array.ndim == 3:
+        code = cv2.COLOR_RGBA2BGRA if array.shape[2] == 4 else cv2.COLOR_RGB2BGR
+        array = cv2.cvtColor(array, code)
+    params = []
+    if ext == ".png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, int(options.png_compression)]
+    elif ext in (".jpg", ".jpeg"):
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(options.jpeg_quality)]
+    ok, encoded = cv2.imencode(ext, array, params)
+    if not ok:
+        raise ValueError(f"无法编码为{ext}格式")
+    with open(path, "wb") as f:
+        f.write(encoded.tobytes())
+
+
+class ResultCache:
+    """最近一次全分辨率结果（每个Tab一个）：界面计算时存入，导出时键一致则直接复用，否则重新计算"""
+
+    def __init__(self):
+        self._key = None
+        self._array = None
+        self._lock = threading.Lock()
+
+    def store(self, key, array):
+        with self._lock:
+            self._key, self._array = key, array
+
+    def get(self, key):
+        """键一致时返回缓存的数组，否则返回None"""
+        with self._lock:
+            return self._array if self._key == key else None
+
+    def clear(self):
+        with self._lock:
+            self._key = self._array = None
+
+    def task(self, key, compute):
+        """返回无参函数：命中缓存时直接返回结果，否则调用compute()计算并存入缓存（可在工作线程执行）"""
+        def run():
+            array = self.get(key)
+            if array is None:
+                array = compute()
+                self.store(key, array)
+            return array
+        return run
+
+
+class ExportBatch:
+    """并行导出：每个任务（目标路径, 结果函数）在线程池中计算全分辨率结果并编码写出
+
+    每个任务结束（写出/出错/取消）时回调on_job_done(路径, 错误信息或None, 是否已取消)，
+    回调在执行该任务的线程中调用（取消时在调用cancel()的线程中），界面需自行转回界面线程（例如通过信号）；
+    cancel()取消尚未开始的任务
+    """
+
+    def __init__(self, jobs, options=None, workers=None, on_job_done=None):
+        self.total = len(jobs)
+        self.options = options or ExportOptions()
+        self.on_job_done = on_job_done
+        pool = ThreadPoolExecutor(max_workers=workers or min(self.total, os.cpu_count() or 1) or 1)
+        self._futures = []
+        for path, func in jobs:
+            future = pool.submit(self._export_one, path, func)
+            future.add_done_callback(lambda done, path=path: self._job_done(path, done))
+            self._futures.append(future)
+        pool.shutdown(wait=False)  # 已提交的任务照常执行，全部结束后线程自行退出
+
+    def _export_one(self, path, func):
+        write_image(func(), path, self.options)
+
+    def _job_done(self, path, future):
+        if self.on_job_done is None:
+            return
+        if future.cancelled():
+            self.on_job_done(path, None, True)
+            return
+        error = future.exception()
+        self.on_job_done(path, None if error is None else str(error), False)
+
+    def cancel(self):
+        """取消尚未开始的任务（正在编码的任务会写完）"""
+        for future in self._futures:
+            future.cancel()
@@ -0,0 +1,182 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class FrequencyMaskEngine:
+    """频域滤波器生成：按尺寸缓存径向距离网格，已生成的掩膜按LRU缓存
+
+    layout="shifted"   中心化布局（与fftshift后的频谱对应，零频在中心）
+    layout="unshifted" 未中心化布局（直接与DFT原始输出相乘，省去fftshift/ifftshift）
+    layout="ccs"       CCS打包布局（与实数DFT的打包输出逐元素相乘，掩膜只在半平面上计算）
+    """
+
+    LAYOUTS = ("shifted", "unshifted", "ccs")
+
+    def __init__(self, max_masks=8, max_bytes=512 * 1024 * 1024):
+        self.max_masks = max_masks      # LRU最多缓存的掩膜个数
+        self.max_bytes = max_bytes      # LRU最多占用的内存（大图单个掩膜就有上百MB）
+        self._grids = {}                # {(h, w, layout): 距离平方网格（float32）}
+        self._masks = OrderedDict()     # {(类型, h, w, layout, 参数...): 掩膜（float32）}
+        self._mask_bytes = 0
+        self._lock = threading.Lock()
+
+    # -------------------------- 距离网格 --------------------------
+    def squared_distance(self, h, w, layout="shifted"):
+        """到零频点的距离平方（float32），同一尺寸只计算一次
+
+        ccs布局返回的是半平面网格（h×(w//2+1)），其余布局为h×w
+        """
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"未知的掩膜布局：{layout}")
+        key = (h, w, layout)
+        with self._lock:
+            grid = self._grids.get(key)
+            if grid is None:
+                dy = self._axis_offsets(h, layout != "shifted")
+                if layout == "ccs":
+                    # 实数信号频谱共轭对称，只需非负列频率 0..w//2
+                    dx = np.arange(w // 2 + 1, dtype=np.float32)
+                else:
+                    dx = self._axis_offsets(w, layout != "shifted")
+                # 广播代替meshgrid，避免两张完整的float64坐标图
+                grid = dy[:, np.newaxis] ** 2 + dx[np.newaxis, :] ** 2
+                # 只保留当前尺寸的网格（换图后旧尺寸不再使用）
+                self._grids = {k: v for k, v in self._grids.items() if k[:2] == (h, w)}
+                self._grids[key] = grid
+            return grid
+
+    def _axis_offsets(self, n, unshifted):
+        """单个轴上各下标到零频点的有符号距离"""
+        index = np.arange(n, dtype=np.float32)
+        if not unshifted:
+            return index - n // 2
+        # fftshift等价于循环右移n//2，未中心化布局下标i对应中心化下标(i+n//2)%n
+        return (index + n // 2) % n - n // 2
+
+    # -------------------------- 掩膜生成（LRU缓存） --------------------------
+    def gaussian_lpf(self, h, w, cutoff, layout="shifted"):
+        """高斯低通滤波器"""
+        return self._get_mask(("lpf", h, w, layout, cutoff))
+
+    def gaussian_hpf(self, h, w, cutoff, layout="shifted"):
+        """高斯高通滤波器"""
+        return self._get_mask(("hpf", h, w, layout, cutoff))
+
+    def band_reject(self, h, w, center_freq, bandwidth, layout="shifted"):
+        """高斯带阻滤波器"""
+        return self._get_mask(("band_reject", h, w, layout, center_freq, bandwidth))
+
+    def _get_mask(self, key):
+        """LRU查找掩膜，未命中时生成"""
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        mask = self._build_mask(key)
+        with self._lock:
+            self._masks[key] = mask
+            self._mask_bytes += mask.nbytes
+            # 超出个数或内存上限时淘汰最久未使用的掩膜（至少保留刚生成的这一个）
+            while len(self._masks) > 1 and (len(self._masks) > self.max_masks or self._mask_bytes > self.max_bytes):
+                _, old = self._masks.popitem(last=False)
+                self._mask_bytes -= old.nbytes
+        return mask
+
+    def _build_mask(self, key):
+        """根据类型和参数生成掩膜"""
+        kind, h, w, layout = key[:4]
+        params = key[4:]
+        if kind == "hpf":
+            return 1 - self._get_mask(("lpf", h, w, layout) + params)
+        if layout == "ccs":
+            # 先在半平面上求值，再按CCS打包顺序展开成h×w
+            half = self._evaluate(kind, self.squared_distance(h, w, "ccs"), params)
+            return pack_half_mask(half, h, w)
+        return self._evaluate(kind, self.squared_distance(h, w, layout), params)
+
+    def _evaluate(self, kind, d2, params):
+        """在给定的距离平方网格上计算径向对称的滤波器"""
+        if kind == "lpf":
+            cutoff = params[0]
+            return np.exp(-d2 / np.float32(2 * cutoff ** 2))
+        if kind == "band_reject":
+            center_freq, bandwidth = params
+            distance = np.sqrt(d2)
+            sigma2 = np.float32(2 * (bandwidth / 2) ** 2)
+            band_pass = np.exp(-((distance - center_freq) ** 2) / sigma2) - \
+                        np.exp(-((distance + center_freq) ** 2) / sigma2)
+            return 1 - band_pass
+        raise ValueError(f"未知的滤波器类型：{kind}")
+
+
+# -------------------------- CCS打包格式工具 --------------------------
+# OpenCV对实数矩阵做DFT（不带DFT_COMPLEX_OUTPUT）时输出CCS打包格式：
+#   中间列按 (Re, Im) 成对存放第 k=1..(w-1)//2 列频率，每行对应频率行号本身；
+#   第0列（以及w为偶数时的最后一列，对应k=w/2）自身是共轭对称的一维频谱，
+#   按 Re(0), Re(1), Im(1), Re(2), Im(2), ... 的顺序沿行方向打包。
+def _packed_row_index(h):
+    """第0列/奈奎斯特列中，打包行号j对应的频率行号"""
+    return (np.arange(h) + 1) // 2
+
+
+def pack_half_mask(half, h, w):
+    """半平面实数掩膜（h×(w//2+1)，未中心化行序）→ CCS打包布局（h×w）"""
+    columns = (np.arange(w) + 1) // 2          # 打包列c对应的频率列k
+    packed = half[:, columns]
+    rows = _packed_row_index(h)
+    packed[:, 0] = half[rows, 0]
+    if w % 2 == 0:
+        packed[:, w - 1] = half[rows, w // 2]
+    return np.ascontiguousarray(packed, dtype=np.float32)
+
+
+def ccs_half_magnitude(packed):
+    """CCS打包频谱（h×w）→ 半平面幅度谱（h×(w//2+1)，未中心化行序）"""
+    h, w = packed.shape
+    half = np.empty((h, w // 2 + 1), dtype=np.float32)
+    # 中间列：成对的 (Re, Im)
+    k_max = (w - 1) // 2
+    re = packed[:, 1:2 * k_max:2]
+    im = packed[:, 2:2 * k_max + 1:2]
+    half[:, 1:k_max + 1] = np.sqrt(re * re + im * im)
+    # 第0列（w为偶数时还有奈奎斯特列）：沿行方向打包的一维共轭对称频谱
+    special = [(0, 0)] + ([(w - 1, w // 2)] if w % 2 == 0 else [])
+    for packed_col, k in special:
+        half[:, k] = _unpack_column_magnitude(packed[:, packed_col])
+    return half
+
+
+def _unpack_column_magnitude(column):
+    """沿行打包的一维共轭对称频谱 → 全部h个频率行的幅度"""
+    h = column.shape[0]
+    magnitude = np.empty(h, dtype=np.float32)
+    magnitude[0] = abs(column[0])
+    n_pairs = (h - 1) // 2
+    re = column[1:2 * n_pairs:2]
+    im = column[2:2 * n_pairs + 1:2]
+    pair_mag = np.sqrt(re * re + im * im)
+    magnitude[1:n_pairs + 1] = pair_mag
+    magnitude[h - n_pairs:] = pair_mag[::-1]      # 共轭对称：|F(h-r)| = |F(r)|
+    if h % 2 == 0:
+        magnitude[h // 2] = abs(column[h - 1])
+    return magnitude
+
+
+def half_to_display(half, h, w, display_size):
+    """半平面数据（h×(w//2+1)）→ 中心化的完整频谱，但只在显示分辨率上重建
+
+    display_size为（宽, 高）；按最近邻取样，缺失的右半平面用共轭对称补齐
+    """
+    dw, dh = display_size
+    # 显示像素 → 中心化坐标 → 未中心化坐标（fftshift为循环右移n//2）
+    ys = ((np.arange(dh) + 0.5) * h / dh).astype(np.int64)
+    xs = ((np.arange(dw) + 0.5) * w / dw).astype(np.int64)
+    ys = (ys - h // 2) % h
+    xs = (xs - w // 2) % w
+    # 右半平面 (x > w//2) 由 F(y, x) = conj(F(-y, -x)) 得到
+    mirrored = xs > w // 2
+    cols = np.where(mirrored, (w - xs) % w, xs)
+    rows = np.where(mirrored[np.newaxis, :], (-ys[:, np.newaxis]) % h, ys[:, np.newaxis])
+    return half[rows, cols[np.newaxis, :]]
@@ -0,0 +1,55 @@
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage
+
+# 通道数 → QImage格式（均为每通道8位）
+_FORMATS = {
+    1: QImage.Format_Grayscale8,
+    3: QImage.Format_RGB888,
+    4: QImage.Format_RGBA8888,
+}
+
+
+def ndarray_to_qimage(array):
+    """uint8数组直接包装成QImage（不复制像素，可在工作线程中调用）
+
+    支持H×W（灰度）、H×W×3（RGB）、H×W×4（RGBA）；行内像素需连续，行间距可以任意
+    （例如数组切片），按strides[0]作为每行字节数传给Qt。
+    QImage不拥有这块内存，返回的图像会持有数组的引用，图像存在期间数组不会被释放；
+    注意scaled()在尺寸不变时只返回共享同一块内存的浅拷贝（不持有数组的引用），
+    需要脱离原数组使用时请用scaled_qimage()或copy()。
+    """
+    if array.dtype != np.uint8:
+        raise ValueError(f"只支持uint8数组，实际为{array.dtype}")
+    if array.ndim == 3 and array.shape[2] == 1:
+        array = array[:, :, 0]
+    channels = 1 if array.ndim == 2 else array.shape[2]
+    if array.ndim not in (2, 3) or channels not in _FORMATS:
+        raise ValueError(f"不支持的数组形状：{array.shape}")
+    # 行内不连续（转置、隔列取样、通道切片等）时才复制一次
+    if array.strides[-1] != 1 or (array.ndim == 3 and array.strides[1] != channels) or array.strides[0] < 0:
+        array = np.ascontiguousarray(array)
+    h, w = array.shape[:2]
+    q_image = QImage(array.data, w, h, array.strides[0], _FORMATS[channels])
+    q_image._array = array  # 绑定数组生命周期
+    return q_image
+
+
+def scaled_qimage(q_image, width, height, smooth=False):
+    """按比例缩放到不超过（width, height），返回自带像素数据的QImage（不再依赖原数组）
+
+    尺寸不变时Qt的scaled()直接返回浅拷贝，仍指向原数组的内存（数组释放后读到的是已释放的内存），
+    这时显式复制一次
+    """
+    mode = Qt.SmoothTransformation if smooth else Qt.FastTransformation
+    scaled = q_image.scaled(width, height, Qt.KeepAspectRatio, mode)
+    if scaled.size() == q_image.size():
+        return q_image.copy()
+    return scaled
+
+
+def pil_to_ndarray(pil_image):
+    """PIL图像转uint8数组（L/RGB/RGBA直接转换，其他模式先转RGB）"""
+    if pil_image.mode not in ("L", "RGB", "RGBA"):
+        pil_image = pil_image.convert("RGB")
+    return np.asarray(pil_image)
@@ -0,0 +1,15 @@
+from PIL import Image
+
+
+def read_image(path):
+    """从文件读取图像（只解码一次，全程在内存中，不产生临时文件）
+
+    返回已解码的PIL图像：立即load()，避免多个工作线程同时触发PIL的懒加载，
+    同时释放文件句柄（Windows下不再占用原文件）
+    """
+    with Image.open(path) as image:
+        image.load()
+        if image.mode not in ("1", "L", "RGB", "RGBA"):
+            # 调色板/CMYK/16位等模式统一转为RGB，后续转换数组时不再重复处理
+            return image.convert("RGB")
+        return image.copy()
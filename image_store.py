@@ -0,0 +1,154 @@
+import threading
+import numpy as np
+from timing import stage_profiler
+
+
+class ImageStore:
+    """全局图像缓存：图片加载时只解码一次，各Tab按需获取RGB/BGR/灰度数组"""
+
+    def __init__(self):
+        self.version = 0                # 内容版本号（每载入一张新图+1，可作为下游缓存的键）
+        self._source = None             # 原始图像（PIL图像，或大图模式下内存映射的uint8数组）
+        self._views = {}                # 已生成的数组：{"rgb"/"bgr"/"gray": ndarray, ("proxy", ...): (ndarray, 缩放比例)}
+        self._pyramid = None            # 显示用的多分辨率金字塔（首次显示时创建）
+        self._lock = threading.RLock()  # 保护懒加载过程
+
+    def set_image(self, pil_image):
+        """载入新图像，作废之前生成的所有数组"""
+        with self._lock:
+            self._source = pil_image
+            self._views = {}
+            self._pyramid = None
+            self.version += 1
+
+    def set_array(self, array):
+        """载入uint8数组（H×W或H×W×3/4，可以是内存映射），RGB/灰度数组不再拷贝，直接作为对应格式使用"""
+        self.set_image(array)
+
+    def is_memmap(self):
+        """原图是否为内存映射的数组（大图模式）"""
+        return isinstance(self._source, np.memmap)
+
+    def has_image(self):
+        """是否已加载图像"""
+        return self._source is not None
+
+    def size(self):
+        """原图尺寸（宽, 高），不生成任何数组"""
+        with self._lock:
+            if self._source is None:
+                raise ValueError("尚未加载图片")
+            if isinstance(self._source, np.ndarray):
+                return self._source.shape[1], self._source.shape[0]
+            return self._source.size
+
+    def rgb(self):
+        """连续的uint8 RGB数组（H×W×3），调用方不得原地修改"""
+        return self._get_view("rgb")
+
+    def bgr(self):
+        """连续的uint8 BGR数组（H×W×3，OpenCV通道顺序），调用方不得原地修改"""
+        return self._get_view("bgr")
+
+    def gray(self):
+        """连续的uint8灰度数组（H×W），调用方不得原地修改"""
+        return self._get_view("gray")
+
+    def pyramid(self):
+        """原图的多分辨率金字塔（基于原图本身的通道格式，避免为显示而整幅转换）"""
+        from large_image import ImagePyramid
+        with self._lock:
+            if self._source is None:
+                raise ValueError("尚未加载图片")
+            if self._pyramid is None:
+                base = self._source if isinstance(self._source, np.ndarray) else self._get_view("rgb")
+                self._pyramid = ImagePyramid(base)
+            return self._pyramid
+
+    def display_level(self, max_w, max_h, name="rgb"):
+        """取不小于显示尺寸的最近一层金字塔并转为指定格式，供界面显示（代替整幅图缩放）"""
+        with stage_profiler.stage("pyramid"):
+            level = self.pyramid().level_for(max_w, max_h)
+        return self._convert(level, name)
+
+    def proxy(self, name, max_w, max_h):
+        """缩小到不超过（max_w, max_h）的代理图（交互预览用），返回（数组, 缩放比例）
+
+        缩放比例 = 代理图宽度 / 原图宽度；原图本身不超过该尺寸时直接返回原图（比例为1）；
+        内存映射的大图从金字塔中最近的一层缩小，不整幅读入
+        """
+        key = ("proxy", name, max_w, max_h)
+        with self._lock:
+            cached = self._views.get(key)
+            if cached is None:
+                if self.is_memmap():
+                    proxy, _ = self._build_proxy(self.display_level(max_w, max_h, name), max_w, max_h)
+                    cached = (proxy, proxy.shape[1] / self._source.shape[1])
+                else:
+                    cached = self._build_proxy(self._get_view(name), max_w, max_h)
+                self._views[key] = cached
+            return cached
+
+    def _build_proxy(self, source, max_w, max_h):
+        """按比例缩小（INTER_AREA，缩小时混叠最少）"""
+        import cv2
+        h, w = source.shape[:2]
+        scale = min(1.0, max_w / w, max_h / h)
+        if scale >= 1.0:
+            return source, 1.0
+        proxy_w, proxy_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        with stage_profiler.stage("proxy_resize"):
+            proxy = cv2.resize(source, (proxy_w, proxy_h), interpolation=cv2.INTER_AREA)
+        return proxy, proxy_w / w
+
+    def _get_view(self, name):
+        """取出缓存数组，不存在时现场生成"""
+        with self._lock:
+            if self._source is None:
+                raise ValueError("尚未加载图片")
+            view = self._views.get(name)
+            if view is None:
+                view = self._build_view(name)
+                self._views[name] = view
+            return view
+
+    def _build_view(self, name):
+        """生成指定格式的数组（灰度/BGR均由RGB直接转换，避免中间拷贝）"""
+        if isinstance(self._source, np.ndarray):
+            return self._convert(self._source, name)
+        import cv2
+        if name == "rgb":
+            with stage_profiler.stage("pil_to_numpy"):
+                rgb = np.array(self._source.convert("RGB"), dtype=np.uint8)
+                return np.ascontiguousarray(rgb)
+        if name == "bgr":
+            rgb = self._get_view("rgb")
+            with stage_profiler.stage("cvtColor"):
+                return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        if name == "gray":
+            rgb = self._get_view("rgb")
+            with stage_profiler.stage("cvtColor"):
+                return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        raise ValueError(f"未知的图像格式：{name}")
+
+    @staticmethod
+    def _convert(array, name):
+        """把uint8数组（灰度/RGB/RGBA）转为指定格式，格式已符合时原样返回（不拷贝）"""
+        with stage_profiler.stage("cvtColor"):
+            return ImageStore._convert_channels(array, name)
+
+    @staticmethod
+    def _convert_channels(array, name):
+        import cv2
+        channels = 1 if array.ndim == 2 else array.shape[2]
+        if name == "rgb":
+            if channels == 3:
+                return array
+            return cv2.cvtColor(array, cv2.COLOR_GRAY2RGB if channels == 1 else cv2.COLOR_RGBA2RGB)
+        if name == "bgr":
+            return cv2.cvtColor(array, {1: cv2.COLOR_GRAY2BGR, 3: cv2.COLOR_RGB2BGR, 4: cv2.COLOR_RGBA2BGR}[channels])
+        if name == "gray":
+            if channels == 1:
+                return array
+            return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY if channels == 3 else cv2.COLOR_RGBA2GRAY)
+        raise ValueError(f"未知的图像格式：{name}")
@@ -0,0 +1,138 @@
+import os
+import threading
+import numpy as np
+
+# 未压缩TIFF超过该大小时走内存映射（更小的文件直接解码更简单，也一样快）
+MEMMAP_MIN_BYTES = 64 * 1024 * 1024
+
+
+def open_memmap(path, raw_shape=None):
+    """以内存映射方式打开大图，返回只读uint8数组（H×W或H×W×3/4）；格式不支持时返回None
+
+    支持：NPY（uint8）；未压缩、按条带连续存放的8位TIFF（L/RGB/RGBA）；
+    无文件头的RAW需给出raw_shape（如(h, w, 3)）。打开时只读文件头，像素按需从磁盘读取。
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npy":
+        array = np.load(path, mmap_mode="r")
+        return array if _is_image_array(array) else None
+    if ext == ".raw":
+        if raw_shape is None:
+            return None
+        return np.memmap(path, dtype=np.uint8, mode="r", shape=tuple(raw_shape))
+    if ext in (".tif", ".tiff") and os.path.getsize(path) >= MEMMAP_MIN_BYTES:
+        return _tiff_memmap(path)
+    return None
+
+
+def _is_image_array(array):
+    """是否为可直接显示/处理的uint8图像数组"""
+    if array.dtype != np.uint8:
+        return False
+    return array.ndim == 2 or (array.ndim == 3 and array.shape[2] in (3, 4))
+
+
+def _tiff_memmap(path):
+    """未压缩TIFF：各条带首尾相接、行内无填充时，整幅像素就是文件中一段连续的字节"""
+    from PIL import Image
+    with Image.open(path) as image:
+        if image.format != "TIFF" or image.mode not in ("L", "RGB", "RGBA"):
+            return None
+        w, h = image.size
+        channels = len(image.mode)
+        row_bytes = w * channels
+        tiles = list(image.tile)
+        if not tiles:
+            return None
+        first_offset = tiles[0][2]
+        for decoder, extents, offset, args in tiles:
+            args = args if isinstance(args, tuple) else (args,)
+            stride = args[1] if len(args) > 1 else 0
+            x0, y0, x1, _ = extents
+            if decoder != "raw" or args[0] != image.mode or stride not in (0, row_bytes):
+                return None
+            if x0 != 0 or x1 != w or offset != first_offset + y0 * row_bytes:
+                return None
+    shape = (h, w) if channels == 1 else (h, w, channels)
+    return np.memmap(path, dtype=np.uint8, mode="r", offset=first_offset, shape=shape)
+
+
+class ImagePyramid:
+    """多分辨率金字塔：第k层为原图的1/2^k（2×2块平均），显示时取不小于显示尺寸的最近一层
+
+    内存中的图像按需逐层生成；内存映射的大图在完整金字塔生成前先用隔行隔列取样的
+    层显示（只读取1/2^k的行），完整金字塔可在后台调用build()生成，逐条带读取原图，内存占用有界。
+    """
+
+    STRIP_ROWS = 1024   # 由原图生成第1层时每次读取的行数（偶数）
+
+    def __init__(self, base, min_size=256):
+        self.base = base
+        self.min_size = min_size        # 最小一层的长边不小于该值
+        self.levels = {0: base}         # {层号: 2×2块平均得到的数组}
+        self._sampled = {}              # {层号: 隔行隔列取样得到的数组（完整层生成前临时使用）}
+        self._lock = threading.Lock()
+
+    @property
+    def lazy(self):
+        """原图是否为内存映射（逐层生成需要读遍整个文件）"""
+        return isinstance(self.base, np.memmap)
+
+    def level_index(self, max_w, max_h):
+        """不小于显示尺寸（max_w, max_h）的最小一层的层号"""
+        h, w = self.base.shape[:2]
+        level = 0
+        while (w >> (level + 1)) >= max_w and (h >> (level + 1)) >= max_h \
+                and max(w >> (level + 1), h >> (level + 1)) >= self.min_size:
+            level += 1
+        return level
+
+    def level_for(self, max_w, max_h):
+        """返回用于显示的层（内存映射且尚未生成时返回取样层，不阻塞读取整个文件）"""
+        level = self.level_index(max_w, max_h)
+        with self._lock:
+            if level in self.levels:
+                return self.levels[level]
+            if self.lazy:
+                sampled = self._sampled.get(level)
+                if sampled is None:
+                    step = 1 << level
+                    sampled = np.ascontiguousarray(self.base[::step, ::step])
+                    self._sampled[level] = sampled
+                return sampled
+        return self.build(level)
+
+    def build(self, max_level=None):
+        """逐层生成金字塔（直到max_level，或直到长边小于min_size），返回最后一层"""
+        h, w = self.base.shape[:2]
+        level = 0
+        while True:
+            next_h, next_w = h >> (level + 1), w >> (level + 1)
+            if max_level is not None and level >= max_level:
+                break
+            if max_level is None and max(next_h, next_w) < self.min_size:
+                break
+            if next_h == 0 or next_w == 0:
+                break
+            with self._lock:
+                built = self.levels.get(level + 1)
+            if built is None:
+                built = self._halve(self.levels[level])
+                with self._lock:
+                    self.levels[level + 1] = built
+                    self._sampled.pop(level + 1, None)
+            level += 1
+        return self.levels[level]
+
+    def _halve(self, source):
+        """2×2块平均缩小一半（奇数行/列的最后一行/列舍去）；按条带处理，内存映射时不会整幅读入"""
+        import cv2
+        h, w = source.shape[:2]
+        out_h, out_w = h // 2, w // 2
+        out = np.empty((out_h, out_w) + source.shape[2:], dtype=source.dtype)
+        for y in range(0, out_h * 2, self.STRIP_ROWS):
+            strip = source[y:min(y + self.STRIP_ROWS, out_h * 2), :out_w * 2]
+            out[y // 2:(y + strip.shape[0]) // 2] = cv2.resize(
+                strip, (out_w, strip.shape[0] // 2), interpolation=cv2.INTER_AREA
+            )
+        return out
@@ -1,9 +1,6 @@
+import timing  # 最先导入：以导入时刻作为启动计时起点
 import sys
-from main_window import MyMainWindow
-from PyQt5.QtWidgets import QApplication
+from main_window import run
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MyMainWindow()
-    window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(run())
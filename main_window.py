@@ -1,21 +1,26 @@
+from timing import startup_timer, stage_profiler  # 最先导入：作为启动计时起点
 import os
+import time
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget, 
                             QLabel, QPushButton, QRadioButton, QFileDialog, QMessageBox,
-                            QDialog)
-from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtCore import Qt, QUrl
+                            QDialog, QApplication, QComboBox, QSpinBox, QFormLayout, QProgressDialog)
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt, QUrl, pyqtSignal
 from PyQt5.QtGui import QDesktopServices
 from PIL import Image
 
-# 假设其他Tab的类定义已存在（Tab1Processor, Tab2SpatialFilter等）
-from tab1_process import Tab1Processor
-from tab2_spatial import Tab2SpatialFilter
-from tab3_frequency import Tab3FrequencyFilter
-from tab4_morphology import Tab4Morphology
-from tab5_edge_detection import Tab5EdgeDetection
-from tab7_about import Tab7About
+# 各Tab的模块在第一次切换到该Tab时才导入（见init_tab1~init_tab7），缩短启动时间
+from image_store import ImageStore
+from spectrum_service import SpectrumService
+from image_bridge import ndarray_to_qimage, pil_to_ndarray, scaled_qimage
+from exporter import ExportBatch, ExportOptions
 
 class MyMainWindow(QMainWindow):
+    # 导出时各页面的名称（按Tab序号，全部导出时作为子文件夹名）
+    EXPORT_TAB_NAMES = ["图像处理", "空间域滤波", "频域滤波", "形态学处理", "边缘检测", "流水线"]
+    profile_finished = pyqtSignal(object)  # 一次操作的分阶段耗时记录（可从工作线程发出，排队回到界面线程）
+    export_job_done = pyqtSignal(str, object, bool)  # 一张图片导出结束（路径, 错误信息或None, 是否已取消），从线程池发出
+
     def __init__(self):
         super(MyMainWindow, self).__init__()
         self.init_global_attrs()  # 初始化全局属性（跨Tab共享）
@@ -25,13 +30,15 @@ class MyMainWindow(QMainWindow):
     def init_global_attrs(self):
         """全局共享属性"""
         self.image = None          # 加载的图像（PIL格式）
-        self.image_path = None     # 图像路径
-        self.temp_png_path = "temp_process.png"  # 临时PNG路径
-        self.temp_files = [
-            "gray_image.png",
-            "frequency_image.png",
-            self.temp_png_path  # 假设临时PNG路径也需要清理
-        ]   
+        self.image_path = None     # 图像文件路径（只用于记录来源，图像数据全程在内存中）
+        self.image_store = ImageStore()  # 解码后的数组缓存（RGB/BGR/灰度，跨Tab共享）
+        self.spectrum_service = SpectrumService(self.image_store)  # 频谱缓存（Tab1/Tab3共用）
+        self.update_interval_ms = 30  # 拖动滑块时两次重算的最小间隔（毫秒）
+        self.preview_size = (800, 600)  # 交互预览（拖动滑块/悬停按钮）所用代理图的最大尺寸（宽x高）
+        self.export_options = ExportOptions()  # 导出编码参数（PNG压缩级别/JPEG质量）
+        self.export_format = "png"  # 导出全部页面时的文件格式
+        self.export_batch = None    # 进行中的导出
+        self.export_state = None    # 进行中导出的进度：{"target", "total", "finished", "saved", "failures", "cancelled", "progress", "begin"}
     def init_window_style(self):
         """设置窗口基础样式（全局渐变背景+Tab样式）"""
         self.setWindowTitle("Image Processing Tool")
@@ -112,28 +119,34 @@ class MyMainWindow(QMainWindow):
             }
         """)
         
-        # 创建Tab页面（移除了Tab6）
+        # 创建Tab页面
         self.tab1 = QWidget()
         self.tab2 = QWidget()
         self.tab3 = QWidget()
         self.tab4 = QWidget()
         self.tab5 = QWidget()
+        self.tab6 = QWidget()  # 流水线
         self.tab7 = QWidget()  # 关于页面
-        # 初始化各Tab内容
-        self.init_tab1()
-        self.init_tab2()
-        self.init_tab3()
-        self.init_tab4()
-        self.init_tab5()
-        self.init_tab7()
+        # 各Tab内容在第一次切换到该Tab时才构建（按Tab序号对应）
+        self.tab_builders = [
+            self.init_tab1, self.init_tab2, self.init_tab3,
+            self.init_tab4, self.init_tab5, self.init_tab6, self.init_tab7,
+        ]
+        self.built_tabs = {}  # {Tab序号: 已构建的Tab处理对象}
         # 添加Tab到容器
         self.tabs.addTab(self.tab1, "图像处理")
         self.tabs.addTab(self.tab2, "空间域滤波")
         self.tabs.addTab(self.tab3, "频域滤波")
         self.tabs.addTab(self.tab4, "形态学处理")
         self.tabs.addTab(self.tab5, "边缘检测")
+        self.tabs.addTab(self.tab6, "流水线")
         self.tabs.addTab(self.tab7, "关于")
+        self.tabs.currentChanged.connect(self.ensure_tab_built)
+        self.ensure_tab_built(self.tabs.currentIndex())  # 只构建启动时显示的Tab
         
+        # 状态栏：最近一次操作的分阶段耗时 + 导出耗时记录
+        self.init_status_bar()
+
         # 限制Tab内容区域最大宽度
         tab_container = QWidget()
         tab_container.setMaximumWidth(1900)
@@ -147,44 +160,133 @@ class MyMainWindow(QMainWindow):
         container.setLayout(main_layout)
         self.setCentralWidget(container)
 
+    def init_status_bar(self):
+        """状态栏显示最近一次操作的分阶段耗时，可把本次会话的耗时记录导出为Chrome/Perfetto跟踪文件"""
+        self.profile_label = QLabel("")
+        self.profile_label.setStyleSheet("font-size: 12px; color: #555555;")
+        self.trace_button = QPushButton("导出耗时记录")
+        self.trace_button.setStyleSheet("font-size: 12px; padding: 2px 8px;")
+        self.trace_button.clicked.connect(self.export_trace)
+        self.statusBar().addWidget(self.profile_label, 1)
+        self.statusBar().addPermanentWidget(self.trace_button)
+        self.profile_finished.connect(self.show_profile)
+        stage_profiler.add_listener(self.profile_finished.emit)
+        self.export_job_done.connect(self.on_export_job_done)
+
+    def show_profile(self, record):
+        """在状态栏显示一次操作的分阶段耗时（界面线程）"""
+        self.profile_label.setText(stage_profiler.format_run(record))
+
+    def export_trace(self):
+        """把本次会话的耗时记录保存为跟踪文件（chrome://tracing 或 ui.perfetto.dev 打开）"""
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出耗时记录", "trace.json", "跟踪文件 (*.json)")
+        if not file_path:
+            return
+        try:
+            stage_profiler.dump_trace(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, "失败", f"导出耗时记录失败：{str(e)}")
+
+    def ensure_tab_built(self, index):
+        """确保指定Tab已构建（第一次切换到该Tab时才导入模块、创建控件），返回该Tab的处理对象"""
+        if index < 0:
+            return None
+        if index not in self.built_tabs:
+            with startup_timer.measure(f"build_tab{index + 1}"):
+                tab = self.tab_builders[index]()
+            self.built_tabs[index] = tab
+            # 构建前已加载的图片：补同步原始图
+            if self.image_store.has_image() and hasattr(tab, "sync_original_image"):
+                tab.sync_original_image()
+        return self.built_tabs[index]
+
+    def sync_built_tabs(self):
+        """加载新图片后，同步所有已构建Tab的原始图（未构建的Tab在构建时再同步）"""
+        for tab in self.built_tabs.values():
+            if hasattr(tab, "sync_original_image"):
+                tab.sync_original_image()
+
+    def refresh_original_displays(self):
+        """刷新已构建Tab的原始图显示（大图的金字塔在后台生成完成后调用，不重新计算结果）"""
+        for tab in self.built_tabs.values():
+            if hasattr(tab, "show_original_image"):
+                tab.show_original_image()
+
     def init_tab1(self):
         """初始化Tab1：基础图像处理"""
+        from tab1_process import Tab1Processor
         self.tab1_processor = Tab1Processor(self)
         self.tab1.setLayout(self.tab1_processor.get_layout())
+        return self.tab1_processor
 
     def init_tab2(self):
         """初始化Tab2：空间域滤波"""
+        from tab2_spatial import Tab2SpatialFilter
         self.tab2_filter = Tab2SpatialFilter(self)
         self.tab2.setLayout(self.tab2_filter.get_layout())
+        return self.tab2_filter
 
     def init_tab3(self):
         """初始化Tab3：频域滤波"""
+        from tab3_frequency import Tab3FrequencyFilter
         self.tab3_filter = Tab3FrequencyFilter(self)
         self.tab3.setLayout(self.tab3_filter.get_layout())
+        return self.tab3_filter
 
     def init_tab4(self):
         """初始化Tab4：形态学处理"""
+        from tab4_morphology import Tab4Morphology
         self.tab4_filter = Tab4Morphology(self)
         self.tab4.setLayout(self.tab4_filter.get_layout())
+        return self.tab4_filter
 
     def init_tab5(self):
         """初始化Tab5：边缘检测"""
+        from tab5_edge_detection import Tab5EdgeDetection
         self.tab5_filter = Tab5EdgeDetection(self)
         self.tab5.setLayout(self.tab5_filter.get_layout())
+        return self.tab5_filter
     
+    def init_tab6(self):
+        """初始化Tab6：操作流水线"""
+        from tab6_pipeline import Tab6Pipeline
+        self.tab6_pipeline = Tab6Pipeline(self)
+        self.tab6.setLayout(self.tab6_pipeline.get_layout())
+        return self.tab6_pipeline
+
     def init_tab7(self):
         """初始化Tab7：关于页面"""
+        from tab7_about import Tab7About
         self.tab7_processor = Tab7About()
         self.tab7.setLayout(self.tab7_processor.get_layout())
+        return self.tab7_processor
 
     # 全局通用方法
     def pil_to_qimage(self, pil_image):
-        """PIL图像转QImage（全局通用）"""
-        pil_image = pil_image.convert("RGB")
-        data = pil_image.tobytes("raw", "RGB")
-        qim = QImage(data, pil_image.width, pil_image.height, 
-                     pil_image.width * 3, QImage.Format_RGB888)
-        return qim
+        """PIL图像转QImage（全局通用，灰度图保持单通道）"""
+        return ndarray_to_qimage(pil_to_ndarray(pil_image))
+
+    def array_to_qimage(self, array):
+        """uint8数组（灰度/RGB/RGBA）直接包装成QImage，不复制像素"""
+        return ndarray_to_qimage(array)
+
+    def scaled_qimage(self, image, width, height, smooth=False):
+        """图像（uint8数组或PIL图像）转QImage并按比例缩放到显示尺寸（只用QImage，可在工作线程中调用）
+
+        返回的QImage自带像素数据，原数组之后被释放也不受影响（见image_bridge.scaled_qimage）
+        """
+        with stage_profiler.stage("to_qimage"):
+            q_image = self.pil_to_qimage(image) if isinstance(image, Image.Image) else ndarray_to_qimage(image)
+        with stage_profiler.stage("scale"):
+            return scaled_qimage(q_image, width, height, smooth)
+
+    def create_busy_label(self):
+        """创建“处理中”提示标签（默认隐藏，后台任务执行时显示）"""
+        label = QLabel("处理中，请稍候…")
+        label.setAlignment(Qt.AlignCenter)
+        label.setStyleSheet("color: #e67e22; font-size: 13px;")
+        label.setVisible(False)
+        return label
 
     def set_button_style(self, button):
         """设置按钮默认样式"""
@@ -214,10 +316,10 @@ class MyMainWindow(QMainWindow):
 
     # 导出图片功能
     def show_export_dialog(self):
-        """显示导出选项对话框"""
+        """显示导出选项对话框（范围 + 格式 + 压缩参数）"""
         dialog = QDialog(self)
         dialog.setWindowTitle("导出图片")
-        dialog.setGeometry(300, 300, 300, 150)
+        dialog.setGeometry(300, 300, 320, 260)
         
         layout = QVBoxLayout(dialog)
         
@@ -229,6 +331,23 @@ class MyMainWindow(QMainWindow):
         layout.addWidget(QLabel("请选择导出范围："))
         layout.addWidget(self.current_tab_radio)
         layout.addWidget(self.all_tabs_radio)
+
+        # 编码参数（导出全部页面时的格式；仅当前页面时按文件扩展名决定格式）
+        self.export_format_combo = QComboBox()
+        self.export_format_combo.addItem("PNG", "png")
+        self.export_format_combo.addItem("JPEG", "jpg")
+        self.export_format_combo.setCurrentIndex(self.export_format_combo.findData(self.export_format))
+        self.png_compression_spin = QSpinBox()
+        self.png_compression_spin.setRange(0, 9)
+        self.png_compression_spin.setValue(self.export_options.png_compression)
+        self.jpeg_quality_spin = QSpinBox()
+        self.jpeg_quality_spin.setRange(1, 100)
+        self.jpeg_quality_spin.setValue(self.export_options.jpeg_quality)
+        form = QFormLayout()
+        form.addRow("全部页面导出格式：", self.export_format_combo)
+        form.addRow("PNG压缩级别（0~9）：", self.png_compression_spin)
+        form.addRow("JPEG质量（1~100）：", self.jpeg_quality_spin)
+        layout.addLayout(form)
         
         # 按钮区
         btn_layout = QHBoxLayout()
@@ -245,10 +364,12 @@ class MyMainWindow(QMainWindow):
         dialog.exec_()
 
     def export_images(self, dialog):
-        """导出选中范围的图片"""
-        # 获取导出范围
+        """导出选中范围的图片（全分辨率结果，线程池并行编码）"""
+        # 获取导出范围和编码参数
         export_all = self.all_tabs_radio.isChecked()
         current_index = self.tabs.currentIndex()
+        self.export_format = self.export_format_combo.currentData()
+        self.export_options = ExportOptions(self.png_compression_spin.value(), self.jpeg_quality_spin.value())
         dialog.close()
         
         # 获取保存路径
@@ -257,25 +378,14 @@ class MyMainWindow(QMainWindow):
             save_path = QFileDialog.getExistingDirectory(self, "选择保存文件夹", "")
             if not save_path:
                 return
-                
-            # 为每个页面创建子文件夹
-            success = True
-            tab_names = ["图像处理", "空间域滤波", "频域滤波", "形态学处理", "边缘检测"]
-            
-            for i in range(5):
-                tab_folder = os.path.join(save_path, tab_names[i])
-                os.makedirs(tab_folder, exist_ok=True)
-                
-                # 导出对应页面的图片
-                if not self.export_tab_images(i, tab_folder):
-                    success = False
-                    break
-                    
-            if success:
-                QMessageBox.information(self, "成功", f"所有页面图片已导出到:\n{save_path}")
-            else:
-                QMessageBox.warning(self, "失败", "部分图片导出失败")
-                
+            # 每个有结果的页面一个子文件夹（从未打开过或尚未执行操作的页面跳过）
+            jobs = []
+            for i, tab_name in enumerate(self.EXPORT_TAB_NAMES):
+                tab_jobs = self.export_jobs(i, os.path.join(save_path, tab_name), ext=f".{self.export_format}")
+                if tab_jobs:
+                    os.makedirs(os.path.join(save_path, tab_name), exist_ok=True)
+                    jobs.extend(tab_jobs)
+            target = save_path
         else:
             # 导出当前页面，选择文件路径
             tab_name = self.tabs.tabText(current_index)
@@ -284,74 +394,114 @@ class MyMainWindow(QMainWindow):
             file_path, _ = QFileDialog.getSaveFileName(
                 self, "保存图片", default_filename, "PNG图片 (*.png);;JPEG图片 (*.jpg);;所有文件 (*)"
             )
-            
-            if file_path:
-                if self.export_tab_images(current_index, os.path.dirname(file_path), os.path.basename(file_path)):
-                    QMessageBox.information(self, "成功", f"图片已保存到:\n{file_path}")
-                else:
-                    QMessageBox.warning(self, "失败", "图片导出失败")
-
-    def export_tab_images(self, tab_index, save_dir, filename=None):
-        """导出指定页面的图片"""
-        try:
-            if tab_index == 0:  # 图像处理
-                # 导出灰度图和频谱图
-                if filename:
-                    # 只导出当前结果
-                    self._export_label_image(self.tab1_processor.gray_image_label, save_dir, filename)
-                else:
-                    self._export_label_image(self.tab1_processor.gray_image_label, save_dir, "灰度图.png")
-                    self._export_label_image(self.tab1_processor.frequency_image_label, save_dir, "频谱图.png")
-                    
-            elif tab_index == 1:  # 空间域滤波
-                self._export_label_image(self.tab2_filter.filtered_image_label, save_dir, filename or "空间域滤波结果.png")
-                
-            elif tab_index == 2:  # 频域滤波
-                self._export_label_image(self.tab3_filter.freq_filtered_image_label, save_dir, filename or "频域滤波结果.png")
-                
-            elif tab_index == 3:  # 形态学处理
-                self._export_label_image(self.tab4_filter.morph_result_label, save_dir, filename or "形态学处理结果.png")
-                
-            elif tab_index == 4:  # 边缘检测
-                self._export_label_image(self.tab5_filter.edge_result_label, save_dir, filename or "边缘检测结果.png")
-                
-            return True
-        except Exception as e:
-            print(f"导出图片失败: {str(e)}")
-            return False
-
-    def _export_label_image(self, label, save_dir, filename):
-        """导出标签中显示的图片"""
-        pixmap = label.pixmap()
-        if pixmap and not pixmap.isNull():
-            # 保存QPixmap到目标路径
-            target_path = os.path.join(save_dir, filename)
-            if pixmap.save(target_path):
-                return True
+            if not file_path:
+                return
+            jobs = self.export_jobs(current_index, os.path.dirname(file_path), os.path.basename(file_path))
+            target = file_path
+
+        if not jobs:
+            QMessageBox.warning(self, "失败", "没有可导出的图片")
+            return
+        self.start_export(jobs, target)
+
+    def export_jobs(self, tab_index, save_dir, filename=None, ext=".png"):
+        """指定页面的导出任务[(目标路径, 全分辨率结果函数)]；filename为None时按页面内容命名"""
+        tab = self.built_tabs.get(tab_index)  # 从未打开过的页面没有结果
+        if tab is None:
+            return []
+        if tab_index == 0:  # 图像处理：灰度图和频谱图（只导出当前结果时只导出灰度图）
+            tasks = tab.export_tasks()
+            if filename:
+                return [(os.path.join(save_dir, filename), tasks["灰度图"])] if "灰度图" in tasks else []
+            return [(os.path.join(save_dir, f"{name}{ext}"), task) for name, task in tasks.items()]
+        if not hasattr(tab, "export_task"):
+            return []
+        task = tab.export_task()
+        if task is None:
+            return []
+        return [(os.path.join(save_dir, filename or f"{self.EXPORT_TAB_NAMES[tab_index]}结果{ext}"), task)]
+
+    def start_export(self, jobs, target):
+        """在线程池中计算（未缓存时）并编码各结果，界面不阻塞；每张导出结束时由信号回到界面线程刷新进度"""
+        progress = QProgressDialog("正在导出图片…", "取消", 0, len(jobs), self)
+        progress.setWindowTitle("导出图片")
+        # 非模态：模态进度框的setValue()会在内部处理事件（重入），导出期间改为禁用导出按钮
+        progress.setWindowModality(Qt.NonModal)
+        progress.setMinimumDuration(300)
+        progress.canceled.connect(self.cancel_export)
+        self.export_button.setEnabled(False)
+        self.set_image_loading_enabled(False)
+        self.export_state = {"target": target, "total": len(jobs), "finished": 0, "saved": 0, "failures": [],
+                             "cancelled": False, "progress": progress, "begin": time.perf_counter()}
+        self.export_batch = ExportBatch(jobs, self.export_options, on_job_done=self.export_job_done.emit)
+
+    def on_export_job_done(self, path, error, cancelled):
+        """一张图片导出结束（界面线程）：刷新进度，全部结束后汇报结果"""
+        state = self.export_state
+        if state is None:
+            return
+        state["finished"] += 1
+        if not cancelled:
+            if error is None:
+                state["saved"] += 1
             else:
-                raise Exception(f"无法保存图片到 {target_path}")
+                state["failures"].append((path, error))
+        state["progress"].setValue(state["finished"])
+        if state["finished"] == state["total"]:
+            self.finish_export()
+
+    def exporting(self):
+        """是否有导出正在进行：导出任务执行时才读取当前图像（及其缓存），期间不能加载新图片"""
+        return self.export_state is not None
+
+    def set_image_loading_enabled(self, enabled):
+        """启用/禁用“加载图片”按钮（Tab1尚未构建时，构建时按exporting()设置）"""
+        tab1 = self.built_tabs.get(0)
+        if tab1 is not None:
+            tab1.load_button.setEnabled(enabled)
+
+    def cancel_export(self):
+        """取消尚未开始的导出任务（正在编码的会写完）"""
+        if self.export_state is None or self.export_state["cancelled"]:
+            return
+        self.export_state["cancelled"] = True
+        self.export_batch.cancel()
+
+    def finish_export(self):
+        """全部导出结束：记录总耗时（只记起止时间，期间其他页面的操作各自单独统计），显示结果"""
+        state = self.export_state
+        self.export_state = None
+        self.export_batch = None
+        stage_profiler.add_run("导出图片", state["begin"], time.perf_counter())
+        state["progress"].close()
+        self.export_button.setEnabled(True)
+        self.set_image_loading_enabled(True)
+        saved, failures = state["saved"], state["failures"]
+        if failures:
+            details = "\n".join(f"{os.path.basename(path)}：{error}" for path, error in failures[:5])
+            QMessageBox.warning(self, "失败", f"已导出{saved}张，{len(failures)}张导出失败:\n{details}")
+        elif state["cancelled"]:
+            QMessageBox.information(self, "已取消", f"已导出{saved}张，其余已取消")
         else:
-            raise Exception(f"没有可导出的图片")
-        
-    def clean_temp_files(self):
-        """清理程序运行过程中生成的临时文件"""
-        for file_path in self.temp_files:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    print(f"已删除临时文件: {file_path}")
-            except Exception as e:
-                print(f"删除临时文件 {file_path} 失败: {str(e)}")
-    
-    def closeEvent(self, event):
-        """窗口关闭时执行清理操作"""
-        self.clean_temp_files()
-        event.accept()  # 接受关闭事件
+            QMessageBox.information(self, "成功", f"图片已导出到:\n{state['target']}")
 
-if __name__ == "__main__":
+def run():
+    """启动程序（main.py与直接运行本文件共用），记录启动各阶段耗时"""
     import sys
-    from PyQt5.QtWidgets import QApplication
+    startup_timer.mark("imports")
     app = QApplication(sys.argv)
     window = MyMainWindow()
+    startup_timer.mark("window_created")
+    startup_timer.watch_first_paint(window)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    code = app.exec_()
+    # 设置了环境变量时，退出前把本次会话的分阶段耗时写入跟踪文件
+    trace_path = os.environ.get("IMG_TOOL_TRACE")
+    if trace_path:
+        stage_profiler.dump_trace(trace_path)
+    return code
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(run())
\ No newline at end of file
@@ -0,0 +1,54 @@
+import threading
+import operations
+
+
+class MorphologyEngine:
+    """形态学中间结果缓存：同一图像、同一结构元素下的腐蚀/膨胀/开/闭运算结果只计算一次
+
+    梯度、顶帽、黑帽、重建开运算都由这几个基本结果组合而成（见operations.derived_morphology），
+    依次查看梯度→顶帽→黑帽时，腐蚀和膨胀直接复用，开/闭运算也只需在已缓存的腐蚀/膨胀上再做一次。
+    apply(name, gray, **params)执行单个基本操作，默认整图计算，可传入tiling.tiled_operation分块并行。
+    """
+
+    def __init__(self, apply=None):
+        self.apply = apply or operations.apply_operation
+        self._key = None        # (图像标识, 结构元素参数)
+        self._results = {}      # {操作名: 结果数组}（基本操作 + 重建开运算）
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """清空缓存（例如加载了新图片）"""
+        with self._lock:
+            self._key = None
+            self._results = {}
+
+    def run(self, image_key, gray, op, **params):
+        """计算形态学操作op；image_key标识gray的内容（如图像版本号），与params一起决定缓存是否可用"""
+        key = (image_key, tuple(sorted(params.items())))
+        with self._lock:
+            if key != self._key:
+                # 换图或换结构元素后旧的中间结果不再需要（大图每个结果都很大，不保留多组）
+                self._key, self._results = key, {}
+        if op == "open_rec":
+            return self._cached(key, op, lambda: operations.derived_morphology(
+                op, gray, lambda name: self._base(key, gray, name, params)))
+        return operations.derived_morphology(op, gray, lambda name: self._base(key, gray, name, params))
+
+    def _base(self, key, gray, name, params):
+        """基本操作：开运算 = 对缓存的腐蚀结果做膨胀，闭运算 = 对缓存的膨胀结果做腐蚀"""
+        if name == "open":
+            return self._cached(key, name, lambda: self.apply("dilate", self._base(key, gray, "erode", params), **params))
+        if name == "close":
+            return self._cached(key, name, lambda: self.apply("erode", self._base(key, gray, "dilate", params), **params))
+        return self._cached(key, name, lambda: self.apply(name, gray, **params))
+
+    def _cached(self, key, name, compute):
+        """命中缓存直接返回，否则计算并存入（计算在锁外进行；期间换了图像/参数则不存入）"""
+        with self._lock:
+            if key == self._key and name in self._results:
+                return self._results[name]
+        result = compute()
+        with self._lock:
+            if key == self._key:
+                self._results[name] = result
+        return result
@@ -0,0 +1,801 @@
+# 各Tab的纯计算函数（不依赖任何界面控件，可在工作线程中调用）
+import numpy as np
+from freq_masks import FrequencyMaskEngine
+from spectrum_service import for_each_channel, packed_display_log_magnitude, padded_dft, shifted_log_magnitude
+from timing import stage_profiler
+
+# 未指定掩膜缓存时使用的全局默认实例
+default_mask_engine = FrequencyMaskEngine()
+
+
+# -------------------------- 空间域滤波（Tab2） --------------------------
+# 各滤波的默认参数：均值/中值滤波半径（窗口边长2r+1）、高斯滤波半径（标准差）、锐化强度、
+# 双边滤波的空间标准差和灰度标准差
+SPATIAL_DEFAULTS = {
+    "mean": {"radius": 5},
+    "gaussian": {"radius": 2},
+    "sharpen": {"amount": 1.0},
+    "median": {"radius": 2},
+    "bilateral": {"sigma_space": 5, "sigma_color": 30},
+}
+# 高斯标准差超过该值时改用三次盒式滤波近似（耗时与半径无关，误差约为灰度值的1%以内）
+GAUSSIAN_BOX_SIGMA = 8
+# 双边滤波：空间标准差为该值的k倍（k≥2）时在缩小为1/k的图像上计算（缩小后的标准差不超过2倍该值）
+BILATERAL_DOWNSAMPLE_SIGMA = 4
+# 双边滤波的灰度分层数上限（层间距约等于灰度标准差）
+BILATERAL_MAX_LEVELS = 24
+
+
+def gaussian_box_sizes(sigma, passes=3):
+    """用passes次盒式滤波近似标准差为sigma的高斯滤波时，各次的（奇数）窗口边长"""
+    ideal = np.sqrt(12.0 * sigma * sigma / passes + 1)
+    lower = int(np.floor(ideal))
+    if lower % 2 == 0:
+        lower -= 1
+    upper = lower + 2
+    # 前count次用较小窗口、其余用较大窗口，使总方差等于sigma²
+    count = int(round((12.0 * sigma * sigma - passes * lower * lower - 4 * passes * lower - 3 * passes)
+                      / (-4 * lower - 4)))
+    return [lower if i < count else upper for i in range(passes)]
+
+
+def box_blur(image, radius):
+    """均值滤波：窗口(2r+1)×(2r+1)，OpenCV盒式滤波按行列滑动求和，耗时与半径无关"""
+    import cv2
+    radius = int(round(radius))
+    if radius < 1:
+        return image
+    size = 2 * radius + 1
+    return cv2.blur(image, (size, size), borderType=cv2.BORDER_REPLICATE)
+
+
+def gaussian_blur(image, radius):
+    """高斯滤波（radius即标准差，与PIL的GaussianBlur相同）：小半径直接卷积，大半径用三次盒式滤波近似（耗时不随半径增长）"""
+    import cv2
+    if radius <= 0:
+        return image
+    if radius <= GAUSSIAN_BOX_SIGMA:
+        return cv2.GaussianBlur(image, (0, 0), sigmaX=radius, borderType=cv2.BORDER_REPLICATE)
+    result = image
+    for size in gaussian_box_sizes(radius):
+        result = cv2.blur(result, (size, size), borderType=cv2.BORDER_REPLICATE)
+    return result
+
+
+def sharpen(image, amount=1.0):
+    """锐化：3×3核，中心1+amount、8邻域各-amount/8（amount=1与PIL的SHARPEN相同）"""
+    import cv2
+    kernel = np.full((3, 3), -amount / 8.0, np.float32)
+    kernel[1, 1] = 1.0 + amount
+    return cv2.filter2D(image, -1, kernel, borderType=cv2.BORDER_REPLICATE)
+
+
+def median_filter(image, radius):
+    """中值滤波：窗口(2r+1)×(2r+1)
+
+    8位图像窗口大于5×5时，OpenCV使用Perreault-Hébert常数时间算法（按列维护直方图，
+    窗口滑动时只增减一列），耗时与窗口大小基本无关
+    """
+    import cv2
+    radius = int(round(radius))
+    if radius < 1:
+        return image
+    return cv2.medianBlur(image, 2 * radius + 1)
+
+
+def bilateral_filter(image, sigma_space=5, sigma_color=30):
+    """双边滤波的快速近似（分层线性插值 + 降采样，Durand-Dorsey方法）
+
+    把灰度范围分成若干层，每层按“像素灰度与该层的接近程度”加权后做高斯模糊，
+    再按每个像素的灰度在相邻两层结果之间线性插值。空间标准差较大时在缩小的图像上计算，
+    模糊本身也不随半径增长，因此耗时基本与窗口大小无关。彩色图按灰度计算权重，各通道共用
+    """
+    import cv2
+    if sigma_space <= 0 or sigma_color <= 0:
+        return image
+    h, w = image.shape[:2]
+    factor = max(1, int(sigma_space // BILATERAL_DOWNSAMPLE_SIGMA))
+    if factor > 1:
+        small = cv2.resize(image, (max(1, w // factor), max(1, h // factor)), interpolation=cv2.INTER_AREA)
+    else:
+        small = image
+    small_sigma = sigma_space * small.shape[1] / w
+    small_guide = to_gray(small).astype(np.float32)
+    small_image = small.astype(np.float32)
+    guide = to_gray(image).astype(np.float32)
+    levels = int(np.clip(np.ceil(255.0 / sigma_color) + 1, 2, BILATERAL_MAX_LEVELS))
+    values, step = np.linspace(0.0, 255.0, levels, retstep=True)
+    result = np.zeros(image.shape, np.float32)
+    for value in values:
+        # 该层的灰度权重及加权模糊（归一化后即该层的滤波结果）
+        weight = np.exp(-0.5 * ((small_guide - value) / sigma_color) ** 2)
+        weighted = small_image * (weight[..., None] if small_image.ndim == 3 else weight)
+        norm = np.maximum(gaussian_blur(weight, small_sigma), 1e-6)
+        layer = gaussian_blur(weighted, small_sigma)
+        layer /= norm[..., None] if layer.ndim == 3 else norm
+        if factor > 1:
+            layer = cv2.resize(layer, (w, h), interpolation=cv2.INTER_LINEAR)
+        # 按像素灰度与该层的距离线性插值（只有相邻两层的权重非零）
+        hat = np.maximum(0.0, 1.0 - np.abs(guide - value) / step)
+        result += layer * (hat[..., None] if layer.ndim == 3 else hat)
+    return np.clip(result + 0.5, 0, 255).astype(np.uint8)
+
+
+# 滤波类型 → 计算函数（参数名与SPATIAL_DEFAULTS一致）
+SPATIAL_FILTERS = {
+    "mean": box_blur,
+    "gaussian": gaussian_blur,
+    "sharpen": sharpen,
+    "median": median_filter,
+    "bilateral": bilateral_filter,
+}
+
+
+def spatial_filter(image, filter_type, **params):
+    """空间域滤波：mean（均值）/ gaussian（高斯）/ sharpen（锐化）/ median（中值）/ bilateral（双边），
+    输入输出均为uint8数组（灰度/RGB/RGBA）；未给出（或为None）的参数取SPATIAL_DEFAULTS中的默认值
+    """
+    if filter_type not in SPATIAL_FILTERS:
+        raise ValueError(f"未知的空间域滤波类型：{filter_type}")
+    params = dict(SPATIAL_DEFAULTS[filter_type], **{k: v for k, v in params.items() if v is not None})
+    with stage_profiler.stage("filter"):
+        return SPATIAL_FILTERS[filter_type](image, **params)
+
+
+# -------------------------- 频域滤波（Tab3） --------------------------
+# 彩色频域滤波的滤波后频谱显示亮度分量（与RGB2GRAY相同的权重；DFT是线性的，各通道频谱加权求和即可）
+LUMA_WEIGHTS = np.float32([0.299, 0.587, 0.114])
+
+
+def frequency_mask(mask_engine, filter_type, h, w, layout, cutoff=30, center_freq=50, bandwidth=10):
+    """按滤波类型生成掩膜：lpf（高斯低通）/ hpf（高斯高通）/ band_reject（带阻）"""
+    if filter_type == "lpf":
+        return mask_engine.gaussian_lpf(h, w, cutoff, layout=layout)
+    if filter_type == "hpf":
+        return mask_engine.gaussian_hpf(h, w, cutoff, layout=layout)
+    if filter_type == "band_reject":
+        return mask_engine.band_reject(h, w, center_freq, bandwidth, layout=layout)
+    raise ValueError(f"未知的频域滤波类型：{filter_type}")
+
+
+def frequency_filter(image, filter_type, cutoff=30, center_freq=50, bandwidth=10,
+                     spectrum=None, half=True, mask_engine=None, spectrum_size=None):
+    """频域滤波，返回（滤波结果uint8, 显示分辨率的滤波后对数幅度谱或None）
+
+    image为灰度图或RGB图（H×W×3：各通道的频谱按通道堆叠，一次广播乘上同一个掩膜，
+    正/逆变换各通道并行；结果三通道统一归一化以保持色彩比例，频谱图显示亮度分量）；
+    spectrum为已算好的正变换（与half和通道数对应，通常来自SpectrumService），为None时现场计算；
+    spectrum_size为频谱显示尺寸（宽, 高），为None时不生成频谱图
+    """
+    import cv2
+    mask_engine = mask_engine or default_mask_engine
+    h, w = image.shape[:2]
+    color = image.ndim == 3
+    if spectrum is None:
+        spectrum = padded_dft(image, half=half)
+    new_h, new_w = spectrum.shape[1:3] if color else spectrum.shape[:2]
+    spectrum_log = None
+    if half:
+        # 半频谱：CCS打包的实数DFT × CCS布局掩膜，逆变换直接输出实数图像
+        with stage_profiler.stage("mask"):
+            mask = frequency_mask(mask_engine, filter_type, new_h, new_w, "ccs", cutoff, center_freq, bandwidth)
+            filtered = spectrum * mask
+    else:
+        # 完整复数频谱（未中心化布局掩膜，直接与DFT原始输出相乘）
+        with stage_profiler.stage("mask"):
+            mask = frequency_mask(mask_engine, filter_type, new_h, new_w, "unshifted", cutoff, center_freq, bandwidth)
+            filtered = spectrum * mask[:, :, np.newaxis]
+    if spectrum_size is not None:
+        # 滤波后频谱只在显示分辨率上重建
+        with stage_profiler.stage("spectrum"):
+            shown = np.tensordot(LUMA_WEIGHTS, filtered, axes=1) if color else filtered
+            if half:
+                spectrum_log = packed_display_log_magnitude(shown, spectrum_size)
+            else:
+                spectrum_log = cv2.resize(shifted_log_magnitude(shown), tuple(spectrum_size),
+                                          interpolation=cv2.INTER_LINEAR)
+    if color:
+        return _inverse_channels(filtered, half, h, w), spectrum_log
+    with stage_profiler.stage("idft"):
+        if half:
+            result = np.abs(cv2.idft(filtered, flags=cv2.DFT_REAL_OUTPUT))
+        else:
+            idft = cv2.idft(filtered)
+            result = cv2.magnitude(idft[:, :, 0], idft[:, :, 1])
+    with stage_profiler.stage("normalize"):
+        result = cv2.normalize(result, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+    return result[:h, :w], spectrum_log
+
+
+def _inverse_channels(filtered, half, h, w):
+    """按通道堆叠的滤波后频谱 → H×W×C的uint8图像（各通道并行原地逆变换，三通道统一归一化）"""
+    import cv2
+    channels, new_h, new_w = filtered.shape[:3]
+    result = filtered if half else np.empty((channels, new_h, new_w), np.float32)
+
+    def inverse(i):
+        if half:
+            cv2.idft(filtered[i], dst=filtered[i], flags=cv2.DFT_REAL_OUTPUT)
+            np.abs(filtered[i], out=filtered[i])
+        else:
+            cv2.idft(filtered[i], dst=filtered[i])
+            cv2.magnitude(filtered[i][:, :, 0], filtered[i][:, :, 1], result[i])
+
+    with stage_profiler.stage("idft"):
+        for_each_channel(inverse, channels)
+    with stage_profiler.stage("normalize"):
+        # 按二维视图整体归一化（与灰度时相同，包含填充区域），裁剪后再交织为H×W×C
+        result = cv2.normalize(result.reshape(channels * new_h, new_w), None, 0, 255, cv2.NORM_MINMAX,
+                               dtype=cv2.CV_8U).reshape(channels, new_h, new_w)
+        return cv2.merge([result[i, :h, :w] for i in range(channels)])
+
+
+# -------------------------- 形态学处理（Tab4） --------------------------
+# 结构元素形状：矩形 / 椭圆（内切于k×k） / 十字形 / 圆盘（x²+y²≤r²） / 直线（按角度）
+MORPH_SHAPES = ("rect", "ellipse", "cross", "disk", "line")
+# 核边长达到该值时改用快速算法（线段分解/距离变换），更小的核直接用OpenCV逐点比较；
+# 灰度图的大圆盘由此变为八边形近似（见_fast_reduce），椭圆始终用OpenCV精确计算
+FAST_MORPH_MIN_SIZE = 31
+# 水平/垂直线段长度达到该值时改用vHGW（更短时OpenCV的SIMD逐点比较更快）
+VHGW_MIN_LENGTH = 451
+# 基本操作（直接由腐蚀/膨胀组成）和派生操作（由基本操作的结果组合，见derived_morphology）
+MORPH_BASE_OPS = ("erode", "dilate", "open", "close")
+MORPH_DERIVED_OPS = ("gradient", "tophat", "blackhat", "open_rec")
+
+
+def structuring_element(shape, kernel_size, angle=0):
+    """生成k×k的结构元素（uint8，非零为元素内的点，中心为原点）；angle为直线与水平方向的夹角（度）"""
+    import cv2
+    radius = kernel_size // 2
+    if shape == "rect":
+        return np.ones((kernel_size, kernel_size), np.uint8)
+    if shape == "ellipse":
+        return cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+    if shape == "cross":
+        return cv2.getStructuringElement(cv2.MORPH_CROSS, (kernel_size, kernel_size))
+    if shape == "disk":
+        y, x = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+        return (x * x + y * y <= radius * radius).astype(np.uint8)
+    if shape == "line":
+        kernel = np.zeros((kernel_size, kernel_size), np.uint8)
+        dx = int(round(radius * np.cos(np.radians(angle))))
+        dy = int(round(radius * np.sin(np.radians(angle))))
+        # 图像y轴向下，逆时针角度对应的终点为(r+dx, r-dy)
+        cv2.line(kernel, (radius - dx, radius + dy), (radius + dx, radius - dy), 1)
+        return kernel
+    raise ValueError(f"未知的结构元素形状：{shape}")
+
+
+def is_binary(gray):
+    """图像是否只有0和255两种值（二值图可用距离变换精确计算圆盘腐蚀/膨胀）"""
+    return not np.any((gray != 0) & (gray != 255))
+
+
+def _vhgw(image, size, axis, reduce, fill):
+    """van Herk/Gil-Werman一维最小/最大值滤波（窗口size居中，沿axis，二维数组）
+
+    按窗口长度分段，每段内求前缀和后缀的最值，任意窗口的结果是某段后缀与下一段前缀的最值，
+    每个像素只需约3次比较，与窗口长度无关；图像外按fill填充（与OpenCV默认边界一致）
+    """
+    radius = size // 2
+    n = image.shape[axis]
+    blocks = -(-(n + 2 * radius) // size)
+    shape = list(image.shape)
+    shape[axis] = blocks * size
+    padded = np.full(shape, fill, image.dtype)
+    index = [slice(None)] * image.ndim
+    index[axis] = slice(radius, radius + n)
+    padded[tuple(index)] = image
+    view = padded.reshape(shape[:axis] + [blocks, size] + shape[axis + 1:])
+    prefix = reduce.accumulate(view, axis=axis + 1).reshape(shape)
+    suffix = np.flip(reduce.accumulate(np.flip(view, axis + 1), axis=axis + 1), axis + 1).reshape(shape)
+    index[axis] = slice(0, n)
+    head = suffix[tuple(index)]
+    index[axis] = slice(size - 1, size - 1 + n)
+    return reduce(head, prefix[tuple(index)])
+
+
+def _line_reduce(gray, half, direction, dilate):
+    """沿直线段（2×half+1个像素）腐蚀/膨胀，direction为(dy, dx)：水平/垂直/两条对角线
+
+    OpenCV对一维核的逐点比较经过SIMD优化，常见长度下比vHGW更快；水平/垂直线段长度
+    达到VHGW_MIN_LENGTH后改用vHGW（耗时与长度无关）
+    """
+    import cv2
+    if half < 1:
+        return gray
+    size = 2 * half + 1
+    dy, dx = direction
+    if (dy == 0 or dx == 0) and size >= VHGW_MIN_LENGTH:
+        reduce = np.maximum if dilate else np.minimum
+        fill = np.iinfo(gray.dtype).min if dilate else np.iinfo(gray.dtype).max
+        return _vhgw(gray, size, 1 if dy == 0 else 0, reduce, fill)
+    if dy == 0:
+        kernel = np.ones((1, size), np.uint8)
+    elif dx == 0:
+        kernel = np.ones((size, 1), np.uint8)
+    else:
+        kernel = np.eye(size, dtype=np.uint8) if dy == dx else np.fliplr(np.eye(size, dtype=np.uint8)).copy()
+    return cv2.dilate(gray, kernel) if dilate else cv2.erode(gray, kernel)
+
+
+def _binary_disk(gray, radius, dilate):
+    """二值图（0/255）的圆盘腐蚀/膨胀：欧氏距离变换后按半径阈值化，结果精确且耗时与半径无关"""
+    import cv2
+    if gray.ndim == 3:
+        # 距离变换只支持单通道，彩色二值图逐通道计算
+        return cv2.merge([_binary_disk(channel, radius, dilate) for channel in cv2.split(gray)])
+    source = (gray == 0) if dilate else (gray != 0)
+    distance = cv2.distanceTransform(source.astype(np.uint8), cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    inside = distance <= radius + 1e-3 if dilate else distance > radius + 1e-3
+    return np.where(inside, np.uint8(255), np.uint8(0))
+
+
+def _octagon_halves(half):
+    """半径half的圆盘按八边形近似时，水平/垂直线段与对角线段的半长
+
+    四条线段的闵可夫斯基和是正八边形，取内切圆半径为half：水平/垂直半长a=half(√2-1)，对角线半长b=half(1-1/√2)
+    """
+    return int(round(half * (np.sqrt(2) - 1))), int(round(half * (1 - 1 / np.sqrt(2))))
+
+
+def morphology_reach(shape, kernel_size):
+    """一次腐蚀/膨胀在水平/垂直方向上的最大影响范围（分块边框用）
+
+    通常为k//2；大核圆盘的八边形近似取整后可能多出1像素
+    """
+    half = kernel_size // 2
+    if shape == "disk" and kernel_size >= FAST_MORPH_MIN_SIZE:
+        axis_half, diagonal_half = _octagon_halves(half)
+        return max(half, axis_half + 2 * diagonal_half)
+    return half
+
+
+def _fast_reduce(gray, shape, kernel_size, angle, binary, dilate):
+    """大核腐蚀（dilate=False）/膨胀的快速实现，不适用时返回None（改用OpenCV逐点计算）
+
+    十字形：水平、垂直线段的结果再取最值；水平/垂直直线：一维线段；
+    圆盘：二值图用距离变换（精确），灰度图分解为水平、垂直和两条对角线段，计算量从k²降为约4k
+    （半径100的圆盘约快30倍），但结构元素是近似的正八边形：包含半径r-1的圆盘、含于半径约1.08r+1的圆盘内，
+    灰度变化剧烈处与精确圆盘相差可达数十个灰度级；椭圆不做近似（返回None）
+    """
+    import cv2
+    half = kernel_size // 2
+    if shape == "cross":
+        reduce = np.maximum if dilate else np.minimum
+        return reduce(_line_reduce(gray, half, (0, 1), dilate), _line_reduce(gray, half, (1, 0), dilate))
+    if shape == "line":
+        direction = {0: (0, 1), 90: (1, 0)}.get(angle % 180)
+        return None if direction is None else _line_reduce(gray, half, direction, dilate)
+    if shape != "disk":
+        return None  # 矩形核OpenCV已按行、列分离计算；椭圆保持精确
+    if binary:
+        return _binary_disk(gray, half, dilate)
+    axis_half, diagonal_half = _octagon_halves(half)
+    # 逐条线段串联计算时，每一步都需要上一步在图像外的结果：先按腐蚀/膨胀的单位元填充边框，
+    # 否则靠近边界处会漏掉经过图像外再回到图像内的点，与整体用八边形计算的结果不同
+    pad = axis_half + 2 * diagonal_half
+    fill = 0 if dilate else int(np.iinfo(gray.dtype).max)
+    result = cv2.copyMakeBorder(gray, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=(fill,) * 4)
+    for direction, length in (((0, 1), axis_half), ((1, 0), axis_half), ((1, 1), diagonal_half),
+                              ((-1, 1), diagonal_half)):
+        result = _line_reduce(result, length, direction, dilate)
+    return np.ascontiguousarray(result[pad:pad + gray.shape[0], pad:pad + gray.shape[1]])
+
+
+def _erode_dilate(gray, dilate, shape, kernel_size, angle, binary):
+    """单次腐蚀/膨胀：大核优先用快速算法，否则用OpenCV和对应形状的结构元素"""
+    import cv2
+    if kernel_size >= FAST_MORPH_MIN_SIZE:
+        result = _fast_reduce(gray, shape, kernel_size, angle, binary, dilate)
+        if result is not None:
+            return result
+    kernel = structuring_element(shape, kernel_size, angle)
+    return cv2.dilate(gray, kernel) if dilate else cv2.erode(gray, kernel)
+
+
+def _propagate_rows(result, mask):
+    """沿第0轴从前往后逐行传播（就地修改）：每行先与上一行相邻三个像素（8邻域）的最大值取最大，再与mask取最小
+
+    每次处理一整行，一遍扫描就能把值沿扫描方向传到底
+    """
+    above = np.empty_like(result[0])
+    for y in range(1, result.shape[0]):
+        previous = result[y - 1]
+        above[:] = previous
+        np.maximum(above[1:], previous[:-1], out=above[1:])
+        np.maximum(above[:-1], previous[1:], out=above[:-1])
+        np.maximum(above, result[y], out=above)
+        np.minimum(above, mask[y], out=result[y])
+
+
+def reconstruct_by_dilation(marker, mask):
+    """灰度形态学重建（8邻域）：marker在mask之下反复测地膨胀直到不再变化的结果
+
+    按Vincent（1993）的混合算法：先做顺序扫描（自上而下、自左而右、自下而上、自右而左各一遍，
+    每遍逐行/逐列向量化），大部分像素一次到位；再从仍可增大的像素出发按FIFO队列逐层传播，
+    每层只处理上一层变化像素的邻域。总计算量约为像素数的常数倍，与图像直径无关
+    （逐次3×3测地膨胀到稳定需要的迭代次数与最长测地路径成正比，大图上可达上千遍）
+    """
+    import cv2
+    if marker.ndim == 3:
+        return cv2.merge([reconstruct_by_dilation(m, g) for m, g in zip(cv2.split(marker), cv2.split(mask))])
+    h, w = mask.shape
+    # 四周补一圈0：边框的mask为0，永远不会增大，取邻域时不需要判断越界
+    result = np.zeros((h + 2, w + 2), np.uint8)
+    limit = np.zeros((h + 2, w + 2), np.uint8)
+    limit[1:-1, 1:-1] = mask
+    result[1:-1, 1:-1] = cv2.min(marker, mask)
+    with stage_profiler.stage("raster scan"):
+        _propagate_rows(result, limit)
+        _propagate_rows(result[::-1], limit[::-1])
+        columns, column_limit = np.ascontiguousarray(result.T), np.ascontiguousarray(limit.T)
+        _propagate_rows(columns, column_limit)
+        _propagate_rows(columns[::-1], column_limit[::-1])
+        result = np.ascontiguousarray(columns.T)
+    with stage_profiler.stage("queue"):
+        flat, flat_limit = result.ravel(), limit.ravel()
+        offsets = [dy * (w + 2) + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx]
+        # 初始队列：邻域中有像素还能被它增大的像素（只有这些像素需要继续向外传播）
+        can_grow = cv2.min(cv2.dilate(result, np.ones((3, 3), np.uint8)), limit) > result
+        sources = cv2.dilate(can_grow.view(np.uint8), np.ones((3, 3), np.uint8))
+        sources[[0, -1], :] = 0  # 边框不是图像像素
+        sources[:, [0, -1]] = 0
+        queue = np.flatnonzero(sources)
+        queued = np.zeros(flat.size, bool)  # 去重用：下一层中已有的像素
+        while queue.size:
+            values = flat[queue]
+            grown = []
+            for offset in offsets:
+                # 同一偏移下各目标像素互不相同，可以直接赋值
+                target = queue + offset
+                value = np.minimum(values, flat_limit[target])
+                increased = value > flat[target]
+                target = target[increased]
+                flat[target] = value[increased]
+                target = target[~queued[target]]
+                queued[target] = True
+                grown.append(target)
+            # 下一层：本层增大过的像素（FIFO队列按层处理）
+            queue = np.concatenate(grown)
+            queued[queue] = False
+    return np.ascontiguousarray(result[1:-1, 1:-1])
+
+
+def derived_morphology(op, gray, base):
+    """按名称计算形态学操作；base(name)返回基本操作（腐蚀/膨胀/开/闭）的结果，可来自缓存
+
+    gradient（形态学梯度）= 膨胀 - 腐蚀；tophat（顶帽）= 原图 - 开运算；blackhat（黑帽）= 闭运算 - 原图；
+    open_rec（重建开运算）= 以腐蚀结果为标记、原图为掩膜的形态学重建（去掉小亮斑，保留其余物体的原有形状）
+    """
+    import cv2
+    if op in MORPH_BASE_OPS:
+        return base(op)
+    if op == "gradient":
+        dilated, eroded = base("dilate"), base("erode")
+        with stage_profiler.stage("combine"):
+            return cv2.subtract(dilated, eroded)
+    if op == "tophat":
+        opened = base("open")
+        with stage_profiler.stage("combine"):
+            return cv2.subtract(gray, opened)
+    if op == "blackhat":
+        closed = base("close")
+        with stage_profiler.stage("combine"):
+            return cv2.subtract(closed, gray)
+    if op == "open_rec":
+        eroded = base("erode")
+        with stage_profiler.stage("reconstruction"):
+            return reconstruct_by_dilation(eroded, gray)
+    raise ValueError(f"未知的形态学操作：{op}")
+
+
+def morphology(gray, op, kernel_size=5, shape="rect", angle=0, binary=None):
+    """形态学操作：erode（腐蚀）/ dilate（膨胀）/ open（开运算）/ close（闭运算），
+    以及派生操作gradient / tophat / blackhat / open_rec（见derived_morphology）
+
+    shape为结构元素形状（见MORPH_SHAPES），angle只对直线有效；核边长达到FAST_MORPH_MIN_SIZE后
+    使用快速算法（见_fast_reduce），半径100的圆盘也能交互调节（灰度图的大圆盘为八边形近似，需要精确结果时用椭圆）。
+    binary为None时自动判断是否为二值图（分块计算时应由调用方对整图判断一次后传入，保证各块一致）。
+    gray也可以是RGB图，各通道在同一次OpenCV调用中分别处理
+    """
+    if shape not in MORPH_SHAPES:
+        raise ValueError(f"未知的结构元素形状：{shape}")
+    if op not in MORPH_BASE_OPS + MORPH_DERIVED_OPS:
+        raise ValueError(f"未知的形态学操作：{op}")
+    if binary is None and shape == "disk" and kernel_size >= FAST_MORPH_MIN_SIZE:
+        binary = is_binary(gray)
+    # 开运算 = 先腐蚀后膨胀，闭运算 = 先膨胀后腐蚀（同一结构元素）
+    steps = {"erode": (False,), "dilate": (True,), "open": (False, True), "close": (True, False)}
+
+    def base(name):
+        with stage_profiler.stage("morphology"):
+            result = gray
+            for dilate in steps[name]:
+                result = _erode_dilate(result, dilate, shape, kernel_size, angle, binary)
+            return result
+
+    return derived_morphology(op, gray, base)
+
+
+# -------------------------- 边缘检测（Tab5） --------------------------
+# 梯度方向图中幅值低于该值的像素显示为黑色（平坦区域的方向只是噪声）
+ORIENTATION_MIN_MAGNITUDE = 16
+# 自动阈值中值法的上下浮动比例（低阈值=(1-σ)×中值，高阈值=(1+σ)×中值）
+CANNY_MEDIAN_SIGMA = 0.33
+
+
+def edge_blur(gray):
+    """边缘检测前的3×3高斯模糊降噪（所有算法共用）"""
+    import cv2
+    with stage_profiler.stage("blur"):
+        return cv2.GaussianBlur(gray, (3, 3), 0)
+
+
+def sobel_derivative(blurred, ksize=3, axis=1, replicate=False):
+    """Sobel一阶导数（axis=1为x方向，0为y方向）：孔径≤5时用int16（uint8输入下精确且不溢出），孔径7用float32
+
+    默认边界与cv2.Sobel相同（反射）；replicate=True时按复制边界计算（cv2.Canny内部求导的方式）
+    """
+    import cv2
+    depth = cv2.CV_16S if ksize <= 5 else cv2.CV_32F
+    border = cv2.BORDER_REPLICATE if replicate else cv2.BORDER_DEFAULT
+    with stage_profiler.stage("sobel"):
+        return cv2.Sobel(blurred, depth, dx=int(axis == 1), dy=int(axis == 0), ksize=ksize, borderType=border)
+
+
+def sobel_derivatives(blurred, ksize=3, replicate=False):
+    """Sobel一阶导数(dx, dy)"""
+    return sobel_derivative(blurred, ksize, 1, replicate), sobel_derivative(blurred, ksize, 0, replicate)
+
+
+# 增量Canny所用导数的缓存键（与各Sobel孔径并列）：3×3、复制边界，与cv2.Canny内部的导数相同
+CANNY_GRADIENTS = "canny"
+
+
+def gradient_spec(key):
+    """导数缓存键 → (Sobel孔径, 是否复制边界)：key为Sobel孔径（Sobel各视图，默认边界）或CANNY_GRADIENTS"""
+    return (3, True) if key == CANNY_GRADIENTS else (key, False)
+
+
+def dominant_gradient(dx, dy):
+    """多通道导数 → 每个像素取L1幅值最大的通道的(dx, dy)（与cv2.Canny对彩色图的处理相同）"""
+    magnitude = np.abs(dx, dtype=np.float32) + np.abs(dy, dtype=np.float32)
+    index = magnitude.argmax(axis=2)[:, :, np.newaxis]
+    return np.take_along_axis(dx, index, 2)[:, :, 0], np.take_along_axis(dy, index, 2)[:, :, 0]
+
+
+def gradient_orientation(dx, dy):
+    """梯度方向可视化（RGB）：色相表示方向（0-180度），亮度表示幅值；彩色图的导数取幅值最大的通道"""
+    import cv2
+    if dx.ndim == 3:
+        dx, dy = dominant_gradient(dx, dy)
+    dx, dy = dx.astype(np.float32), dy.astype(np.float32)
+    magnitude = cv2.magnitude(dx, dy)
+    # 方向取0-180度（边缘两侧梯度相反，视为同一方向），正好对应OpenCV的色相范围0-179
+    hue = (cv2.phase(dx, dy, angleInDegrees=True) % 180).astype(np.uint8)
+    value = cv2.convertScaleAbs(magnitude)
+    value[value < ORIENTATION_MIN_MAGNITUDE] = 0
+    hsv = cv2.merge([hue, np.full_like(hue, 255), value])
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+
+
+def canny_from_gradients(dx, dy, low, high):
+    """由3×3 Sobel导数（int16）直接做Canny：跳过模糊和求导，只做非极大值抑制和滞后阈值连接
+
+    导数须按复制边界计算（见CANNY_GRADIENTS），结果与cv2.Canny(模糊图)逐像素相同（包括图像边界）
+    """
+    import cv2
+    return cv2.Canny(dx, dy, low, high)
+
+
+def canny_histogram(dx, dy):
+    """非极大值抑制后各局部极大值的L1梯度幅值直方图（下标为幅值，0号不计），用于自动选择阈值
+
+    两个阈值都为0时cv2.Canny输出的正是所有幅值>0的局部极大值；彩色图的幅值取各通道的最大值（与cv2.Canny相同）
+    """
+    maxima = canny_from_gradients(dx, dy, 0, 0) > 0
+    magnitude = np.abs(dx[maxima].astype(np.int32)) + np.abs(dy[maxima].astype(np.int32))
+    if magnitude.ndim == 2:
+        magnitude = magnitude.max(axis=1)
+    histogram = np.bincount(magnitude, minlength=1)
+    histogram[0] = 0
+    return histogram
+
+
+def canny_auto_thresholds(histogram, method="median"):
+    """由幅值直方图推荐Canny阈值(低, 高)
+
+    median：以局部极大值幅值的中值为中心上下浮动CANNY_MEDIAN_SIGMA；
+    otsu：Otsu法（类间方差最大）的分割点作为高阈值，低阈值取其一半
+    """
+    histogram = np.asarray(histogram, np.float64)
+    total = histogram.sum()
+    if total <= 0:
+        return 0, 0
+    cumulative = np.cumsum(histogram)
+    if method == "median":
+        median = float(np.searchsorted(cumulative, total / 2))
+        return int(round((1 - CANNY_MEDIAN_SIGMA) * median)), int(round((1 + CANNY_MEDIAN_SIGMA) * median))
+    if method == "otsu":
+        moments = np.cumsum(histogram * np.arange(len(histogram)))
+        background = cumulative
+        foreground = total - cumulative
+        valid = (background > 0) & (foreground > 0)
+        between = np.zeros_like(histogram)
+        between[valid] = (moments[-1] * background[valid] - moments[valid] * total) ** 2 / (
+            background[valid] * foreground[valid])
+        high = int(np.argmax(between))
+        return int(round(high / 2)), high
+    raise ValueError(f"未知的自动阈值方法：{method}")
+
+
+def derived_edges(op, blurred, gradients, sobel_ksize=3, canny_low=50, canny_high=150, laplacian_ksize=3):
+    """按名称计算边缘检测结果；blurred()返回模糊后的灰度图，gradients(key)返回导数(dx, dy)（键见gradient_spec），
+    二者均可来自缓存（在Sobel X/Y、幅值、方向之间切换时不需要重新卷积，增量Canny调阈值时不重新模糊和求导）
+
+    sobel_x / sobel_y：|dx|、|dy|；sobel_mag：梯度幅值；sobel_dir：梯度方向（RGB）；
+    canny：cv2.Canny；canny_inc：增量Canny（见canny_from_gradients）；laplacian
+    """
+    import cv2
+    if op == "canny_inc":
+        dx, dy = gradients(CANNY_GRADIENTS)
+        with stage_profiler.stage("edge"):
+            return canny_from_gradients(dx, dy, canny_low, canny_high)
+    if op in ("sobel_x", "sobel_y", "sobel_mag", "sobel_dir"):
+        dx, dy = gradients(sobel_ksize)
+        with stage_profiler.stage("normalize"):
+            if op == "sobel_x":
+                return cv2.convertScaleAbs(dx)
+            if op == "sobel_y":
+                return cv2.convertScaleAbs(dy)
+            if op == "sobel_mag":
+                return cv2.convertScaleAbs(cv2.magnitude(dx.astype(np.float32), dy.astype(np.float32)))
+            return gradient_orientation(dx, dy)
+    if op == "canny":
+        image = blurred()
+        with stage_profiler.stage("edge"):
+            return cv2.Canny(image, canny_low, canny_high)
+    if op == "laplacian":
+        image = blurred()
+        with stage_profiler.stage("edge"):
+            edge = cv2.Laplacian(image, cv2.CV_32F, ksize=laplacian_ksize)
+        # 处理负值（取绝对值并转为8位）
+        with stage_profiler.stage("normalize"):
+            return cv2.convertScaleAbs(edge)
+    raise ValueError(f"未知的边缘检测算法：{op}")
+
+
+def edge_detection(gray, op, sobel_ksize=3, canny_low=50, canny_high=150, laplacian_ksize=3):
+    """边缘检测：sobel_x / sobel_y / sobel_mag / sobel_dir / canny / canny_inc / laplacian，
+    返回uint8边缘图（sobel_dir为RGB方向图），中间结果不缓存（缓存见edge_engine.EdgeEngine）。
+    gray也可以是RGB图：Sobel/Laplacian逐通道输出彩色边缘图，Canny输出单通道（取幅值最大的通道）
+    """
+    blurred = edge_blur(gray)
+    return derived_edges(op, lambda: blurred, lambda key: sobel_derivatives(blurred, *gradient_spec(key)),
+                         sobel_ksize=sobel_ksize, canny_low=canny_low, canny_high=canny_high,
+                         laplacian_ksize=laplacian_ksize)
+
+
+# -------------------------- 按名称调用（批处理/流水线） --------------------------
+# 操作名称 → （计算类型, 对应函数内的操作名）；计算类型同scale_params_for_proxy的kind
+OPERATIONS = {
+    "mean": ("spatial", "mean"),
+    "gaussian": ("spatial", "gaussian"),
+    "sharpen": ("spatial", "sharpen"),
+    "median": ("spatial", "median"),
+    "bilateral": ("spatial", "bilateral"),
+    "lpf": ("frequency", "lpf"),
+    "hpf": ("frequency", "hpf"),
+    "band_reject": ("frequency", "band_reject"),
+    "erode": ("morphology", "erode"),
+    "dilate": ("morphology", "dilate"),
+    "open": ("morphology", "open"),
+    "close": ("morphology", "close"),
+    "gradient": ("morphology", "gradient"),
+    "tophat": ("morphology", "tophat"),
+    "blackhat": ("morphology", "blackhat"),
+    "open_rec": ("morphology", "open_rec"),
+    "sobel_x": ("edge", "sobel_x"),
+    "sobel_y": ("edge", "sobel_y"),
+    "sobel_mag": ("edge", "sobel_mag"),
+    "sobel_dir": ("edge", "sobel_dir"),
+    "canny": ("edge", "canny"),
+    "canny_inc": ("edge", "canny_inc"),
+    "laplacian": ("edge", "laplacian"),
+}
+
+
+def to_gray(image):
+    """uint8数组转灰度（与ImageStore.gray()相同的转换公式），已是灰度时原样返回"""
+    import cv2
+    if image.ndim == 2:
+        return image
+    code = cv2.COLOR_RGBA2GRAY if image.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+    with stage_profiler.stage("cvtColor"):
+        return cv2.cvtColor(image, code)
+
+
+def to_rgb(image):
+    """uint8数组去掉透明通道（彩色模式用），RGB或灰度时原样返回"""
+    import cv2
+    if image.ndim == 2 or image.shape[2] == 3:
+        return image
+    with stage_profiler.stage("cvtColor"):
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+
+
+def apply_operation(name, image, color=False, **params):
+    """按名称对uint8数组（RGB或灰度）执行一个操作，返回uint8数组
+
+    空间域滤波保持输入的通道数；其余操作默认先转为灰度，输出单通道结果，
+    color=True时保留RGB三通道（各通道在同一次调用中批量处理，见各操作的说明）
+    """
+    if name not in OPERATIONS:
+        raise ValueError(f"未知的操作：{name}")
+    kind, op = OPERATIONS[name]
+    if kind == "spatial":
+        return spatial_filter(image, op, **params)
+    gray = to_rgb(image) if color else to_gray(image)
+    if kind == "frequency":
+        result, _ = frequency_filter(gray, op, **params)
+        return result
+    if kind == "morphology":
+        return morphology(gray, op, **params)
+    return edge_detection(gray, op, **params)
+
+
+# -------------------------- 代理图预览的参数换算 --------------------------
+def odd_kernel_size(size, scale, allowed=None):
+    """按比例缩放核大小并保持为奇数；allowed给出合法取值时取最接近的一个"""
+    scaled = size * scale
+    if allowed is not None:
+        return min(allowed, key=lambda value: abs(value - scaled))
+    scaled = int(round(scaled))
+    if scaled % 2 == 0:
+        scaled += 1
+    return max(1, scaled)
+
+
+def frequency_scale(full_shape, proxy_shape):
+    """频域参数（截止频率等，单位为DFT下标）从原图换算到代理图的比例
+
+    下标k对应“每填充尺寸k个周期”：原图上的某个频率成分在代理图中的下标为
+    k × (代理图填充尺寸/代理图尺寸) / (原图填充尺寸/原图尺寸)，通常非常接近1
+    """
+    import cv2
+    ratios = []
+    for full, proxy in zip(full_shape[:2], proxy_shape[:2]):
+        full_ratio = cv2.getOptimalDFTSize(full) / full
+        proxy_ratio = cv2.getOptimalDFTSize(proxy) / proxy
+        ratios.append(proxy_ratio / full_ratio)
+    return float(np.sqrt(ratios[0] * ratios[1]))
+
+
+def scale_params_for_proxy(kind, params, scale, full_shape=None, proxy_shape=None):
+    """把全分辨率下的参数换算到代理图上（scale = 代理图边长 / 原图边长）
+
+    kind: spatial / frequency / morphology / edge；frequency需要同时给出原图和代理图尺寸
+    """
+    params = dict(params)
+    if kind == "spatial":
+        # 空间半径随图像一起缩小（锐化强度、双边滤波的灰度标准差与分辨率无关，保持不变）
+        for key in ("radius", "sigma_space"):
+            if params.get(key) is not None:
+                params[key] = params[key] * scale
+    elif kind == "frequency":
+        # 截止频率按“每幅图多少个周期”计，与分辨率基本无关，只需修正填充尺寸带来的差异
+        ratio = frequency_scale(full_shape, proxy_shape)
+        for key in ("cutoff", "center_freq", "bandwidth"):
+            if key in params:
+                params[key] = params[key] * ratio
+    elif kind == "morphology":
+        params["kernel_size"] = odd_kernel_size(params["kernel_size"], scale)
+    elif kind == "edge":
+        # Sobel/Laplacian孔径只能取1/3/5/7；Canny阈值针对梯度幅值，保持不变
+        for key in ("sobel_ksize", "laplacian_ksize"):
+            if key in params:
+                params[key] = odd_kernel_size(params[key], scale, allowed=(1, 3, 5, 7))
+    else:
+        raise ValueError(f"未知的参数类型：{kind}")
+    return params
@@ -0,0 +1,169 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import operations
+
+
+def content_hash(array):
+    """数组内容哈希（形状+类型+像素），作为下游步骤缓存键的一部分"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((array.shape, array.dtype.str)).encode())
+    digest.update(np.ascontiguousarray(array).data)
+    return digest.hexdigest()
+
+
+def parse_pipeline(text):
+    """解析文本形式的流水线：步骤间用“|”分隔，步骤内“操作名:参数=值,参数=值”
+
+    例如 "gaussian:radius=2 | canny:canny_low=40,canny_high=120 | close:kernel_size=5"
+    """
+    steps = []
+    for part in text.split("|"):
+        part = part.strip()
+        if not part:
+            continue
+        op, _, param_text = part.partition(":")
+        steps.append(PipelineStep(op.strip(), **parse_params(param_text)))
+    return steps
+
+
+def parse_params(text):
+    """解析“参数=值,参数=值”形式的参数（数值自动转为int/float）"""
+    params = {}
+    for item in text.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"参数格式应为key=value：{item}")
+        params[key.strip()] = _parse_value(value.strip())
+    return params
+
+
+def _parse_value(value):
+    """字符串参数转为int/float（无法转换时保留字符串）"""
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            continue
+    return value
+
+
+class PipelineStep:
+    """流水线中的一个步骤：operations.OPERATIONS中的操作名 + 参数"""
+
+    def __init__(self, op, **params):
+        if op not in operations.OPERATIONS:
+            raise ValueError(f"未知的操作：{op}")
+        self.op = op
+        self.params = params
+
+    def key(self):
+        """步骤本身的缓存键（操作名 + 排序后的参数）"""
+        return (self.op, tuple(sorted(self.params.items())))
+
+    def describe(self):
+        """文本形式（与parse_pipeline的格式一致）"""
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.op}:{params}" if params else self.op
+
+    def __repr__(self):
+        return f"PipelineStep({self.describe()})"
+
+
+class Pipeline:
+    """操作流水线：把各Tab的操作串成多个步骤，前一步的输出作为后一步的输入
+
+    每一步的输出按（上游内容哈希, 操作名, 参数）缓存（LRU，按个数和内存限制）；
+    修改第k步的参数时，前k-1步直接命中缓存，只重算第k步及之后的步骤；
+    若某步参数变化后输出内容不变，后续步骤也会命中缓存。
+    界面（Tab6）和命令行（batch_cli.py --pipeline）共用。
+    """
+
+    def __init__(self, steps=None, max_entries=32, max_bytes=512 * 1024 * 1024):
+        self.steps = list(steps or [])
+        self.max_entries = max_entries  # LRU最多缓存的中间结果个数
+        self.max_bytes = max_bytes      # LRU最多占用的内存
+        self._cache = OrderedDict()     # {(上游哈希, 步骤键): (输出数组, 输出哈希)}
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.last_computed = []         # 最近一次run中实际重算的步骤下标（其余命中缓存）
+
+    # -------------------------- 编辑步骤 --------------------------
+    def add_step(self, op, **params):
+        """在末尾追加一个步骤，返回其下标"""
+        self.steps.append(PipelineStep(op, **params))
+        return len(self.steps) - 1
+
+    def insert_step(self, index, op, **params):
+        """在指定位置插入步骤"""
+        self.steps.insert(index, PipelineStep(op, **params))
+
+    def remove_step(self, index):
+        """删除步骤"""
+        del self.steps[index]
+
+    def move_step(self, index, new_index):
+        """调整步骤顺序"""
+        self.steps.insert(new_index, self.steps.pop(index))
+
+    def set_params(self, index, **params):
+        """替换某一步的参数"""
+        self.steps[index] = PipelineStep(self.steps[index].op, **params)
+
+    # -------------------------- 执行 --------------------------
+    def run(self, image, source_hash=None, steps=None):
+        """执行整条流水线，返回每一步的输出列表（最后一项为最终结果，无步骤时返回空列表）
+
+        image为uint8数组（RGB或灰度）；source_hash为输入的内容哈希，
+        调用方已知时（例如按图像版本号）可直接传入，省去一次哈希计算；
+        steps为None时执行self.steps（界面在提交到工作线程前传入步骤快照）
+        """
+        upstream = image
+        upstream_hash = source_hash or content_hash(image)
+        outputs = []
+        computed = []
+        for index, step in enumerate(list(self.steps if steps is None else steps)):
+            key = (upstream_hash, step.key())
+            cached = self._lookup(key)
+            if cached is None:
+                # 各操作都返回新数组、不修改输入，缓存的中间结果可以直接交给下游
+                output = operations.apply_operation(step.op, upstream, **step.params)
+                cached = (output, content_hash(output))
+                self._store(key, cached)
+                computed.append(index)
+            upstream, upstream_hash = cached
+            outputs.append(upstream)
+        self.last_computed = computed
+        return outputs
+
+    def clear_cache(self):
+        """清空中间结果缓存"""
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+            return cached
+
+    def _store(self, key, cached):
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = cached
+            self._cache_bytes += cached[0].nbytes
+            # 超出个数或内存上限时淘汰最久未使用的结果（至少保留刚算出的这一个）
+            while len(self._cache) > 1 and (len(self._cache) > self.max_entries or self._cache_bytes > self.max_bytes):
+                _, (old, _) = self._cache.popitem(last=False)
+                self._cache_bytes -= old.nbytes
+
+    def describe(self):
+        """文本形式（可被parse_pipeline解析）"""
+        return " | ".join(step.describe() for step in self.steps)
@@ -0,0 +1,162 @@
+from PyQt5.QtCore import QObject, QEvent, pyqtSignal
+from task_runner import TaskRunner, LatestWinsScheduler
+from timing import stage_profiler
+
+
+class HoverPreviewFilter(QObject):
+    """按钮悬停监听：鼠标移入按钮时回调on_enter(按钮)，移出时回调on_leave(按钮)"""
+
+    def __init__(self, on_enter, on_leave, parent=None):
+        super().__init__(parent)
+        self.on_enter = on_enter
+        self.on_leave = on_leave
+
+    def watch(self, *buttons):
+        """给按钮安装悬停监听"""
+        for button in buttons:
+            button.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Enter:
+            self.on_enter(obj)
+        elif event.type() == QEvent.Leave:
+            self.on_leave(obj)
+        return False  # 不拦截事件，按钮照常响应
+
+
+class PreviewController(QObject):
+    """全分辨率计算 + 代理图预览 两路后台调度（每个Tab一个）
+
+    拖动滑块/悬停按钮期间在缩小的代理图上计算预览，松开滑块或点击按钮时才算全分辨率结果；
+    两路各自合并请求、互不覆盖。全分辨率结果总会被记下，预览进行中先不显示，
+    预览结束后恢复显示最近一次全分辨率结果。
+    show_result(结果)在界面线程显示结果（结果为None表示还没有全分辨率结果），show_error(错误信息)显示错误。
+    name为操作名称：每次计算（工作线程）+ 显示（界面线程）作为一次操作统计分阶段耗时。
+    """
+    busy_changed = pyqtSignal(bool)     # 任意一路有任务在执行
+
+    def __init__(self, show_result, show_error, min_interval_ms=30, name="", parent=None):
+        super().__init__(parent)
+        self.show_result = show_result
+        self.show_error = show_error
+        self.name = name
+        # 两路执行器：全分辨率 / 代理图预览
+        self.full_runner = TaskRunner()
+        self.full_scheduler = LatestWinsScheduler(self.full_runner, min_interval_ms)
+        self.preview_runner = TaskRunner()
+        self.preview_scheduler = LatestWinsScheduler(self.preview_runner, min_interval_ms)
+        self.full_runner.busy_changed.connect(self._update_busy)
+        self.preview_runner.busy_changed.connect(self._update_busy)
+        # 状态
+        self.preview_active = False     # 是否处于预览交互中（拖动滑块/悬停按钮）
+        self.showing_preview = False    # 结果标签当前显示的是否为预览图
+        self.showing_full = True        # 结果标签当前显示的是否为最近一次全分辨率结果（初始都为空）
+        self.full_pending = False       # 是否有已请求但尚未显示的全分辨率结果
+        self.last_full = None           # 最近一次全分辨率结果
+        self.hover_button = None        # 正在悬停预览的按钮
+
+    @property
+    def busy(self):
+        return self.full_runner.busy or self.preview_runner.busy
+
+    # -------------------------- 请求计算 --------------------------
+    def request_full(self, func):
+        """请求全分辨率计算（结束所有预览）"""
+        self.end_preview(restore=False)
+        self.full_pending = True
+        self.full_scheduler.request(self._profiled(func, self.name), self._on_full, self._on_full_error)
+
+    def request_preview(self, func):
+        """请求代理图预览计算（调用前需begin_preview）"""
+        if self.preview_active:
+            self.preview_scheduler.request(self._profiled(func, f"{self.name}（预览）"),
+                                           self._on_preview, self._on_preview_error)
+
+    # -------------------------- 预览交互 --------------------------
+    def begin_preview(self):
+        """进入预览交互（按下滑块/移入按钮）"""
+        self.preview_active = True
+
+    def end_preview(self, restore=True):
+        """结束预览交互：丢弃在途预览，restore=True时恢复显示最近一次全分辨率结果"""
+        self.preview_active = False
+        self.hover_button = None
+        self.preview_scheduler.cancel()
+        self.preview_runner.invalidate()
+        # 预览期间可能已有新的全分辨率结果到达但未显示（此时预览图也可能还没到），一并补上
+        if restore and (self.showing_preview or not self.showing_full):
+            self.showing_preview = False
+            self.showing_full = True
+            self.show_result(self.last_full)
+
+    def watch_slider(self, slider, on_release):
+        """按下滑块进入预览，松开时结束预览并回调on_release()（通常请求全分辨率计算）"""
+        slider.sliderPressed.connect(self.begin_preview)
+        slider.sliderReleased.connect(lambda: (self.end_preview(restore=False), on_release()))
+
+    def hover_enter(self, button, func):
+        """移入按钮：用代理图预览该按钮对应的操作"""
+        self.begin_preview()
+        self.hover_button = button
+        self.request_preview(func)
+
+    def hover_leave(self, button):
+        """移出按钮（未点击）：结束预览并恢复之前的结果"""
+        if self.hover_button is button:
+            self.end_preview()
+
+    def invalidate(self):
+        """作废所有结果（例如加载了新图片）"""
+        for scheduler, runner in ((self.full_scheduler, self.full_runner),
+                                  (self.preview_scheduler, self.preview_runner)):
+            scheduler.cancel()
+            runner.invalidate()
+        self.full_pending = False
+        self.showing_preview = False
+        self.showing_full = False       # 标签上还是旧图片的结果
+        self.last_full = None
+
+    # -------------------------- 分阶段耗时 --------------------------
+    @staticmethod
+    def _profiled(func, name):
+        """包装计算函数：在工作线程中统计耗时，返回（耗时记录, 结果）"""
+        def run():
+            with stage_profiler.run(name) as record:
+                return record, func()
+        return run
+
+    def _show_profiled(self, record, result):
+        """显示结果，显示耗时并入同一次操作的记录"""
+        with stage_profiler.run(record["name"] if record else self.name, record):
+            with stage_profiler.stage("display"):
+                self.show_result(result)
+
+    # -------------------------- 结果回调（界面线程） --------------------------
+    def _on_full(self, output):
+        record, result = output
+        self.full_pending = False
+        self.last_full = result
+        if self.preview_active:
+            self.showing_full = False   # 预览结束时再显示
+        else:
+            self.showing_preview = False
+            self.showing_full = True
+            self._show_profiled(record, result)
+
+    def _on_full_error(self, message):
+        self.full_pending = False
+        self.show_error(message)
+
+    def _on_preview(self, output):
+        record, result = output
+        if self.preview_active:
+            self.showing_preview = True
+            self.showing_full = False
+            self._show_profiled(record, result)
+
+    def _on_preview_error(self, message):
+        if self.preview_active:
+            self.show_error(message)
+
+    def _update_busy(self, _busy=None):
+        self.busy_changed.emit(self.busy)
@@ -22,13 +22,17 @@ a = Analysis(
     hiddenimports=collect_submodules('cv2') + collect_submodules('numpy') + collect_submodules('PIL') + [
         'PyQt5.QtWidgets', 'PyQt5.QtGui', 'PyQt5.QtCore',
         'tab1_process', 'tab2_spatial', 'tab3_frequency',
-        'tab4_morphology', 'tab5_edge_detection', 'tab7_about'
+        'tab4_morphology', 'tab5_edge_detection', 'tab6_pipeline', 'tab7_about',
+        # Tab模块在运行时才导入，其依赖的模块也显式列出
+        'timing', 'image_store', 'image_io', 'image_bridge', 'spectrum_service',
+        'spectrum_renderer', 'freq_masks', 'operations', 'task_runner', 'preview', 'pipeline',
+        'tiling', 'large_image', 'exporter', 'morph_engine', 'edge_engine'
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
     excludes=[
-        'tkinter', 'PyQt6', 'matplotlib.testing',
+        'tkinter', 'PyQt6', 'matplotlib',
         'unittest', 'pydoc', 'doctest', 'setuptools'
     ],
     win_no_prefer_redirects=False,
@@ -0,0 +1,51 @@
+import threading
+import numpy as np
+from image_bridge import ndarray_to_qimage
+from timing import stage_profiler
+
+# 可选的伪彩色方案：名称 → OpenCV颜色表常量名（None/"gray"为灰度显示）
+COLORMAPS = {
+    "jet": "COLORMAP_JET",
+    "hot": "COLORMAP_HOT",
+    "inferno": "COLORMAP_INFERNO",
+    "magma": "COLORMAP_MAGMA",
+    "viridis": "COLORMAP_VIRIDIS",
+}
+
+_lut_cache = {}                 # {颜色表名称: 256×3 RGB查找表}
+_lut_lock = threading.Lock()
+
+
+def colormap_lut(name):
+    """返回颜色表对应的256×3 uint8 RGB查找表（每种颜色表只生成一次）"""
+    with _lut_lock:
+        lut = _lut_cache.get(name)
+        if lut is None:
+            import cv2
+            if name not in COLORMAPS:
+                raise ValueError(f"未知的颜色表：{name}")
+            ramp = np.arange(256, dtype=np.uint8).reshape(256, 1)
+            bgr = cv2.applyColorMap(ramp, getattr(cv2, COLORMAPS[name]))
+            lut = np.ascontiguousarray(bgr[:, 0, ::-1])
+            _lut_cache[name] = lut
+        return lut
+
+
+def spectrum_image(log_magnitude, colormap=None):
+    """对数幅度谱归一化到0-255：灰度显示时返回H×W，指定colormap时按查找表映射为H×W×3 RGB"""
+    import cv2
+    with stage_profiler.stage("normalize"):
+        gray = cv2.normalize(log_magnitude, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
+        if colormap is None or colormap == "gray":
+            return gray
+        return colormap_lut(colormap)[gray]
+
+
+def render_spectrum(log_magnitude, colormap=None):
+    """把对数幅度谱直接转成QImage（不经过matplotlib和磁盘，可在工作线程中调用）
+
+    灰度显示时生成Grayscale8图像；指定colormap时生成RGB888图像
+    """
+    image = spectrum_image(log_magnitude, colormap)
+    with stage_profiler.stage("to_qimage"):
+        return ndarray_to_qimage(image)
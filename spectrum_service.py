@@ -0,0 +1,135 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from freq_masks import ccs_half_magnitude, half_to_display
+from timing import stage_profiler
+
+
+class SpectrumService:
+    """频谱服务：按（图像版本, 填充尺寸）缓存DFT，供Tab1/Tab3共用
+
+    缓存的是未中心化的DFT（零频在左上角），配合未中心化布局的掩膜直接相乘；
+    只有显示频谱时才对实数幅度谱做一次fftshift。
+    灰度图是实数信号，也可走CCS打包的实数DFT（packed_dft），内存和计算量约为完整复数DFT的一半。
+    彩色模式的三通道频谱按通道堆叠（见padded_dft），与灰度频谱分别缓存。
+    """
+
+    def __init__(self, image_store):
+        self.image_store = image_store  # 全局图像缓存（提供灰度图和版本号）
+        self._cache = {}                # {(版本, 填充高, 填充宽): {"dft"/"ccs"/"dft_rgb"/"ccs_rgb"/("display", 宽, 高): ...}}
+        self._lock = threading.Lock()
+
+    def padded_size(self, h, w):
+        """DFT最优填充尺寸（高, 宽）"""
+        import cv2
+        return cv2.getOptimalDFTSize(h), cv2.getOptimalDFTSize(w)
+
+    def dft(self, color=False):
+        """返回当前图像未中心化的完整复数DFT（H'×W'×2，float32；color=True时为RGB三通道3×H'×W'×2），
+        同一图像只计算一次"""
+        return self._get_item("dft_rgb" if color else "dft")
+
+    def packed_dft(self, color=False):
+        """返回当前图像的CCS打包实数DFT（H'×W'，float32；color=True时为3×H'×W'），同一图像只计算一次"""
+        return self._get_item("ccs_rgb" if color else "ccs")
+
+    def log_magnitude(self):
+        """返回中心化的对数幅度谱 log(|F|+1)（float32，完整分辨率）"""
+        return self._get_item("log_magnitude")
+
+    def display_log_magnitude(self, display_size):
+        """返回显示分辨率下的中心化对数幅度谱（display_size为（宽, 高））
+
+        只在半平面上求幅度和对数，完整频谱按显示分辨率取样重建
+        """
+        return self._get_item(("display",) + tuple(display_size))
+
+    def _get_item(self, name):
+        """取出（或计算）当前图像的某项缓存"""
+        entry = self._get_entry()
+        with self._lock:
+            value = entry.get(name)
+            if value is None:
+                value = self._compute(entry, name)
+                entry[name] = value
+            return value
+
+    def _compute(self, entry, name):
+        """计算缓存项（调用方已持有锁）"""
+        if name in ("dft", "ccs"):
+            return padded_dft(entry["gray"], half=name == "ccs", padded_size=entry["padded_size"])
+        if name in ("dft_rgb", "ccs_rgb"):
+            return padded_dft(self.image_store.rgb(), half=name == "ccs_rgb", padded_size=entry["padded_size"])
+        if name == "log_magnitude":
+            if entry.get("dft") is None:
+                entry["dft"] = self._compute(entry, "dft")
+            with stage_profiler.stage("spectrum"):
+                return shifted_log_magnitude(entry["dft"])
+        if name[0] == "display":
+            if entry.get("ccs") is None:
+                entry["ccs"] = self._compute(entry, "ccs")
+            with stage_profiler.stage("spectrum"):
+                return packed_display_log_magnitude(entry["ccs"], name[1:])
+        raise ValueError(f"未知的频谱缓存项：{name}")
+
+    def _get_entry(self):
+        """取出（或新建）当前图像的缓存项"""
+        gray_image = self.image_store.gray()
+        h, w = gray_image.shape
+        new_h, new_w = self.padded_size(h, w)
+        key = (self.image_store.version, new_h, new_w)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                # 正变换按需在_compute中进行
+                entry = {"gray": gray_image, "padded_size": (new_h, new_w)}
+                # 只保留当前图像的频谱，旧图像的直接丢弃
+                self._cache = {k: v for k, v in self._cache.items() if k[0] == key[0]}
+                self._cache[key] = entry
+            return entry
+
+
+def for_each_channel(func, count):
+    """并行执行func(0)…func(count-1)（各通道写入预先分配的输出中互不重叠的部分，OpenCV计算时释放GIL）"""
+    if count == 1:
+        func(0)
+        return
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        for _ in pool.map(func, range(count)):
+            pass
+
+
+def padded_dft(image, half=True, padded_size=None):
+    """零填充到最优尺寸（或padded_size（高, 宽））后做正变换（half=True为CCS打包实数DFT，否则为完整复数DFT）
+
+    多通道图像（H×W×C）一次填充为按通道堆叠的C×H'×W'数组，各通道并行原地变换
+    （复数输出为C×H'×W'×2），之后与同一个掩膜相乘时一次广播即可完成所有通道
+    """
+    import cv2
+    h, w = image.shape[:2]
+    new_h, new_w = padded_size or (cv2.getOptimalDFTSize(h), cv2.getOptimalDFTSize(w))
+    flags = 0 if half else cv2.DFT_COMPLEX_OUTPUT
+    with stage_profiler.stage("dft"):
+        if image.ndim == 2:
+            padded = cv2.copyMakeBorder(image, 0, new_h - h, 0, new_w - w, cv2.BORDER_CONSTANT, value=0)
+            return cv2.dft(np.float32(padded), flags=flags)
+        channels = image.shape[2]
+        stack = np.zeros((channels, new_h, new_w), np.float32)
+        stack[:, :h, :w] = np.moveaxis(image, 2, 0)
+        out = stack if half else np.empty((channels, new_h, new_w, 2), np.float32)
+        for_each_channel(lambda i: cv2.dft(stack[i], dst=out[i], flags=flags), channels)
+        return out
+
+
+def shifted_log_magnitude(dft):
+    """未中心化DFT（H×W×2）→ 中心化的对数幅度谱（只对实数幅度做fftshift）"""
+    import cv2
+    magnitude = cv2.magnitude(dft[:, :, 0], dft[:, :, 1])
+    return np.fft.fftshift(np.log(magnitude + 1))
+
+
+def packed_display_log_magnitude(packed, display_size):
+    """CCS打包DFT → 显示分辨率下的中心化对数幅度谱（只在半平面上求幅度）"""
+    h, w = packed.shape
+    half = np.log(ccs_half_magnitude(packed) + 1)
+    return half_to_display(half, h, w, display_size)
@@ -1,13 +1,17 @@
-import matplotlib.pyplot as plt
-import numpy as np
-from PIL import Image
 from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QFileDialog
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
+from image_io import read_image
+from spectrum_renderer import render_spectrum, spectrum_image
+from task_runner import TaskRunner
+from timing import stage_profiler
+import large_image
 
 class Tab1Processor:
     def __init__(self, main_window):
         self.main_window = main_window  # 关联主窗口
+        self.spectrum_colormap = None   # 频谱伪彩色方案（None为灰度，可选见spectrum_renderer.COLORMAPS）
+        self.pyramid_runner = TaskRunner()  # 大图模式下后台生成显示金字塔
         self.init_ui()                  # 构建Tab1界面
 
     def init_ui(self):
@@ -55,6 +59,7 @@ class Tab1Processor:
         self.load_button = QPushButton("加载图片")
         self.main_window.set_button_style(self.load_button)
         self.load_button.clicked.connect(self.load_image)
+        self.load_button.setEnabled(not self.main_window.exporting())  # 导出期间不能换图
         # 转换灰度图按钮
         self.convert_button = QPushButton("转换为灰度图")
         self.main_window.set_button_style(self.convert_button)
@@ -71,67 +76,96 @@ class Tab1Processor:
         self.button_layout.addStretch()
 
     def load_image(self):
-        """加载图片并自动转为PNG（同步更新所有Tab）"""
+        """加载图片（在内存中解码一次，同步更新所有Tab）；导出进行中时不加载（导出任务还要读取当前图像）"""
+        if self.main_window.exporting():
+            return
         file_name, _ = QFileDialog.getOpenFileName(
             self.main_window, "选择图片", "", 
-            "图片文件 (*.png *.jpg *.jpeg *.bmp *.gif *.tiff)"
+            "图片文件 (*.png *.jpg *.jpeg *.bmp *.gif *.tif *.tiff *.npy)"
         )
-        if file_name:
-            # 转为PNG并保存到临时路径
-            original_image = Image.open(file_name)
-            original_image.save(self.main_window.temp_png_path, format="PNG")
-            # 更新全局属性
-            self.main_window.image_path = self.main_window.temp_png_path
-            self.main_window.image = Image.open(self.main_window.temp_png_path)
-            # 显示原始图（Tab1）
-            pixmap = QPixmap(self.main_window.temp_png_path)
-            self.original_image_label.setPixmap(pixmap.scaled(800, 600, Qt.KeepAspectRatio))
-            # 同步更新Tab2、Tab3的原始图
-            self.main_window.tab2_filter.sync_original_image()
-            self.main_window.tab3_filter.sync_original_image()
-            self.main_window.tab4_filter.sync_original_image()  
-            self.main_window.tab5_filter.sync_original_image()  
+        if not file_name:
+            return
+        with stage_profiler.run("加载图片"):
+            # 未压缩的大图（NPY/未压缩TIFF）直接内存映射，其余格式解码一次，之后全程使用内存中的图像
+            try:
+                with stage_profiler.stage("decode"):
+                    array = large_image.open_memmap(file_name)
+                    image = None if array is not None else read_image(file_name)
+            except Exception as e:
+                self.original_image_label.setText(f"加载失败：{str(e)}")
+                return
+            # 更新全局属性（大图模式下没有PIL图像）
+            self.pyramid_runner.invalidate()  # 上一张大图的金字塔不再需要
+            self.main_window.image_path = file_name
+            self.main_window.image = image
+            if array is not None:
+                self.main_window.image_store.set_array(array)
+            else:
+                self.main_window.image_store.set_image(image)
+            # 显示原始图（Tab1，取金字塔中最近的一层）
+            self.show_original_image()
+            # 同步更新已打开过的Tab2~Tab6的原始图
+            self.main_window.sync_built_tabs()
+            if array is not None:
+                # 先用隔行取样的层显示，后台生成2×2平均的金字塔后再刷新各Tab的原始图
+                pyramid = self.main_window.image_store.pyramid()
+                self.pyramid_runner.submit(pyramid.build, lambda _: self.main_window.refresh_original_displays())
+
+    def show_original_image(self):
+        """显示原始图（取金字塔中最近的一层缩放，不缩放整幅原图）"""
+        q_image = self.main_window.scaled_qimage(self.main_window.image_store.display_level(800, 600), 800, 600)
+        with stage_profiler.stage("display"):
+            self.original_image_label.setPixmap(QPixmap.fromImage(q_image))
 
     def convert_to_grayscale(self):
         """转换为灰度图并显示"""
         try:
-            if not self.main_window.image:
+            if not self.main_window.image_store.has_image():
                 self.gray_image_label.setText("请先加载图片！")
                 return
-            # 转换灰度图
-            gray_image = self.main_window.image.convert("L")
-            gray_image.save("gray_image.png", format="PNG")
-            # 显示
-            gray_pixmap = QPixmap("gray_image.png")
-            self.gray_image_label.setPixmap(gray_pixmap.scaled(800, 600, Qt.KeepAspectRatio))
+            with stage_profiler.run("灰度化"):
+                # 取金字塔中最近的一层转灰度，直接包装为单通道QImage显示
+                q_image = self.main_window.scaled_qimage(
+                    self.main_window.image_store.display_level(800, 600, "gray"), 800, 600
+                )
+                with stage_profiler.stage("display"):
+                    self.gray_image_label.setPixmap(QPixmap.fromImage(q_image))
         except Exception as e:
             self.gray_image_label.setText(f"转换失败：{str(e)}")
 
     def show_frequency_domain(self):
-        """显示频域频谱（matplotlib生成）"""
+        """显示频域频谱（对数幅度谱直接转QImage）"""
         try:
-            if not self.main_window.image:
+            if not self.main_window.image_store.has_image():
                 self.frequency_image_label.setText("请先加载图片！")
                 return
-            # 转为灰度图计算频谱
-            image = self.main_window.image.convert("L")
-            image_array = np.array(image)
-            # 傅里叶变换
-            f_transform = np.fft.fft2(image_array)
-            f_transform_shifted = np.fft.fftshift(f_transform)
-            magnitude_spectrum = np.abs(f_transform_shifted)
-            # 生成频谱图
-            plt.figure(figsize=(6, 6))
-            plt.imshow(np.log(magnitude_spectrum + 1), cmap='gray')
-            plt.axis('off')
-            plt.savefig("frequency_image.png", bbox_inches='tight', pad_inches=0)
-            plt.close()
-            # 显示
-            freq_pixmap = QPixmap("frequency_image.png")
-            self.frequency_image_label.setPixmap(freq_pixmap.scaled(800, 600, Qt.KeepAspectRatio))
+            with stage_profiler.run("频谱显示"):
+                # 取缓存的对数幅度谱（与频域滤波页共用同一次实数傅里叶变换，只在显示分辨率上重建完整频谱）
+                w, h = self.main_window.image_store.size()
+                scale = min(800 / w, 600 / h, 1.0)
+                display_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+                log_magnitude = self.main_window.spectrum_service.display_log_magnitude(display_size)
+                # 归一化后直接生成图像（已是显示分辨率，无需再缩放）
+                q_image = render_spectrum(log_magnitude, self.spectrum_colormap)
+                with stage_profiler.stage("display"):
+                    self.frequency_image_label.setPixmap(QPixmap.fromImage(q_image))
         except Exception as e:
             self.frequency_image_label.setText(f"频谱显示失败：{str(e)}")
 
+    def export_tasks(self):
+        """导出用的全分辨率结果：{名称: 结果函数}（可在工作线程执行），只包含界面上已显示的灰度图/频谱图"""
+        tasks = {}
+        if not self.main_window.image_store.has_image():
+            return tasks
+        image_store = self.main_window.image_store
+        spectrum_service = self.main_window.spectrum_service
+        colormap = self.spectrum_colormap
+        if self.gray_image_label.pixmap() is not None:
+            tasks["灰度图"] = image_store.gray
+        if self.frequency_image_label.pixmap() is not None:
+            tasks["频谱图"] = lambda: spectrum_image(spectrum_service.log_magnitude(), colormap)
+        return tasks
+
     def get_layout(self):
         """返回Tab1布局（供主窗口调用）"""
         return self.layout
\ No newline at end of file
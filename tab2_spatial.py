@@ -1,11 +1,36 @@
-from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
-from PIL import ImageFilter
+import operations
+from exporter import ResultCache
+from preview import HoverPreviewFilter, PreviewController
+from timing import stage_profiler
 
 class Tab2SpatialFilter:
+    # 按钮文字 → 滤波类型
+    FILTER_TYPES = {
+        "均值滤波": "mean",
+        "高斯滤波": "gaussian",
+        "锐化滤波": "sharpen",
+        "中值滤波（去椒盐噪声）": "median",
+        "双边滤波（保边去噪）": "bilateral",
+    }
+
     def __init__(self, main_window):
         self.main_window = main_window  # 关联主窗口
+        self.selected_filter = None     # 选中的滤波类型（按钮文字）
+        # 后台计算：全分辨率 + 代理图预览两路，各自合并请求、只显示最新结果
+        self.controller = PreviewController(
+            self.show_filtered_image, self.show_filter_error, self.main_window.update_interval_ms, "空间域滤波"
+        )
+        self.result_cache = ResultCache()  # 最近一次全分辨率结果（导出时直接复用）
+        # 滤波参数（默认值与operations.SPATIAL_DEFAULTS一致）
+        self.mean_radius = operations.SPATIAL_DEFAULTS["mean"]["radius"]          # 均值滤波半径（1-50）
+        self.gaussian_radius = operations.SPATIAL_DEFAULTS["gaussian"]["radius"]  # 高斯滤波标准差（1-30）
+        self.sharpen_amount = operations.SPATIAL_DEFAULTS["sharpen"]["amount"]    # 锐化强度（0.1-5.0）
+        self.median_radius = operations.SPATIAL_DEFAULTS["median"]["radius"]      # 中值滤波半径（1-50）
+        self.bilateral_sigma_space = operations.SPATIAL_DEFAULTS["bilateral"]["sigma_space"]  # 空间标准差（1-50）
+        self.bilateral_sigma_color = operations.SPATIAL_DEFAULTS["bilateral"]["sigma_color"]  # 灰度标准差（5-100）
         self.init_ui()                  # 构建Tab2界面
 
     def init_ui(self):
@@ -31,37 +56,168 @@ class Tab2SpatialFilter:
         self.image_layout.addLayout(self.filter_selector)
         self.image_layout.addWidget(self.filtered_image_label)
         self.layout.addLayout(self.image_layout)
+        # 参数调节滑块（只显示选中滤波的参数）
+        self.param_layout = QHBoxLayout()
+        self.create_param_sliders()
+        self.layout.addLayout(self.param_layout)
+        # 后台计算提示
+        self.busy_label = self.main_window.create_busy_label()
+        self.controller.busy_changed.connect(self.busy_label.setVisible)
+        self.layout.addWidget(self.busy_label)
 
     def create_filter_buttons(self):
-        """创建3个空间域滤波按钮"""
+        """创建5个空间域滤波按钮"""
         self.mean_filter_button = QPushButton("均值滤波")
         self.gaussian_filter_button = QPushButton("高斯滤波")
         self.sharpen_filter_button = QPushButton("锐化滤波")
-        # 设置按钮样式
-        self.main_window.set_button_style(self.mean_filter_button)
-        self.main_window.set_button_style(self.gaussian_filter_button)
-        self.main_window.set_button_style(self.sharpen_filter_button)
-        # 绑定点击事件
-        self.mean_filter_button.clicked.connect(
-            lambda: self.update_button_style(self.mean_filter_button)
-        )
-        self.gaussian_filter_button.clicked.connect(
-            lambda: self.update_button_style(self.gaussian_filter_button)
-        )
-        self.sharpen_filter_button.clicked.connect(
-            lambda: self.update_button_style(self.sharpen_filter_button)
-        )
-        # 添加到布局
-        self.filter_selector.addWidget(self.mean_filter_button)
-        self.filter_selector.addWidget(self.gaussian_filter_button)
-        self.filter_selector.addWidget(self.sharpen_filter_button)
+        self.median_filter_button = QPushButton("中值滤波（去椒盐噪声）")
+        self.bilateral_filter_button = QPushButton("双边滤波（保边去噪）")
+        self.filter_buttons = (self.mean_filter_button, self.gaussian_filter_button, self.sharpen_filter_button,
+                               self.median_filter_button, self.bilateral_filter_button)
+        for button in self.filter_buttons:
+            # 设置按钮样式 + 绑定点击事件
+            self.main_window.set_button_style(button)
+            button.clicked.connect(lambda _, b=button: self.update_button_style(b))
+            self.filter_selector.addWidget(button)
+        # 悬停预览（在代理图上计算，移出按钮后恢复原结果）
+        self.hover_filter = HoverPreviewFilter(self.preview_hovered_filter, self.controller.hover_leave)
+        self.hover_filter.watch(*self.filter_buttons)
+
+    def create_param_sliders(self):
+        """创建各滤波的参数滑块（均值/高斯半径、锐化强度）"""
+        slider_style = """
+            QSlider::groove:horizontal {
+                border: 1px solid #B0B0B0;
+                background: white;
+                height: 8px;
+                border-radius: 4px;
+            }
+            QSlider::handle:horizontal {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0, 
+                                           stop:0 #e67e22, stop:1 #f39c12);
+                border: none;
+                width: 20px;
+                margin: -6px 0;
+                border-radius: 10px;
+            }
+            QLabel {
+                font-size: 13px;
+                color: #222222;
+                margin-bottom: 5px;
+            }
+        """
+        # 1. 均值滤波半径（耗时与半径无关，可放心调大）
+        self.mean_param_widget = QWidget()
+        self.mean_param_layout = QHBoxLayout(self.mean_param_widget)
+        self.mean_label = QLabel(self.mean_label_text())
+        self.mean_slider = QSlider(Qt.Horizontal)
+        self.mean_slider.setRange(1, 50)
+        self.mean_slider.setValue(self.mean_radius)
+        self.mean_slider.setStyleSheet(slider_style)
+        self.mean_slider.setFixedWidth(300)  # 固定滑块宽度
+        self.mean_slider.valueChanged.connect(self.update_mean_radius)
+        self.mean_param_layout.addWidget(self.mean_label)
+        self.mean_param_layout.addWidget(self.mean_slider)
+        self.mean_param_widget.setVisible(False)
+
+        # 2. 高斯滤波半径（标准差）
+        self.gaussian_param_widget = QWidget()
+        self.gaussian_param_layout = QHBoxLayout(self.gaussian_param_widget)
+        self.gaussian_label = QLabel(f"高斯滤波 - 半径：{self.gaussian_radius}")
+        self.gaussian_slider = QSlider(Qt.Horizontal)
+        self.gaussian_slider.setRange(1, 30)
+        self.gaussian_slider.setValue(self.gaussian_radius)
+        self.gaussian_slider.setStyleSheet(slider_style)
+        self.gaussian_slider.setFixedWidth(300)  # 固定滑块宽度
+        self.gaussian_slider.valueChanged.connect(self.update_gaussian_radius)
+        self.gaussian_param_layout.addWidget(self.gaussian_label)
+        self.gaussian_param_layout.addWidget(self.gaussian_slider)
+        self.gaussian_param_widget.setVisible(False)
+
+        # 3. 锐化强度（滑块整数值/10，即0.1-5.0）
+        self.sharpen_param_widget = QWidget()
+        self.sharpen_param_layout = QHBoxLayout(self.sharpen_param_widget)
+        self.sharpen_label = QLabel(f"锐化滤波 - 强度：{self.sharpen_amount:.1f}")
+        self.sharpen_slider = QSlider(Qt.Horizontal)
+        self.sharpen_slider.setRange(1, 50)
+        self.sharpen_slider.setValue(int(round(self.sharpen_amount * 10)))
+        self.sharpen_slider.setStyleSheet(slider_style)
+        self.sharpen_slider.setFixedWidth(300)  # 固定滑块宽度
+        self.sharpen_slider.valueChanged.connect(self.update_sharpen_amount)
+        self.sharpen_param_layout.addWidget(self.sharpen_label)
+        self.sharpen_param_layout.addWidget(self.sharpen_slider)
+        self.sharpen_param_widget.setVisible(False)
+
+        # 4. 中值滤波半径（大窗口使用常数时间算法）
+        self.median_param_widget = QWidget()
+        self.median_param_layout = QHBoxLayout(self.median_param_widget)
+        self.median_label = QLabel(self.median_label_text())
+        self.median_slider = QSlider(Qt.Horizontal)
+        self.median_slider.setRange(1, 50)
+        self.median_slider.setValue(self.median_radius)
+        self.median_slider.setStyleSheet(slider_style)
+        self.median_slider.setFixedWidth(300)  # 固定滑块宽度
+        self.median_slider.valueChanged.connect(self.update_median_radius)
+        self.median_param_layout.addWidget(self.median_label)
+        self.median_param_layout.addWidget(self.median_slider)
+        self.median_param_widget.setVisible(False)
+
+        # 5. 双边滤波参数（空间标准差 + 灰度标准差）
+        self.bilateral_param_widget = QWidget()
+        self.bilateral_param_layout = QHBoxLayout(self.bilateral_param_widget)
+        self.bilateral_space_label = QLabel(f"空间标准差：{self.bilateral_sigma_space}")
+        self.bilateral_space_slider = QSlider(Qt.Horizontal)
+        self.bilateral_space_slider.setRange(1, 50)
+        self.bilateral_space_slider.setValue(self.bilateral_sigma_space)
+        self.bilateral_space_slider.setStyleSheet(slider_style)
+        self.bilateral_space_slider.setFixedWidth(300)  # 固定滑块宽度
+        self.bilateral_space_slider.valueChanged.connect(self.update_bilateral_sigma_space)
+
+        self.bilateral_color_label = QLabel(f"灰度标准差：{self.bilateral_sigma_color}")
+        self.bilateral_color_slider = QSlider(Qt.Horizontal)
+        self.bilateral_color_slider.setRange(5, 100)
+        self.bilateral_color_slider.setValue(self.bilateral_sigma_color)
+        self.bilateral_color_slider.setStyleSheet(slider_style)
+        self.bilateral_color_slider.setFixedWidth(300)  # 固定滑块宽度
+        self.bilateral_color_slider.valueChanged.connect(self.update_bilateral_sigma_color)
+
+        self.bilateral_param_layout.addWidget(QLabel("双边滤波参数"))  # 分组标题
+        self.bilateral_param_layout.addWidget(self.bilateral_space_label)
+        self.bilateral_param_layout.addWidget(self.bilateral_space_slider)
+        self.bilateral_param_layout.addSpacing(10)
+        self.bilateral_param_layout.addWidget(self.bilateral_color_label)
+        self.bilateral_param_layout.addWidget(self.bilateral_color_slider)
+        self.bilateral_param_widget.setVisible(False)
+
+        # 按钮 → 参数Widget（选中按钮时只显示对应的参数）
+        self.param_widgets = {
+            self.mean_filter_button: self.mean_param_widget,
+            self.gaussian_filter_button: self.gaussian_param_widget,
+            self.sharpen_filter_button: self.sharpen_param_widget,
+            self.median_filter_button: self.median_param_widget,
+            self.bilateral_filter_button: self.bilateral_param_widget,
+        }
+
+        # 拖动期间在代理图上预览，松开后计算全分辨率结果
+        for slider in (self.mean_slider, self.gaussian_slider, self.sharpen_slider, self.median_slider,
+                       self.bilateral_space_slider, self.bilateral_color_slider):
+            self.controller.watch_slider(slider, self.apply_selected_filter)
+
+        # 总参数布局（居中）
+        self.param_layout.addStretch()
+        self.param_layout.addWidget(self.mean_param_widget)
+        self.param_layout.addWidget(self.gaussian_param_widget)
+        self.param_layout.addWidget(self.sharpen_param_widget)
+        self.param_layout.addWidget(self.median_param_widget)
+        self.param_layout.addWidget(self.bilateral_param_widget)
+        self.param_layout.addStretch()
 
     def update_button_style(self, clicked_button):
-        """更新按钮选中状态（橙色渐变）"""
-        # 恢复所有按钮默认样式
-        self.main_window.set_button_style(self.mean_filter_button)
-        self.main_window.set_button_style(self.gaussian_filter_button)
-        self.main_window.set_button_style(self.sharpen_filter_button)
+        """更新按钮选中状态（橙色渐变）+ 显示对应参数滑块"""
+        # 恢复所有按钮默认样式，只显示选中滤波的参数滑块
+        for button, widget in self.param_widgets.items():
+            self.main_window.set_button_style(button)
+            widget.setVisible(button is clicked_button)
         # 设置选中样式
         clicked_button.setStyleSheet("""
             QPushButton {
@@ -81,34 +237,153 @@ class Tab2SpatialFilter:
             }
         """)
         # 执行滤波
+        self.selected_filter = clicked_button.text()
         self.apply_filter(clicked_button.text())
 
-    def apply_filter(self, filter_type):
-        """执行空间域滤波"""
-        try:
-            if not self.main_window.image:
-                self.filtered_image_label.setText("请先加载图片！")
-                return
-            # 根据类型应用滤波
-            if filter_type == "均值滤波":
-                filtered_image = self.main_window.image.filter(ImageFilter.BoxBlur(5))
-            elif filter_type == "高斯滤波":
-                filtered_image = self.main_window.image.filter(ImageFilter.GaussianBlur(radius=2))
-            elif filter_type == "锐化滤波":
-                filtered_image = self.main_window.image.filter(ImageFilter.SHARPEN)
-            # 显示结果
-            q_image = self.main_window.pil_to_qimage(filtered_image)
-            pixmap = QPixmap.fromImage(q_image)
-            self.filtered_image_label.setPixmap(pixmap.scaled(800, 600, Qt.KeepAspectRatio))
-        except Exception as e:
-            self.filtered_image_label.setText(f"滤波出错：{str(e)}")
+    # -------------------------- 滑块参数更新 --------------------------
+    def mean_label_text(self):
+        size = 2 * self.mean_radius + 1
+        return f"均值滤波 - 半径：{self.mean_radius}（窗口{size}x{size}）"
+
+    def update_mean_radius(self, value):
+        """更新均值滤波半径"""
+        self.mean_radius = value
+        self.mean_label.setText(self.mean_label_text())
+        if self.selected_filter == "均值滤波":
+            self.apply_selected_filter(preview=self.mean_slider.isSliderDown())
+
+    def update_gaussian_radius(self, value):
+        """更新高斯滤波半径"""
+        self.gaussian_radius = value
+        self.gaussian_label.setText(f"高斯滤波 - 半径：{self.gaussian_radius}")
+        if self.selected_filter == "高斯滤波":
+            self.apply_selected_filter(preview=self.gaussian_slider.isSliderDown())
+
+    def update_sharpen_amount(self, value):
+        """更新锐化强度（滑块值/10）"""
+        self.sharpen_amount = value / 10.0
+        self.sharpen_label.setText(f"锐化滤波 - 强度：{self.sharpen_amount:.1f}")
+        if self.selected_filter == "锐化滤波":
+            self.apply_selected_filter(preview=self.sharpen_slider.isSliderDown())
+
+    def median_label_text(self):
+        size = 2 * self.median_radius + 1
+        return f"中值滤波 - 半径：{self.median_radius}（窗口{size}x{size}）"
+
+    def update_median_radius(self, value):
+        """更新中值滤波半径"""
+        self.median_radius = value
+        self.median_label.setText(self.median_label_text())
+        if self.selected_filter == "中值滤波（去椒盐噪声）":
+            self.apply_selected_filter(preview=self.median_slider.isSliderDown())
+
+    def update_bilateral_sigma_space(self, value):
+        """更新双边滤波空间标准差"""
+        self.bilateral_sigma_space = value
+        self.bilateral_space_label.setText(f"空间标准差：{self.bilateral_sigma_space}")
+        if self.selected_filter == "双边滤波（保边去噪）":
+            self.apply_selected_filter(preview=self.bilateral_space_slider.isSliderDown())
+
+    def update_bilateral_sigma_color(self, value):
+        """更新双边滤波灰度标准差"""
+        self.bilateral_sigma_color = value
+        self.bilateral_color_label.setText(f"灰度标准差：{self.bilateral_sigma_color}")
+        if self.selected_filter == "双边滤波（保边去噪）":
+            self.apply_selected_filter(preview=self.bilateral_color_slider.isSliderDown())
+
+    def apply_selected_filter(self, preview=False):
+        """按当前选中的滤波和参数重新计算（未选滤波时不处理）"""
+        if self.selected_filter is not None:
+            self.apply_filter(self.selected_filter, preview)
+
+    def apply_filter(self, filter_type, preview=False):
+        """执行空间域滤波（后台线程计算，结果回到界面线程显示）；preview=True时在代理图上预览"""
+        if not self.main_window.image_store.has_image():
+            self.filtered_image_label.setText("请先加载图片！")
+            return
+        task = self.build_filter_task(filter_type, preview)
+        if preview:
+            self.controller.request_preview(task)
+        else:
+            self.controller.request_full(task)
+
+    def filter_params(self, op):
+        """当前的滤波参数（从界面取值）"""
+        if op == "mean":
+            return {"radius": self.mean_radius}
+        if op == "gaussian":
+            return {"radius": self.gaussian_radius}
+        if op == "median":
+            return {"radius": self.median_radius}
+        if op == "bilateral":
+            return {"sigma_space": self.bilateral_sigma_space, "sigma_color": self.bilateral_sigma_color}
+        return {"amount": self.sharpen_amount}
+
+    def build_filter_task(self, filter_type, preview):
+        """生成计算函数（在工作线程执行，返回缩放到显示尺寸的QImage）"""
+        image_store = self.main_window.image_store
+        preview_w, preview_h = self.main_window.preview_size
+        op = self.FILTER_TYPES[filter_type]
+        params = self.filter_params(op)
+        full_task = None if preview else self.build_result_task(op, params)
+
+        def compute():
+            if preview:
+                # 代理图 + 按缩放比例换算后的半径
+                proxy, scale = image_store.proxy("rgb", preview_w, preview_h)
+                op_params = operations.scale_params_for_proxy("spatial", params, scale)
+                filtered = operations.spatial_filter(proxy, op, **op_params)
+            else:
+                filtered = full_task()
+            # 滤波 + 转换/缩放到显示尺寸都在工作线程完成
+            return self.main_window.scaled_qimage(filtered, 800, 600)
+
+        return compute
+
+    def build_result_task(self, op, params):
+        """生成全分辨率计算函数（返回结果数组；同一图像和参数只算一次，显示和导出共用）"""
+        image_store = self.main_window.image_store
+        key = (image_store.version, op, tuple(sorted(params.items())))
+        # 直接在缓存的RGB数组上滤波（大图模式下为内存映射数组），不再经过PIL图像
+        return self.result_cache.task(key, lambda: operations.spatial_filter(image_store.rgb(), op, **params))
+
+    def export_task(self):
+        """导出用的全分辨率结果函数（可在工作线程执行），尚未选择滤波类型时返回None"""
+        if not self.main_window.image_store.has_image() or self.selected_filter is None:
+            return None
+        op = self.FILTER_TYPES[self.selected_filter]
+        return self.build_result_task(op, self.filter_params(op))
+
+    def preview_hovered_filter(self, button):
+        """悬停在未选中的滤波按钮上：用代理图预览该滤波效果"""
+        if not self.main_window.image_store.has_image() or button.text() == self.selected_filter:
+            return
+        self.controller.hover_enter(button, self.build_filter_task(button.text(), preview=True))
+
+    def show_filtered_image(self, q_image):
+        """显示滤波结果（界面线程）"""
+        if q_image is None:
+            self.filtered_image_label.setText("滤波后的图像会显示在这里")
+            return
+        self.filtered_image_label.setPixmap(QPixmap.fromImage(q_image))
+
+    def show_filter_error(self, message):
+        """显示滤波出错信息"""
+        self.filtered_image_label.setText(f"滤波出错：{message}")
 
     def sync_original_image(self):
         """同步主窗口的原始图到Tab2"""
-        if self.main_window.image:
-            q_image = self.main_window.pil_to_qimage(self.main_window.image)
-            pixmap = QPixmap.fromImage(q_image)
-            self.original_image_label_t2.setPixmap(pixmap.scaled(800, 600, Qt.KeepAspectRatio))
+        self.controller.invalidate()  # 旧图片的在途结果不再显示
+        self.result_cache.clear()     # 旧图片的全分辨率结果不再需要
+        if self.main_window.image_store.has_image():
+            self.show_original_image()
+
+    def show_original_image(self):
+        """显示原始图（取金字塔中最近的一层缩放，不缩放整幅原图）"""
+        with stage_profiler.run("空间域滤波 原始图"):
+            q_image = self.main_window.scaled_qimage(self.main_window.image_store.display_level(800, 600), 800, 600)
+            with stage_profiler.stage("display"):
+                self.original_image_label_t2.setPixmap(QPixmap.fromImage(q_image))
 
     def get_layout(self):
         """返回Tab2布局（供主窗口调用）"""
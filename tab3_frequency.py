@@ -1,18 +1,35 @@
-import numpy as np
-import cv2
-from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget
-from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget, QCheckBox
+from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
+from freq_masks import FrequencyMaskEngine
+import operations
+from task_runner import TaskRunner
+from exporter import ResultCache
+from preview import HoverPreviewFilter, PreviewController
+from timing import stage_profiler
+from spectrum_renderer import render_spectrum
 
 class Tab3FrequencyFilter:
+    # 按钮文字 → 滤波类型
+    FILTER_TYPES = {"高斯低通滤波": "lpf", "高斯高通滤波": "hpf", "带阻滤波（去周期噪声）": "band_reject"}
+
     def __init__(self, main_window):
         self.main_window = main_window  # 关联主窗口
+        # 后台滤波计算：全分辨率 + 代理图预览两路，各自合并请求、只显示最新结果
+        self.controller = PreviewController(
+            self.show_filter_result, self.show_filter_error, self.main_window.update_interval_ms, "频域滤波"
+        )
+        self.sync_runner = TaskRunner()   # 后台同步原始图/原始频谱（与滤波互不覆盖）
+        self.result_cache = ResultCache()  # 最近一次全分辨率结果（导出时直接复用）
         self.selected_freq_filter = None  # 选中的频域滤波类型
         # 初始化各滤波参数（默认值）
         self.lpf_cutoff = 30        # 高斯低通：截止频率（10-100可调）
         self.hpf_cutoff = 30        # 高斯高通：截止频率（10-100可调）
         self.br_center_freq = 50     # 带阻滤波：中心频率（20-80可调）
         self.br_bandwidth = 10      # 带阻滤波：带宽（5-30可调）
+        self.mask_engine = FrequencyMaskEngine()  # 滤波器掩膜缓存（距离网格+LRU）
+        self.half_spectrum = True   # 半频谱模式：实数DFT（CCS打包），掩膜只在半平面上计算
+        self.color_mode = False     # 彩色模式：RGB三通道频谱堆叠后一起滤波（否则先转灰度）
         # 固定图像显示尺寸（所有Tab统一，避免切换缩放）
         self.IMAGE_DISPLAY_SIZE = (600, 400)  # 原始图/结果图尺寸（宽x高）
         self.SPECTRUM_DISPLAY_SIZE = (500, 350)  # 频谱图尺寸（宽x高）
@@ -37,6 +54,15 @@ class Tab3FrequencyFilter:
         self.layout.addLayout(self.param_layout)
         self.layout.addLayout(self.spectrum_layout)
         self.layout.setContentsMargins(20, 20, 20, 20)
+        # 后台计算提示（滤波或同步任一在执行时显示）
+        self.busy_label = self.main_window.create_busy_label()
+        self.controller.busy_changed.connect(self.update_busy_label)
+        self.sync_runner.busy_changed.connect(self.update_busy_label)
+        self.layout.addWidget(self.busy_label)
+
+    def update_busy_label(self, _busy=None):
+        """根据后台任务状态显示/隐藏“处理中”提示"""
+        self.busy_label.setVisible(self.controller.busy or self.sync_runner.busy)
 
     def create_image_labels(self):
         """创建原始图和滤波结果图标签（固定尺寸，背景半透白）"""
@@ -91,6 +117,9 @@ class Tab3FrequencyFilter:
         self.band_reject_button.clicked.connect(
             lambda: self.update_freq_button_style(self.band_reject_button)
         )
+        # 悬停预览（在代理图上计算，移出按钮后恢复原结果）
+        self.hover_filter = HoverPreviewFilter(self.preview_hovered_filter, self.controller.hover_leave)
+        self.hover_filter.watch(self.gaussian_lpf_button, self.gaussian_hpf_button, self.band_reject_button)
         # 添加到布局（按钮之间留间距，居中显示）
         self.freq_filter_selector.addStretch()
         self.freq_filter_selector.addWidget(self.gaussian_lpf_button)
@@ -98,6 +127,13 @@ class Tab3FrequencyFilter:
         self.freq_filter_selector.addWidget(self.gaussian_hpf_button)
         self.freq_filter_selector.addSpacing(15)
         self.freq_filter_selector.addWidget(self.band_reject_button)
+        self.freq_filter_selector.addSpacing(15)
+        # 彩色模式（频谱图仍显示亮度分量）
+        self.color_check = QCheckBox("彩色模式")
+        self.color_check.setToolTip("RGB三通道分别滤波后合成彩色结果，频谱图显示亮度分量")
+        self.color_check.setChecked(self.color_mode)
+        self.color_check.toggled.connect(self.update_color_mode)
+        self.freq_filter_selector.addWidget(self.color_check)
         self.freq_filter_selector.addStretch()
         self.image_layout.addLayout(self.freq_filter_selector)
         self.image_layout.addSpacing(30)  # 按钮区与结果图间距
@@ -184,6 +220,10 @@ class Tab3FrequencyFilter:
         self.br_param_layout.addWidget(self.br_bandwidth_slider)
         self.br_param_widget.setVisible(False)
 
+        # 拖动期间在代理图上预览，松开后计算全分辨率结果
+        for slider in (self.lpf_slider, self.hpf_slider, self.br_center_slider, self.br_bandwidth_slider):
+            self.controller.watch_slider(slider, self.apply_freq_filter)
+
         # 将所有参数Widget添加到总参数布局（居中，间距均匀）
         self.param_layout.addStretch()
         self.param_layout.addWidget(self.lpf_param_widget)
@@ -268,176 +308,215 @@ class Tab3FrequencyFilter:
     def update_lpf_param(self, value):
         """更新高斯低通滤波参数（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.freq_filtered_image_label.setText("请先加载图片再调整参数！")
             self.filtered_spectrum_label.setText("请先加载图片再调整参数！")
             return
         self.lpf_cutoff = value
         self.lpf_label.setText(f"高斯低通 - 截止频率：{self.lpf_cutoff}")
         if self.selected_freq_filter == "高斯低通滤波":
-            self.apply_freq_filter()
+            self.apply_freq_filter(preview=self.lpf_slider.isSliderDown())
 
     def update_hpf_param(self, value):
         """更新高斯高通滤波参数（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.freq_filtered_image_label.setText("请先加载图片再调整参数！")
             self.filtered_spectrum_label.setText("请先加载图片再调整参数！")
             return
         self.hpf_cutoff = value
         self.hpf_label.setText(f"高斯高通 - 截止频率：{self.hpf_cutoff}")
         if self.selected_freq_filter == "高斯高通滤波":
-            self.apply_freq_filter()
+            self.apply_freq_filter(preview=self.hpf_slider.isSliderDown())
 
     def update_br_center_param(self, value):
         """更新带阻滤波中心频率（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.freq_filtered_image_label.setText("请先加载图片再调整参数！")
             self.filtered_spectrum_label.setText("请先加载图片再调整参数！")
             return
         self.br_center_freq = value
         self.br_center_label.setText(f"中心频率：{self.br_center_freq}")
         if self.selected_freq_filter == "带阻滤波（去周期噪声）":
-            self.apply_freq_filter()
+            self.apply_freq_filter(preview=self.br_center_slider.isSliderDown())
 
     def update_br_bandwidth_param(self, value):
         """更新带阻滤波带宽（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.freq_filtered_image_label.setText("请先加载图片再调整参数！")
             self.filtered_spectrum_label.setText("请先加载图片再调整参数！")
             return
         self.br_bandwidth = value
         self.br_bandwidth_label.setText(f"带宽：{self.br_bandwidth}")
         if self.selected_freq_filter == "带阻滤波（去周期噪声）":
+            self.apply_freq_filter(preview=self.br_bandwidth_slider.isSliderDown())
+
+    def update_color_mode(self, checked):
+        """切换彩色模式"""
+        self.color_mode = checked
+        if self.selected_freq_filter is not None:
             self.apply_freq_filter()
 
     # -------------------------- 滤波核心逻辑（保留原有校验，优化提示） --------------------------
-    def apply_freq_filter(self):
-        """执行频域滤波（使用固定尺寸显示，避免缩放）"""
+    def apply_freq_filter(self, preview=False):
+        """执行频域滤波（后台线程计算，使用固定尺寸显示，避免缩放）；preview=True时在代理图上预览"""
         # 保险措施：判断图片是否存在（核心校验）
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.freq_filtered_image_label.setText("请先加载图片再执行滤波！")
             self.original_spectrum_label.setText("请先加载图片查看原始频谱！")
             self.filtered_spectrum_label.setText("请先加载图片查看滤波后频谱！")
             return
 
-        try:
-            # 图像格式转换（PIL→OpenCV）
-            cv_image = cv2.cvtColor(np.array(self.main_window.image), cv2.COLOR_RGB2BGR)
-            gray_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-            h, w = gray_image.shape
-
-            # 傅里叶变换（频谱中心化）
-            new_h, new_w = cv2.getOptimalDFTSize(h), cv2.getOptimalDFTSize(w)
-            padded = cv2.copyMakeBorder(gray_image, 0, new_h - h, 0, new_w - w, cv2.BORDER_CONSTANT, value=0)
-            dft = cv2.dft(np.float32(padded), flags=cv2.DFT_COMPLEX_OUTPUT)
-            dft_shift = np.fft.fftshift(dft)
-
-            # 显示原始频谱（按固定尺寸缩放）
-            self.show_spectrum(dft_shift, self.original_spectrum_label)
-
-            # 创建滤波器
-            if self.selected_freq_filter == "高斯低通滤波":
-                filter_mask = self.create_gaussian_lpf(new_h, new_w, cutoff=self.lpf_cutoff)
-            elif self.selected_freq_filter == "高斯高通滤波":
-                filter_mask = self.create_gaussian_hpf(new_h, new_w, cutoff=self.hpf_cutoff)
-            elif self.selected_freq_filter == "带阻滤波（去周期噪声）":
-                filter_mask = self.create_band_reject_filter(
-                    new_h, new_w, 
-                    center_freq=self.br_center_freq, 
-                    bandwidth=self.br_bandwidth
+        if self.selected_freq_filter is None:
+            return
+        task = self.build_filter_task(self.selected_freq_filter, preview)
+        if preview:
+            self.controller.request_preview(task)
+        else:
+            self.controller.request_full(task)
+
+    def filter_params(self, filter_type):
+        """当前的滤波参数（从界面取值）"""
+        return {
+            "cutoff": self.lpf_cutoff if filter_type == "lpf" else self.hpf_cutoff,
+            "center_freq": self.br_center_freq,
+            "bandwidth": self.br_bandwidth,
+        }
+
+    def build_filter_task(self, filter_text, preview):
+        """生成计算函数（在工作线程执行，返回（结果QImage, 滤波后对数幅度谱））"""
+        # 在界面线程取好参数，工作线程只做计算
+        filter_type = self.FILTER_TYPES[filter_text]
+        params = self.filter_params(filter_type)
+        half = self.half_spectrum
+        source = "rgb" if self.color_mode else "gray"
+        image_store = self.main_window.image_store
+        preview_w, preview_h = self.main_window.preview_size
+        full_task = None if preview else self.build_result_task(filter_type, params)
+
+        def compute():
+            if preview:
+                # 代理图：现场做一次小尺寸正变换，截止频率按填充尺寸修正
+                image, _ = image_store.proxy(source, preview_w, preview_h)
+                op_params = operations.scale_params_for_proxy(
+                    "frequency", params, None, full_shape=image_store.size()[::-1], proxy_shape=image.shape
                 )
-
-            # 频谱滤波 + 显示滤波后频谱（固定尺寸）
-            filtered_dft = dft_shift * filter_mask[:, :, np.newaxis]
-            self.show_spectrum(filtered_dft, self.filtered_spectrum_label)
-
-            # 逆傅里叶变换（得到滤波后图像）
-            dft_ishift = np.fft.ifftshift(filtered_dft)
-            idft = cv2.idft(dft_ishift)
-            result = cv2.magnitude(idft[:, :, 0], idft[:, :, 1])
-            result = cv2.normalize(result, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-            result = result[:h, :w]
-
-            # 显示滤波后图像（按固定尺寸缩放，保持比例）
-            from PIL import Image
-            pil_result = Image.fromarray(result)
-            q_image = self.main_window.pil_to_qimage(pil_result)
-            # 强制按固定尺寸缩放，KeepAspectRatio确保不拉伸
-            self.freq_filtered_image_label.setPixmap(
-                QPixmap.fromImage(q_image).scaled(
-                    self.IMAGE_DISPLAY_SIZE[0], self.IMAGE_DISPLAY_SIZE[1], 
-                    Qt.KeepAspectRatio, Qt.SmoothTransformation  # 平滑缩放，避免锯齿
+                result, spectrum_log = operations.frequency_filter(
+                    image, filter_type, half=half, mask_engine=self.mask_engine,
+                    spectrum_size=self.SPECTRUM_DISPLAY_SIZE, **op_params
                 )
+            else:
+                result, spectrum_log = full_task()
+            # 滤波后图像按固定尺寸平滑缩放（KeepAspectRatio确保不拉伸）
+            q_image = self.main_window.scaled_qimage(
+                result, self.IMAGE_DISPLAY_SIZE[0], self.IMAGE_DISPLAY_SIZE[1], smooth=True
+            )
+            return q_image, spectrum_log
+
+        return compute
+
+    def build_result_task(self, filter_type, params):
+        """生成全分辨率计算函数，返回（结果数组, 滤波后对数幅度谱）；同一图像和参数只算一次，显示和导出共用"""
+        half = self.half_spectrum
+        color = self.color_mode
+        image_store = self.main_window.image_store
+        spectrum_service = self.main_window.spectrum_service
+        key = (image_store.version, filter_type, tuple(sorted(params.items())), half, color)
+
+        def compute():
+            # 缓存的灰度图/RGB图 + 缓存的频谱（同一图像只做一次正变换），参数变化只需掩膜相乘+一次逆变换
+            spectrum = spectrum_service.packed_dft(color) if half else spectrum_service.dft(color)
+            return operations.frequency_filter(
+                image_store.rgb() if color else image_store.gray(), filter_type, spectrum=spectrum, half=half, mask_engine=self.mask_engine,
+                spectrum_size=self.SPECTRUM_DISPLAY_SIZE, **params
             )
 
-        except Exception as e:
-            err_msg = f"出错：{str(e)}"
-            self.freq_filtered_image_label.setText(err_msg)
-            self.original_spectrum_label.setText(err_msg)
-            self.filtered_spectrum_label.setText(err_msg)
-
-    def show_spectrum(self, dft_data, label):
-        """显示频域频谱（按固定尺寸缩放，对数缩放优化）"""
-        magnitude = 20 * np.log(cv2.magnitude(dft_data[:, :, 0], dft_data[:, :, 1]) + 1)
-        magnitude = cv2.normalize(magnitude, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U)
-        # 按固定频谱尺寸缩放，保持比例
-        magnitude_resized = cv2.resize(
-            magnitude, self.SPECTRUM_DISPLAY_SIZE, 
-            interpolation=cv2.INTER_LINEAR  # 线性插值，保证频谱清晰度
-        )
-        spectrum_qimg = QImage(
-            magnitude_resized.data, magnitude_resized.shape[1], magnitude_resized.shape[0],
-            magnitude_resized.strides[0], QImage.Format_Grayscale8
-        )
-        label.setPixmap(QPixmap.fromImage(spectrum_qimg))
+        return self.result_cache.task(key, compute)
+
+    def export_task(self):
+        """导出用的全分辨率结果函数（可在工作线程执行），尚未选择滤波类型时返回None"""
+        if not self.main_window.image_store.has_image() or self.selected_freq_filter is None:
+            return None
+        filter_type = self.FILTER_TYPES[self.selected_freq_filter]
+        task = self.build_result_task(filter_type, self.filter_params(filter_type))
+        return lambda: task()[0]
+
+    def preview_hovered_filter(self, button):
+        """悬停在未选中的滤波按钮上：用代理图预览该滤波效果"""
+        if not self.main_window.image_store.has_image() or button.text() == self.selected_freq_filter:
+            return
+        self.controller.hover_enter(button, self.build_filter_task(button.text(), preview=True))
+
+    def show_filter_result(self, result):
+        """显示滤波后图像和滤波后频谱（界面线程）"""
+        if result is None:
+            self.freq_filtered_image_label.setText("滤波后的图像会显示在这里")
+            self.filtered_spectrum_label.setText("滤波后频域频谱")
+            return
+        q_image, spectrum_log = result
+        self.freq_filtered_image_label.setPixmap(QPixmap.fromImage(q_image))
+        self.show_magnitude(spectrum_log, self.filtered_spectrum_label)
+
+    def show_filter_error(self, message):
+        """显示滤波出错信息"""
+        err_msg = f"出错：{message}"
+        self.freq_filtered_image_label.setText(err_msg)
+        self.filtered_spectrum_label.setText(err_msg)
+
+    def show_magnitude(self, magnitude, label):
+        """显示已取对数的幅度谱（归一化到0-255后按固定尺寸缩放）"""
+        import cv2
+        # 按固定频谱尺寸缩放（已是该尺寸时不再插值）
+        if (magnitude.shape[1], magnitude.shape[0]) != tuple(self.SPECTRUM_DISPLAY_SIZE):
+            magnitude = cv2.resize(
+                magnitude, self.SPECTRUM_DISPLAY_SIZE,
+                interpolation=cv2.INTER_LINEAR  # 线性插值，保证频谱清晰度
+            )
+        label.setPixmap(QPixmap.fromImage(render_spectrum(magnitude)))
 
     def sync_original_image(self):
-        """同步主窗口的原始图和原始频谱到Tab3（固定尺寸显示）"""
+        """同步主窗口的原始图和原始频谱到Tab3（后台计算正变换，固定尺寸显示）"""
+        self.controller.invalidate()  # 旧图片的在途滤波结果不再显示
+        self.result_cache.clear()     # 旧图片的全分辨率结果不再需要
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.original_image_label_t3.setText("请先加载图片！")
             self.original_spectrum_label.setText("请先加载图片查看原始频谱！")
             return
-        # 同步原始图（固定尺寸，平滑缩放）
-        q_image = self.main_window.pil_to_qimage(self.main_window.image)
-        self.original_image_label_t3.setPixmap(
-            QPixmap.fromImage(q_image).scaled(
-                self.IMAGE_DISPLAY_SIZE[0], self.IMAGE_DISPLAY_SIZE[1],
-                Qt.KeepAspectRatio, Qt.SmoothTransformation
+        self.show_original_image()
+        half = self.half_spectrum
+        spectrum_service = self.main_window.spectrum_service
+
+        def compute():
+            # 原始频谱（正变换结果会被缓存，之后的滤波直接复用）
+            with stage_profiler.run("频域滤波 原始频谱"):
+                if half:
+                    return spectrum_service.display_log_magnitude(self.SPECTRUM_DISPLAY_SIZE)
+                import cv2
+                return cv2.resize(spectrum_service.log_magnitude(), self.SPECTRUM_DISPLAY_SIZE,
+                                  interpolation=cv2.INTER_LINEAR)
+
+        self.sync_runner.submit(compute, self.show_original, self.show_original_error)
+
+    def show_original_image(self):
+        """显示原始图（取金字塔中最近的一层，固定尺寸平滑缩放）"""
+        w, h = self.IMAGE_DISPLAY_SIZE
+        with stage_profiler.run("频域滤波 原始图"):
+            q_image = self.main_window.scaled_qimage(
+                self.main_window.image_store.display_level(w, h), w, h, smooth=True
             )
-        )
-        # 同步原始频谱（固定尺寸）
-        cv_image = cv2.cvtColor(np.array(self.main_window.image), cv2.COLOR_RGB2BGR)
-        gray_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-        new_h, new_w = cv2.getOptimalDFTSize(gray_image.shape[0]), cv2.getOptimalDFTSize(gray_image.shape[1])
-        padded = cv2.copyMakeBorder(gray_image, 0, new_h - gray_image.shape[0], 0, new_w - gray_image.shape[1], cv2.BORDER_CONSTANT, value=0)
-        dft = cv2.dft(np.float32(padded), flags=cv2.DFT_COMPLEX_OUTPUT)
-        dft_shift = np.fft.fftshift(dft)
-        self.show_spectrum(dft_shift, self.original_spectrum_label)
-
-    # -------------------------- 滤波器创建方法 --------------------------
-    def create_gaussian_lpf(self, h, w, cutoff):
-        """高斯低通滤波器"""
-        x, y = np.meshgrid(np.arange(w), np.arange(h))
-        cx, cy = w // 2, h // 2
-        distance = np.sqrt((x - cx)**2 + (y - cy)**2)
-        return np.exp(-(distance**2) / (2 * cutoff**2))
-
-    def create_gaussian_hpf(self, h, w, cutoff):
-        """高斯高通滤波器"""
-        return 1 - self.create_gaussian_lpf(h, w, cutoff)
-
-    def create_band_reject_filter(self, h, w, center_freq, bandwidth):
-        """高斯带阻滤波器"""
-        x, y = np.meshgrid(np.arange(w), np.arange(h))
-        cx, cy = w // 2, h // 2
-        distance = np.sqrt((x - cx)**2 + (y - cy)**2)
-        band_pass = np.exp(-((distance - center_freq)**2) / (2 * (bandwidth/2)**2)) - \
-                    np.exp(-((distance + center_freq)**2) / (2 * (bandwidth/2)**2))
-        return 1 - band_pass
+            with stage_profiler.stage("display"):
+                self.original_image_label_t3.setPixmap(QPixmap.fromImage(q_image))
+
+    def show_original(self, log_magnitude):
+        """显示原始频谱（界面线程）"""
+        self.show_magnitude(log_magnitude, self.original_spectrum_label)
+
+    def show_original_error(self, message):
+        """显示原始频谱计算出错信息"""
+        self.original_spectrum_label.setText(f"出错：{message}")
 
     def get_layout(self):
         """返回Tab3布局（供主窗口调用）"""
@@ -1,14 +1,47 @@
-import cv2
-import numpy as np
-from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget
+from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget, QComboBox, QCheckBox
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt
+import operations
+import tiling
+from exporter import ResultCache
+from morph_engine import MorphologyEngine
+from preview import HoverPreviewFilter, PreviewController
+from timing import stage_profiler
 
 class Tab4Morphology:
+    # 按钮文字 → 形态学操作
+    MORPH_OPS = {
+        "腐蚀": "erode",
+        "膨胀": "dilate",
+        "开运算（先腐蚀后膨胀）": "open",
+        "闭运算（先膨胀后腐蚀）": "close",
+        "形态学梯度（膨胀-腐蚀）": "gradient",
+        "顶帽（原图-开运算）": "tophat",
+        "黑帽（闭运算-原图）": "blackhat",
+        "重建开运算": "open_rec",
+    }
+    # 结构元素形状 → 下拉框显示文字
+    SHAPE_LABELS = {"rect": "矩形", "ellipse": "椭圆", "cross": "十字形", "disk": "圆盘", "line": "直线"}
+    # 大核灰度圆盘使用八边形近似（见operations._fast_reduce），在选项和下拉框的提示中说明
+    DISK_HINT = (f"核大小≥{operations.FAST_MORPH_MIN_SIZE}时，灰度图按正八边形近似计算（快得多，灰度变化剧烈处"
+                 "与精确圆盘可相差数十个灰度级），二值图仍为精确结果；需要精确结果请选择椭圆")
+    ANGLE_STEP = 15  # 直线角度步长（度）
+
     def __init__(self, main_window):
         self.main_window = main_window  # 关联主窗口
+        # 后台计算：全分辨率 + 代理图预览两路，各自合并请求、只显示最新结果
+        self.controller = PreviewController(
+            self.show_morph_result, self.show_morph_error, self.main_window.update_interval_ms, "形态学处理"
+        )
         self.selected_morph_op = None   # 选中的形态学操作类型
-        self.kernel_size = 5            # 形态学核大小（默认5x5，3-21奇数可调）
+        self.result_cache = ResultCache()  # 最近一次全分辨率结果（导出时直接复用）
+        # 腐蚀/膨胀等中间结果缓存（全分辨率分块并行；代理图单独一份，悬停切换操作时复用）
+        self.morph_engine = MorphologyEngine(tiling.tiled_operation)
+        self.preview_engine = MorphologyEngine(tiling.tiled_operation)
+        self.kernel_size = 5            # 形态学核大小（默认5x5，3-201奇数可调）
+        self.kernel_shape = "rect"      # 结构元素形状（见operations.MORPH_SHAPES）
+        self.line_angle = 0             # 直线结构元素的角度（0-165度）
+        self.color_mode = False         # 彩色模式：RGB三通道在同一次调用中处理（否则先转灰度）
         self.init_ui()                  # 构建Tab4界面
 
     def init_ui(self):
@@ -18,12 +51,16 @@ class Tab4Morphology:
         self.image_layout = QHBoxLayout()
         self.create_image_labels()
         self.create_morph_buttons()
-        # 第二行：核大小调节滑块（所有操作共用一个核大小）
+        # 第二行：结构元素形状 + 核大小/角度滑块（所有操作共用同一个结构元素）
         self.param_layout = QHBoxLayout()
         self.create_kernel_slider()
         # 组装布局
         self.layout.addLayout(self.image_layout)
         self.layout.addLayout(self.param_layout)
+        # 后台计算提示
+        self.busy_label = self.main_window.create_busy_label()
+        self.controller.busy_changed.connect(self.busy_label.setVisible)
+        self.layout.addWidget(self.busy_label)
 
     def create_image_labels(self):
         """创建原始图和处理结果图标签"""
@@ -44,36 +81,37 @@ class Tab4Morphology:
         self.image_layout.addWidget(self.original_image_label_t4)
 
     def create_morph_buttons(self):
-        """创建4个形态学操作按钮"""
-        self.morph_selector = QVBoxLayout()
+        """创建形态学操作按钮（4个基本操作 + 4个派生操作，分两列）"""
+        self.morph_selector = QHBoxLayout()
         self.erode_button = QPushButton("腐蚀")
         self.dilate_button = QPushButton("膨胀")
         self.open_button = QPushButton("开运算（先腐蚀后膨胀）")
         self.close_button = QPushButton("闭运算（先膨胀后腐蚀）")
-        # 设置按钮样式（复用全局样式，长按钮调整最大宽度）
-        self.main_window.set_button_style(self.erode_button)
-        self.main_window.set_button_style(self.dilate_button)
-        self.main_window.set_button_style(self.open_button)
-        self.main_window.set_button_style(self.close_button)
-        self.open_button.setStyleSheet(self.open_button.styleSheet() + "max-width: 180px;")
-        self.close_button.setStyleSheet(self.close_button.styleSheet() + "max-width: 180px;")
-        # 绑定点击事件
-        self.erode_button.clicked.connect(lambda: self.update_button_style(self.erode_button))
-        self.dilate_button.clicked.connect(lambda: self.update_button_style(self.dilate_button))
-        self.open_button.clicked.connect(lambda: self.update_button_style(self.open_button))
-        self.close_button.clicked.connect(lambda: self.update_button_style(self.close_button))
-        # 添加到布局（居中）
-        self.morph_selector.addStretch()
-        self.morph_selector.addWidget(self.erode_button)
-        self.morph_selector.addWidget(self.dilate_button)
-        self.morph_selector.addWidget(self.open_button)
-        self.morph_selector.addWidget(self.close_button)
-        self.morph_selector.addStretch()
+        self.gradient_button = QPushButton("形态学梯度（膨胀-腐蚀）")
+        self.tophat_button = QPushButton("顶帽（原图-开运算）")
+        self.blackhat_button = QPushButton("黑帽（闭运算-原图）")
+        self.open_rec_button = QPushButton("重建开运算")
+        self.morph_buttons = (self.erode_button, self.dilate_button, self.open_button, self.close_button,
+                              self.gradient_button, self.tophat_button, self.blackhat_button, self.open_rec_button)
+        for column_buttons in (self.morph_buttons[:4], self.morph_buttons[4:]):
+            column = QVBoxLayout()
+            column.addStretch()
+            for button in column_buttons:
+                # 设置按钮样式（复用全局样式，长按钮调整最大宽度）+ 绑定点击事件
+                self.main_window.set_button_style(button)
+                button.setStyleSheet(button.styleSheet() + "max-width: 180px;")
+                button.clicked.connect(lambda _, b=button: self.update_button_style(b))
+                column.addWidget(button)
+            column.addStretch()
+            self.morph_selector.addLayout(column)
+        # 悬停预览（在代理图上计算，移出按钮后恢复原结果）
+        self.hover_filter = HoverPreviewFilter(self.preview_hovered_op, self.controller.hover_leave)
+        self.hover_filter.watch(*self.morph_buttons)
         self.image_layout.addLayout(self.morph_selector)
         self.image_layout.addWidget(self.morph_result_label)
 
     def create_kernel_slider(self):
-        """创建核大小调节滑块（3-21奇数，保证形态学操作对称性）"""
+        """创建结构元素形状选择和核大小/角度调节滑块（核大小3-201奇数，保证形态学操作对称性）"""
         slider_style = """
             QSlider::groove:horizontal {
                 border: 1px solid #B0B0B0;
@@ -95,32 +133,67 @@ class Tab4Morphology:
                 margin-bottom: 5px;
             }
         """
+        # 结构元素形状
+        self.shape_param_widget = QWidget()
+        self.shape_param_layout = QVBoxLayout(self.shape_param_widget)
+        self.shape_label = QLabel("结构元素形状")
+        self.shape_label.setStyleSheet("font-size: 13px; color: #222222; margin-bottom: 5px;")
+        self.shape_combo = QComboBox()
+        for shape in operations.MORPH_SHAPES:
+            self.shape_combo.addItem(self.SHAPE_LABELS[shape], shape)
+        self.shape_combo.setItemData(self.shape_combo.findData("disk"), self.DISK_HINT, Qt.ToolTipRole)
+        self.shape_combo.currentIndexChanged.connect(self.update_kernel_shape)
+        self.color_check = QCheckBox("彩色模式（按RGB通道处理）")
+        self.color_check.setChecked(self.color_mode)
+        self.color_check.toggled.connect(self.update_color_mode)
+        self.shape_param_layout.addWidget(self.shape_label)
+        self.shape_param_layout.addWidget(self.shape_combo)
+        self.shape_param_layout.addWidget(self.color_check)
         # 核大小参数容器
         self.kernel_param_widget = QWidget()
         self.kernel_param_layout = QVBoxLayout(self.kernel_param_widget)
-        self.kernel_label = QLabel(f"形态学核大小：{self.kernel_size}x{self.kernel_size}（奇数）")
+        self.kernel_label = QLabel(self.kernel_label_text())
         self.kernel_slider = QSlider(Qt.Horizontal)
-        self.kernel_slider.setRange(3, 21)  # 核大小范围：3-21
+        self.kernel_slider.setRange(3, 201)  # 核大小范围：3-201（半径最大100）
         self.kernel_slider.setSingleStep(2)  # 步长2，保证奇数
         self.kernel_slider.setValue(self.kernel_size)
         self.kernel_slider.setStyleSheet(slider_style)
+        self.kernel_slider.setFixedWidth(300)  # 固定滑块宽度
         self.kernel_slider.valueChanged.connect(self.update_kernel_size)
         # 添加到布局
         self.kernel_param_layout.addWidget(self.kernel_label)
         self.kernel_param_layout.addWidget(self.kernel_slider)
         self.kernel_param_widget.setVisible(True)  # 未选操作时隐藏
+        # 直线角度（只在选择直线时显示）
+        self.angle_param_widget = QWidget()
+        self.angle_param_layout = QVBoxLayout(self.angle_param_widget)
+        self.angle_label = QLabel(f"直线角度：{self.line_angle}°")
+        self.angle_slider = QSlider(Qt.Horizontal)
+        self.angle_slider.setRange(0, 180 // self.ANGLE_STEP - 1)  # 滑块值×15度
+        self.angle_slider.setValue(self.line_angle // self.ANGLE_STEP)
+        self.angle_slider.setStyleSheet(slider_style)
+        self.angle_slider.setFixedWidth(200)  # 固定滑块宽度
+        self.angle_slider.valueChanged.connect(self.update_line_angle)
+        self.angle_param_layout.addWidget(self.angle_label)
+        self.angle_param_layout.addWidget(self.angle_slider)
+        self.angle_param_widget.setVisible(False)
+        # 拖动期间在代理图上预览，松开后计算全分辨率结果
+        self.controller.watch_slider(self.kernel_slider, self.apply_morph_operation)
+        self.controller.watch_slider(self.angle_slider, self.apply_morph_operation)
         # 总参数布局（居中）
         self.param_layout.addStretch()
+        self.param_layout.addWidget(self.shape_param_widget)
+        self.param_layout.addSpacing(20)
         self.param_layout.addWidget(self.kernel_param_widget)
+        self.param_layout.addWidget(self.angle_param_widget)
         self.param_layout.addStretch()
 
     def update_button_style(self, clicked_button):
         """更新按钮选中状态（橙色渐变）+ 显示滑块"""
         # 1. 恢复所有按钮默认样式
-        self.main_window.set_button_style(self.erode_button)
-        self.main_window.set_button_style(self.dilate_button)
-        self.main_window.set_button_style(self.open_button)
-        self.main_window.set_button_style(self.close_button)
+        for button in self.morph_buttons:
+            self.main_window.set_button_style(button)
+            button.setStyleSheet(button.styleSheet() + "max-width: 180px;")
         # 2. 显示核大小滑块
         self.kernel_param_widget.setVisible(True)
         # 3. 设置选中按钮样式（适配长按钮）
@@ -147,55 +220,132 @@ class Tab4Morphology:
         self.selected_morph_op = clicked_button.text()
         self.apply_morph_operation()
 
+    def kernel_label_text(self):
+        return f"形态学核大小：{self.kernel_size}x{self.kernel_size}（半径{self.kernel_size // 2}）"
+
     def update_kernel_size(self, value):
         """更新核大小（强制奇数）并实时刷新效果"""
-        self.kernel_size = value
-        self.kernel_label.setText(f"形态学核大小：{self.kernel_size}x{self.kernel_size}（奇数）")
+        self.kernel_size = value if value % 2 == 1 else value + 1
+        self.kernel_label.setText(self.kernel_label_text())
         if self.selected_morph_op:  # 选中操作后才刷新
+            self.apply_morph_operation(preview=self.kernel_slider.isSliderDown())
+
+    def update_kernel_shape(self, index):
+        """切换结构元素形状（直线时显示角度滑块）"""
+        self.kernel_shape = self.shape_combo.itemData(index)
+        self.shape_combo.setToolTip(self.DISK_HINT if self.kernel_shape == "disk" else "")
+        self.angle_param_widget.setVisible(self.kernel_shape == "line")
+        if self.selected_morph_op:
             self.apply_morph_operation()
 
-    def apply_morph_operation(self):
-        """执行形态学操作（基于OpenCV）"""
-        if not self.main_window.image:
+    def update_line_angle(self, value):
+        """更新直线结构元素的角度"""
+        self.line_angle = value * self.ANGLE_STEP
+        self.angle_label.setText(f"直线角度：{self.line_angle}°")
+        if self.selected_morph_op and self.kernel_shape == "line":
+            self.apply_morph_operation(preview=self.angle_slider.isSliderDown())
+
+    def update_color_mode(self, checked):
+        """切换彩色模式"""
+        self.color_mode = checked
+        if self.selected_morph_op:
+            self.apply_morph_operation()
+
+    def apply_morph_operation(self, preview=False):
+        """执行形态学操作（基于OpenCV，后台线程计算）；preview=True时在代理图上预览"""
+        if not self.main_window.image_store.has_image():
             self.morph_result_label.setText("请先加载图片！")
             return
+        if self.selected_morph_op is None:
+            return
+        task = self.build_morph_task(self.selected_morph_op, preview)
+        if preview:
+            self.controller.request_preview(task)
+        else:
+            self.controller.request_full(task)
+
+    def build_morph_task(self, op_text, preview):
+        """生成计算函数（在工作线程执行，返回缩放到显示尺寸的QImage）"""
+        # 在界面线程取好参数，工作线程只做计算
+        image_store = self.main_window.image_store
+        preview_w, preview_h = self.main_window.preview_size
+        op = self.MORPH_OPS[op_text]
+        params = self.morph_params()
+        source = "rgb" if params.get("color") else "gray"
+        full_task = None if preview else self.build_result_task(op, params)
+
+        def compute():
+            # 1. 预览时取灰度/RGB代理图并按比例缩小核（中间结果按代理图缓存），否则取全分辨率结果
+            if preview:
+                image, scale = image_store.proxy(source, preview_w, preview_h)
+                op_params = operations.scale_params_for_proxy("morphology", params, scale)
+                result = self.preview_engine.run((image_store.version, image.shape), image, op, **op_params)
+            else:
+                result = full_task()
+            # 2. 直接包装成QImage（单通道或RGB）并缩放到显示尺寸
+            return self.main_window.scaled_qimage(result, 800, 600)
+
+        return compute
+
+    def morph_params(self):
+        """当前的形态学参数（从界面取值；角度只对直线有效，其余形状不放入参数，避免无谓的缓存失效；
+        彩色模式时加上color=True，见operations.apply_operation）"""
+        params = {"kernel_size": self.kernel_size, "shape": self.kernel_shape}
+        if self.kernel_shape == "line":
+            params["angle"] = self.line_angle
+        if self.color_mode:
+            params["color"] = True
+        return params
+
+    def build_result_task(self, op, params):
+        """生成全分辨率计算函数（返回结果数组；同一图像和参数只算一次，显示和导出共用）"""
+        image_store = self.main_window.image_store
+        key = (image_store.version, op, tuple(sorted(params.items())))
+        # 缓存的灰度图（彩色模式为RGB图）；大图分块并行，结果与整图计算一致；
+        # 腐蚀/膨胀等中间结果由morph_engine缓存，切换派生操作时直接复用
+        source = image_store.rgb if params.get("color") else image_store.gray
+        return self.result_cache.task(
+            key, lambda: self.morph_engine.run(image_store.version, source(), op, **params)
+        )
+
+    def export_task(self):
+        """导出用的全分辨率结果函数（可在工作线程执行），尚未选择操作时返回None"""
+        if not self.main_window.image_store.has_image() or self.selected_morph_op is None:
+            return None
+        return self.build_result_task(self.MORPH_OPS[self.selected_morph_op], self.morph_params())
+
+    def preview_hovered_op(self, button):
+        """悬停在未选中的操作按钮上：用代理图预览该操作效果"""
+        if not self.main_window.image_store.has_image() or button.text() == self.selected_morph_op:
+            return
+        self.controller.hover_enter(button, self.build_morph_task(button.text(), preview=True))
+
+    def show_morph_result(self, q_image):
+        """显示处理结果（界面线程）"""
+        if q_image is None:
+            self.morph_result_label.setText("形态学处理结果会显示在这里")
+            return
+        self.morph_result_label.setPixmap(QPixmap.fromImage(q_image))
 
-        try:
-            # 1. 图像格式转换（PIL→OpenCV）
-            cv_image = cv2.cvtColor(np.array(self.main_window.image), cv2.COLOR_RGB2BGR)
-            gray_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)  # 形态学操作基于灰度图
-
-            # 2. 创建形态学核（正方形结构元素）
-            kernel = np.ones((self.kernel_size, self.kernel_size), np.uint8)
-
-            # 3. 根据选中操作执行形态学处理
-            if self.selected_morph_op == "腐蚀":
-                result = cv2.erode(gray_image, kernel, iterations=1)
-            elif self.selected_morph_op == "膨胀":
-                result = cv2.dilate(gray_image, kernel, iterations=1)
-            elif self.selected_morph_op == "开运算（先腐蚀后膨胀）":
-                result = cv2.morphologyEx(gray_image, cv2.MORPH_OPEN, kernel)
-            elif self.selected_morph_op == "闭运算（先膨胀后腐蚀）":
-                result = cv2.morphologyEx(gray_image, cv2.MORPH_CLOSE, kernel)
-
-            # 4. 格式转回QImage并显示
-            from PIL import Image
-            pil_result = Image.fromarray(result)
-            q_image = self.main_window.pil_to_qimage(pil_result)
-            self.morph_result_label.setPixmap(
-                QPixmap.fromImage(q_image).scaled(800, 600, Qt.KeepAspectRatio)
-            )
-
-        except Exception as e:
-            self.morph_result_label.setText(f"处理出错：{str(e)}")
+    def show_morph_error(self, message):
+        """显示处理出错信息"""
+        self.morph_result_label.setText(f"处理出错：{message}")
 
     def sync_original_image(self):
         """同步主窗口的原始图到Tab4"""
-        if self.main_window.image:
-            q_image = self.main_window.pil_to_qimage(self.main_window.image)
-            self.original_image_label_t4.setPixmap(
-                QPixmap.fromImage(q_image).scaled(800, 600, Qt.KeepAspectRatio)
-            )
+        self.controller.invalidate()  # 旧图片的在途结果不再显示
+        self.result_cache.clear()     # 旧图片的全分辨率结果不再需要
+        self.morph_engine.clear()     # 旧图片的中间结果同理
+        self.preview_engine.clear()
+        if self.main_window.image_store.has_image():
+            self.show_original_image()
+
+    def show_original_image(self):
+        """显示原始图（取金字塔中最近的一层缩放，不缩放整幅原图）"""
+        with stage_profiler.run("形态学处理 原始图"):
+            q_image = self.main_window.scaled_qimage(self.main_window.image_store.display_level(800, 600), 800, 600)
+            with stage_profiler.stage("display"):
+                self.original_image_label_t4.setPixmap(QPixmap.fromImage(q_image))
 
     def get_layout(self):
         """返回Tab4布局（供主窗口调用）"""
@@ -1,18 +1,44 @@
-import cv2
-import numpy as np
-from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget, QGroupBox, QSizePolicy
+from PyQt5.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QWidget, QGroupBox, QSizePolicy,
+                             QCheckBox)
 from PyQt5.QtGui import QPixmap, QImage
 from PyQt5.QtCore import Qt
+import operations
+from edge_engine import EdgeEngine
+from exporter import ResultCache
+from preview import HoverPreviewFilter, PreviewController
+from task_runner import TaskRunner
+from timing import stage_profiler
 
 class Tab5EdgeDetection:
+    # 按钮文字 → 边缘检测算法
+    EDGE_OPS = {
+        "Sobel 水平边缘": "sobel_x",
+        "Sobel 垂直边缘": "sobel_y",
+        "Sobel 梯度幅值": "sobel_mag",
+        "Sobel 梯度方向": "sobel_dir",
+        "Canny 边缘检测": "canny",
+        "Laplacian 边缘": "laplacian",
+    }
+
     def __init__(self, main_window):
         self.main_window = main_window  # 关联主窗口
+        # 后台计算：全分辨率 + 代理图预览两路，各自合并请求、只显示最新结果
+        self.controller = PreviewController(
+            self.show_edge_result, self.show_edge_error, self.main_window.update_interval_ms, "边缘检测"
+        )
         self.selected_edge_op = None    # 选中的边缘检测类型
+        self.result_cache = ResultCache()  # 最近一次全分辨率结果（导出时直接复用）
+        # 模糊图和Sobel导数缓存（全分辨率分块并行；代理图单独一份），切换Sobel各视图时不重新卷积
+        self.edge_engine = EdgeEngine()
+        self.preview_engine = EdgeEngine(tiled=False)
+        self.threshold_runner = TaskRunner()  # 后台计算自动阈值（与检测互不覆盖）
         # 初始化各算法参数（默认值）
         self.sobel_ksize = 3            # Sobel：孔径大小（3-7奇数可调）
         self.canny_low_thresh = 50       # Canny：低阈值（10-200可调）
         self.canny_high_thresh = 150     # Canny：高阈值（50-300可调）
+        self.canny_incremental = True    # Canny：增量计算（调阈值时复用缓存的导数）
         self.laplacian_ksize = 3         # Laplacian：孔径大小（3-7奇数可调）
+        self.color_mode = False          # 彩色模式：RGB三通道在同一次调用中处理（否则先转灰度）
         # 固定显示尺寸（与Tab2/Tab3/Tab4统一）
         self.IMAGE_DISPLAY_SIZE = (600, 400)
         self.init_ui()                  # 构建Tab5界面
@@ -32,6 +58,10 @@ class Tab5EdgeDetection:
         self.layout.addLayout(self.image_layout)
         self.layout.addLayout(self.param_layout)
         self.layout.setContentsMargins(20, 20, 20, 20)
+        # 后台计算提示
+        self.busy_label = self.main_window.create_busy_label()
+        self.controller.busy_changed.connect(self.busy_label.setVisible)
+        self.layout.addWidget(self.busy_label)
 
     def create_image_labels(self):
         """创建原始图和结果图标签（固定尺寸）"""
@@ -61,33 +91,36 @@ class Tab5EdgeDetection:
         self.image_layout.addSpacing(30)
 
     def create_edge_buttons(self):
-        """创建4个边缘检测按钮（统一宽度）"""
+        """创建6个边缘检测按钮（统一宽度）"""
         self.edge_selector = QVBoxLayout()
         self.sobel_x_button = QPushButton("Sobel 水平边缘")
         self.sobel_y_button = QPushButton("Sobel 垂直边缘")
+        self.sobel_mag_button = QPushButton("Sobel 梯度幅值")
+        self.sobel_dir_button = QPushButton("Sobel 梯度方向")
         self.canny_button = QPushButton("Canny 边缘检测")
         self.laplacian_button = QPushButton("Laplacian 边缘")
-        # 设置按钮样式（统一最大宽度）
-        self.main_window.set_button_style(self.sobel_x_button)
-        self.main_window.set_button_style(self.sobel_y_button)
-        self.main_window.set_button_style(self.canny_button)
-        self.main_window.set_button_style(self.laplacian_button)
-        for btn in [self.sobel_x_button, self.sobel_y_button, self.canny_button, self.laplacian_button]:
+        self.edge_buttons = [self.sobel_x_button, self.sobel_y_button, self.sobel_mag_button, self.sobel_dir_button,
+                             self.canny_button, self.laplacian_button]
+        # 设置按钮样式（统一最大宽度）+ 绑定点击事件
+        for btn in self.edge_buttons:
+            self.main_window.set_button_style(btn)
             btn.setMaximumWidth(180)
-        # 绑定点击事件
-        self.sobel_x_button.clicked.connect(lambda: self.update_button_style(self.sobel_x_button))
-        self.sobel_y_button.clicked.connect(lambda: self.update_button_style(self.sobel_y_button))
-        self.canny_button.clicked.connect(lambda: self.update_button_style(self.canny_button))
-        self.laplacian_button.clicked.connect(lambda: self.update_button_style(self.laplacian_button))
+            btn.clicked.connect(lambda _, b=btn: self.update_button_style(b))
+        # 悬停预览（在代理图上计算，移出按钮后恢复原结果）
+        self.hover_filter = HoverPreviewFilter(self.preview_hovered_op, self.controller.hover_leave)
+        self.hover_filter.watch(*self.edge_buttons)
         # 添加到布局（按钮间距均匀）
         self.edge_selector.addStretch()
-        self.edge_selector.addWidget(self.sobel_x_button)
-        self.edge_selector.addSpacing(15)
-        self.edge_selector.addWidget(self.sobel_y_button)
-        self.edge_selector.addSpacing(15)
-        self.edge_selector.addWidget(self.canny_button)
-        self.edge_selector.addSpacing(15)
-        self.edge_selector.addWidget(self.laplacian_button)
+        for index, btn in enumerate(self.edge_buttons):
+            if index:
+                self.edge_selector.addSpacing(10)
+            self.edge_selector.addWidget(btn)
+        self.edge_selector.addSpacing(10)
+        self.color_check = QCheckBox("彩色模式")
+        self.color_check.setToolTip("按RGB通道检测：Sobel/Laplacian输出彩色边缘图，Canny取幅值最大的通道")
+        self.color_check.setChecked(self.color_mode)
+        self.color_check.toggled.connect(self.update_color_mode)
+        self.edge_selector.addWidget(self.color_check)
         self.edge_selector.addStretch()
         self.image_layout.addLayout(self.edge_selector)
         self.image_layout.addSpacing(30)
@@ -127,7 +160,7 @@ class Tab5EdgeDetection:
             }
         """
 
-        # 1. Sobel参数组（水平+垂直共用）
+        # 1. Sobel参数组（水平/垂直/幅值/方向共用）
         self.sobel_param_group = QGroupBox("Sobel 参数")
         self.sobel_param_group.setFixedHeight(160)
         self.sobel_param_layout = QVBoxLayout(self.sobel_param_group)
@@ -149,7 +182,7 @@ class Tab5EdgeDetection:
 
         # 2. Canny参数组（低阈值+高阈值）
         self.canny_param_group = QGroupBox("Canny 参数")
-        self.canny_param_group.setFixedHeight(160)
+        self.canny_param_group.setFixedHeight(230)
         self.canny_param_layout = QVBoxLayout(self.canny_param_group)
         self.canny_param_layout.addStretch()
 
@@ -174,6 +207,22 @@ class Tab5EdgeDetection:
         self.canny_param_layout.addSpacing(10)
         self.canny_param_layout.addWidget(self.canny_high_label)
         self.canny_param_layout.addWidget(self.canny_high_slider)
+        # 增量计算开关 + 自动阈值（由局部极大值的梯度幅值直方图推荐）
+        self.canny_incremental_check = QCheckBox("增量计算（调阈值时不重新模糊和求导）")
+        self.canny_incremental_check.setChecked(self.canny_incremental)
+        self.canny_incremental_check.toggled.connect(self.update_canny_incremental)
+        self.canny_auto_layout = QHBoxLayout()
+        self.canny_auto_buttons = {}
+        for text, method in (("自动阈值（中值）", "median"), ("自动阈值（Otsu）", "otsu")):
+            btn = QPushButton(text)
+            self.main_window.set_button_style(btn)
+            btn.setMaximumWidth(180)
+            btn.clicked.connect(lambda _, m=method: self.suggest_canny_thresholds(m))
+            self.canny_auto_buttons[method] = btn
+            self.canny_auto_layout.addWidget(btn)
+        self.canny_param_layout.addSpacing(10)
+        self.canny_param_layout.addWidget(self.canny_incremental_check)
+        self.canny_param_layout.addLayout(self.canny_auto_layout)
         self.canny_param_group.setVisible(False)
 
         # 3. Laplacian参数组
@@ -193,6 +242,11 @@ class Tab5EdgeDetection:
         self.laplacian_param_layout.addWidget(self.laplacian_ksize_slider)
         self.laplacian_param_group.setVisible(False)
 
+        # 拖动期间在代理图上预览，松开后计算全分辨率结果
+        for slider in (self.sobel_ksize_slider, self.canny_low_slider, self.canny_high_slider,
+                       self.laplacian_ksize_slider):
+            self.controller.watch_slider(slider, self.apply_edge_detection)
+
         # 总参数布局（居中，分组间距均匀）
         self.param_layout.addStretch()
         self.param_layout.addWidget(self.sobel_param_group)
@@ -205,7 +259,7 @@ class Tab5EdgeDetection:
     def update_button_style(self, clicked_button):
         """更新按钮选中状态+显示对应参数组"""
         # 1. 恢复所有按钮默认样式
-        for btn in [self.sobel_x_button, self.sobel_y_button, self.canny_button, self.laplacian_button]:
+        for btn in self.edge_buttons:
             self.main_window.set_button_style(btn)
         # 2. 隐藏所有参数组
         self.sobel_param_group.setVisible(False)
@@ -245,108 +299,214 @@ class Tab5EdgeDetection:
     def update_sobel_param(self, value):
         """更新Sobel孔径大小（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.edge_result_label.setText("请先加载图片再调整参数！")
             return
         self.sobel_ksize = value
         self.sobel_ksize_label.setText(f"孔径大小：{self.sobel_ksize}x{self.sobel_ksize}（奇数）")
         if "Sobel" in self.selected_edge_op:
-            self.apply_edge_detection()
+            self.apply_edge_detection(preview=self.sobel_ksize_slider.isSliderDown())
 
     def update_canny_low_param(self, value):
         """更新Canny低阈值（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.edge_result_label.setText("请先加载图片再调整参数！")
             return
         self.canny_low_thresh = value
         self.canny_low_label.setText(f"低阈值：{self.canny_low_thresh}")
         if self.selected_edge_op == "Canny 边缘检测":
-            self.apply_edge_detection()
+            self.apply_edge_detection(preview=self.canny_low_slider.isSliderDown())
 
     def update_canny_high_param(self, value):
         """更新Canny高阈值（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.edge_result_label.setText("请先加载图片再调整参数！")
             return
         self.canny_high_thresh = value
         self.canny_high_label.setText(f"高阈值：{self.canny_high_thresh}")
+        if self.selected_edge_op == "Canny 边缘检测":
+            self.apply_edge_detection(preview=self.canny_high_slider.isSliderDown())
+
+    def update_canny_incremental(self, checked):
+        """切换Canny增量计算（两种方式结果相同，增量计算调阈值时更快）"""
+        self.canny_incremental = checked
+        if self.selected_edge_op == "Canny 边缘检测":
+            self.apply_edge_detection()
+
+    def update_color_mode(self, checked):
+        """切换彩色模式"""
+        self.color_mode = checked
+        if self.selected_edge_op is not None:
+            self.apply_edge_detection()
+
+    def suggest_canny_thresholds(self, method):
+        """自动阈值：后台由全分辨率导数（与检测共用缓存）统计幅值直方图，算好后设置两个滑块并重新检测"""
+        if not self.main_window.image_store.has_image():
+            self.edge_result_label.setText("请先加载图片再调整参数！")
+            return
+        image_key, source = self.image_source()
+        for btn in self.canny_auto_buttons.values():
+            btn.setEnabled(False)
+        self.threshold_runner.submit(
+            lambda: self.edge_engine.suggest_thresholds(image_key, source(), method),
+            self.set_canny_thresholds, self.show_threshold_error
+        )
+
+    def set_canny_thresholds(self, thresholds):
+        """设置自动阈值（限制在滑块范围内；同时改两个滑块，只触发一次检测）"""
+        for btn in self.canny_auto_buttons.values():
+            btn.setEnabled(True)
+        low, high = thresholds
+        for slider, value in ((self.canny_low_slider, low), (self.canny_high_slider, high)):
+            slider.blockSignals(True)
+            slider.setValue(max(slider.minimum(), min(value, slider.maximum())))
+            slider.blockSignals(False)
+        self.canny_low_thresh = self.canny_low_slider.value()
+        self.canny_high_thresh = self.canny_high_slider.value()
+        self.canny_low_label.setText(f"低阈值：{self.canny_low_thresh}")
+        self.canny_high_label.setText(f"高阈值：{self.canny_high_thresh}")
         if self.selected_edge_op == "Canny 边缘检测":
             self.apply_edge_detection()
 
+    def show_threshold_error(self, message):
+        """显示自动阈值出错信息"""
+        for btn in self.canny_auto_buttons.values():
+            btn.setEnabled(True)
+        self.edge_result_label.setText(f"自动阈值出错：{message}")
+
     def update_laplacian_param(self, value):
         """更新Laplacian孔径大小（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.edge_result_label.setText("请先加载图片再调整参数！")
             return
         self.laplacian_ksize = value
         self.laplacian_ksize_label.setText(f"孔径大小：{self.laplacian_ksize}x{self.laplacian_ksize}（奇数）")
         if self.selected_edge_op == "Laplacian 边缘":
-            self.apply_edge_detection()
+            self.apply_edge_detection(preview=self.laplacian_ksize_slider.isSliderDown())
 
     # -------------------------- 边缘检测核心逻辑（保留原有校验，优化提示） --------------------------
-    def apply_edge_detection(self):
-        """执行边缘检测（固定尺寸显示）"""
+    def apply_edge_detection(self, preview=False):
+        """执行边缘检测（固定尺寸显示）；preview=True时在代理图上预览"""
         # 保险措施：判断图片是否存在（核心校验，防止后续处理报错）
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.edge_result_label.setText("请先加载图片再执行检测！")
             return
+        if self.selected_edge_op is None:
+            return
+        task = self.build_edge_task(self.selected_edge_op, preview)
+        if preview:
+            self.controller.request_preview(task)
+        else:
+            self.controller.request_full(task)
 
-        try:
-            # 图像格式转换（PIL→OpenCV灰度图）
-            cv_image = cv2.cvtColor(np.array(self.main_window.image), cv2.COLOR_RGB2BGR)
-            gray_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
-            # 高斯模糊降噪（所有算法共用，提升检测效果）
-            blur_image = cv2.GaussianBlur(gray_image, (3, 3), 0)
-
-            # 按选中算法执行检测
-            if self.selected_edge_op == "Sobel 水平边缘":
-                edge = cv2.Sobel(blur_image, cv2.CV_64F, dx=1, dy=0, ksize=self.sobel_ksize)
-            elif self.selected_edge_op == "Sobel 垂直边缘":
-                edge = cv2.Sobel(blur_image, cv2.CV_64F, dx=0, dy=1, ksize=self.sobel_ksize)
-            elif self.selected_edge_op == "Canny 边缘检测":
-                edge = cv2.Canny(blur_image, self.canny_low_thresh, self.canny_high_thresh)
-            elif self.selected_edge_op == "Laplacian 边缘":
-                edge = cv2.Laplacian(blur_image, cv2.CV_64F, ksize=self.laplacian_ksize)
-
-            # 处理Sobel/Laplacian的负值（转为uint8）
-            if "Sobel" in self.selected_edge_op or "Laplacian" in self.selected_edge_op:
-                edge = cv2.convertScaleAbs(edge)  # 取绝对值并转为8位
-
-            # 格式转回QImage并固定尺寸显示
-            from PIL import Image
-            pil_result = Image.fromarray(edge)
-            q_image = self.main_window.pil_to_qimage(pil_result)
-            self.edge_result_label.setPixmap(
-                QPixmap.fromImage(q_image).scaled(
-                    self.IMAGE_DISPLAY_SIZE[0], self.IMAGE_DISPLAY_SIZE[1],
-                    Qt.KeepAspectRatio, Qt.SmoothTransformation
-                )
+    def build_edge_task(self, op_text, preview):
+        """生成计算函数（在工作线程执行，返回按固定尺寸缩放的QImage）"""
+        # 在界面线程取好参数，工作线程只做计算
+        image_store = self.main_window.image_store
+        preview_w, preview_h = self.main_window.preview_size
+        op = self.edge_op(op_text)
+        params = self.edge_params()
+        source = "rgb" if self.color_mode else "gray"
+        full_task = None if preview else self.build_result_task(op, params)
+
+        def compute():
+            # 预览时取灰度/RGB代理图并换算孔径，按选中算法执行检测（含高斯模糊降噪）；否则取全分辨率结果
+            if preview:
+                image, scale = image_store.proxy(source, preview_w, preview_h)
+                op_params = operations.scale_params_for_proxy("edge", params, scale)
+                edge = self.preview_engine.run((image_store.version, image.shape), image, op, **op_params)
+            else:
+                edge = full_task()
+            # 直接包装成QImage（梯度方向和彩色模式为RGB，其余为单通道）并按固定尺寸平滑缩放
+            return self.main_window.scaled_qimage(
+                edge, self.IMAGE_DISPLAY_SIZE[0], self.IMAGE_DISPLAY_SIZE[1], smooth=True
             )
 
-        except Exception as e:
-            self.edge_result_label.setText(f"检测出错：{str(e)}")
+        return compute
+
+    def edge_op(self, op_text):
+        """按钮文字对应的算法（Canny开启增量计算时用canny_inc）"""
+        op = self.EDGE_OPS[op_text]
+        return "canny_inc" if op == "canny" and self.canny_incremental else op
+
+    def edge_params(self):
+        """当前的检测参数（从界面取值）"""
+        return dict(
+            sobel_ksize=self.sobel_ksize,
+            canny_low=self.canny_low_thresh,
+            canny_high=self.canny_high_thresh,
+            laplacian_ksize=self.laplacian_ksize,
+        )
+
+    def image_source(self):
+        """全分辨率输入：（edge_engine的图像标识, 取图函数），彩色模式取RGB图，否则取灰度图"""
+        image_store = self.main_window.image_store
+        if self.color_mode:
+            return (image_store.version, "rgb"), image_store.rgb
+        return (image_store.version, "gray"), image_store.gray
+
+    def build_result_task(self, op, params):
+        """生成全分辨率计算函数（返回结果数组；同一图像和参数只算一次，显示和导出共用）"""
+        image_key, source = self.image_source()
+        key = image_key + (op, tuple(sorted(params.items())))
+        # 缓存的灰度图/RGB图；模糊和求导分块并行，结果与整图计算一致，导数由edge_engine缓存
+        return self.result_cache.task(key, lambda: self.edge_engine.run(image_key, source(), op, **params))
+
+    def export_task(self):
+        """导出用的全分辨率结果函数（可在工作线程执行），尚未选择检测算法时返回None"""
+        if not self.main_window.image_store.has_image() or self.selected_edge_op is None:
+            return None
+        return self.build_result_task(self.edge_op(self.selected_edge_op), self.edge_params())
+
+    def preview_hovered_op(self, button):
+        """悬停在未选中的检测按钮上：用代理图预览该算法效果"""
+        if not self.main_window.image_store.has_image() or button.text() == self.selected_edge_op:
+            return
+        self.controller.hover_enter(button, self.build_edge_task(button.text(), preview=True))
+
+    def show_edge_result(self, q_image):
+        """显示检测结果（界面线程）"""
+        if q_image is None:
+            self.edge_result_label.setText("边缘检测结果会显示在这里")
+            return
+        self.edge_result_label.setPixmap(QPixmap.fromImage(q_image))
+
+    def show_edge_error(self, message):
+        """显示检测出错信息"""
+        self.edge_result_label.setText(f"检测出错：{message}")
 
     def sync_original_image(self):
         """同步主窗口原始图到Tab5（固定尺寸）"""
+        self.controller.invalidate()  # 旧图片的在途结果不再显示
+        self.threshold_runner.invalidate()
+        for btn in self.canny_auto_buttons.values():
+            btn.setEnabled(True)
+        self.result_cache.clear()     # 旧图片的全分辨率结果不再需要
+        self.edge_engine.clear()      # 旧图片的模糊图和导数同理
+        self.preview_engine.clear()
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.original_image_label_t5.setText("请先加载图片！")
             return
-        q_image = self.main_window.pil_to_qimage(self.main_window.image)
-        self.original_image_label_t5.setPixmap(
-            QPixmap.fromImage(q_image).scaled(
-                self.IMAGE_DISPLAY_SIZE[0], self.IMAGE_DISPLAY_SIZE[1],
-                Qt.KeepAspectRatio, Qt.SmoothTransformation
+        self.show_original_image()
+
+    def show_original_image(self):
+        """显示原始图（取金字塔中最近的一层，固定尺寸平滑缩放）"""
+        w, h = self.IMAGE_DISPLAY_SIZE
+        with stage_profiler.run("边缘检测 原始图"):
+            q_image = self.main_window.scaled_qimage(
+                self.main_window.image_store.display_level(w, h), w, h, smooth=True
             )
-        )
+            with stage_profiler.stage("display"):
+                self.original_image_label_t5.setPixmap(QPixmap.fromImage(q_image))
 
     def update_sobel_param_with_fix(self, value):
         """修正滑块值，确保只能取3、5、7（步长2的奇数）（新增图片校验）"""
         # 保险措施：判断图片是否存在
-        if not self.main_window.image:
+        if not self.main_window.image_store.has_image():
             self.edge_result_label.setText("请先加载图片再调整参数！")
             return
         # 1. 计算最近的符合步长的数值（以3为起点，步长2）
@@ -366,7 +526,7 @@ class Tab5EdgeDetection:
         self.sobel_ksize = fixed_value
         self.sobel_ksize_label.setText(f"孔径大小：{self.sobel_ksize}x{self.sobel_ksize}（奇数）")
         if "Sobel" in self.selected_edge_op:
-            self.apply_edge_detection()
+            self.apply_edge_detection(preview=self.sobel_ksize_slider.isSliderDown())
 
     def get_layout(self):
         """返回Tab5布局（供主窗口调用）"""
@@ -0,0 +1,233 @@
+from PyQt5.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QLineEdit,
+                             QListWidget)
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt
+import operations
+from pipeline import Pipeline, PipelineStep, parse_params
+from task_runner import TaskRunner, LatestWinsScheduler
+from timing import stage_profiler
+
+class Tab6Pipeline:
+    # 操作名 → 下拉框显示文字（与各Tab按钮一致）
+    OP_LABELS = {
+        "mean": "均值滤波", "gaussian": "高斯滤波", "sharpen": "锐化滤波",
+        "median": "中值滤波", "bilateral": "双边滤波",
+        "lpf": "高斯低通滤波", "hpf": "高斯高通滤波", "band_reject": "带阻滤波",
+        "erode": "腐蚀", "dilate": "膨胀", "open": "开运算", "close": "闭运算",
+        "gradient": "形态学梯度", "tophat": "顶帽", "blackhat": "黑帽", "open_rec": "重建开运算",
+        "sobel_x": "Sobel 水平边缘", "sobel_y": "Sobel 垂直边缘",
+        "sobel_mag": "Sobel 梯度幅值", "sobel_dir": "Sobel 梯度方向",
+        "canny": "Canny 边缘检测", "canny_inc": "Canny 边缘检测（增量）", "laplacian": "Laplacian 边缘",
+    }
+
+    def __init__(self, main_window):
+        self.main_window = main_window  # 关联主窗口
+        self.pipeline = Pipeline()      # 步骤列表 + 中间结果缓存
+        self.task_runner = TaskRunner() # 后台计算（只显示最新一次的结果）
+        # 参数变化合并调度（连续编辑时只计算最新的流水线）
+        self.scheduler = LatestWinsScheduler(self.task_runner, self.main_window.update_interval_ms)
+        self.init_ui()                  # 构建Tab6界面
+
+    def init_ui(self):
+        """构建Tab6布局（原始图 + 步骤编辑区 + 最终结果图）"""
+        self.layout = QVBoxLayout()
+        self.image_layout = QHBoxLayout()
+        # 原始图显示标签
+        self.original_image_label_t6 = QLabel()
+        self.original_image_label_t6.setText("原始图片会显示在这里")
+        self.original_image_label_t6.setAlignment(Qt.AlignCenter)
+        self.original_image_label_t6.setStyleSheet("border: 2px solid #B0B0B0; padding: 5px;")
+        # 步骤编辑区
+        self.editor_layout = QVBoxLayout()
+        self.create_step_editor()
+        # 流水线结果显示标签
+        self.pipeline_result_label = QLabel()
+        self.pipeline_result_label.setText("流水线结果会显示在这里")
+        self.pipeline_result_label.setAlignment(Qt.AlignCenter)
+        self.pipeline_result_label.setStyleSheet(self.original_image_label_t6.styleSheet())
+        # 组装布局
+        self.image_layout.addWidget(self.original_image_label_t6)
+        self.image_layout.addLayout(self.editor_layout)
+        self.image_layout.addWidget(self.pipeline_result_label)
+        self.layout.addLayout(self.image_layout)
+        # 后台计算提示
+        self.busy_label = self.main_window.create_busy_label()
+        self.task_runner.busy_changed.connect(self.busy_label.setVisible)
+        self.layout.addWidget(self.busy_label)
+
+    def create_step_editor(self):
+        """创建步骤列表和编辑控件"""
+        # 操作选择 + 参数输入
+        self.op_combo = QComboBox()
+        for op in operations.OPERATIONS:
+            self.op_combo.addItem(self.OP_LABELS.get(op, op), op)
+        self.params_edit = QLineEdit()
+        self.params_edit.setPlaceholderText("参数，如 radius=3 或 canny_low=40,canny_high=120（可留空）")
+        # 步骤列表
+        self.step_list = QListWidget()
+        self.step_list.setMaximumWidth(320)
+        self.step_list.currentRowChanged.connect(self.load_selected_step)
+        # 操作按钮
+        self.add_button = QPushButton("添加步骤")
+        self.update_button = QPushButton("更新参数")
+        self.remove_button = QPushButton("删除步骤")
+        self.up_button = QPushButton("上移")
+        self.down_button = QPushButton("下移")
+        for button in (self.add_button, self.update_button, self.remove_button, self.up_button, self.down_button):
+            self.main_window.set_button_style(button)
+        self.add_button.clicked.connect(self.add_step)
+        self.update_button.clicked.connect(self.update_step)
+        self.remove_button.clicked.connect(self.remove_step)
+        self.up_button.clicked.connect(lambda: self.move_step(-1))
+        self.down_button.clicked.connect(lambda: self.move_step(1))
+        # 运行状态（本次重算了哪些步骤）
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("font-size: 13px; color: #555555;")
+        # 添加到布局
+        self.editor_layout.addStretch()
+        self.editor_layout.addWidget(QLabel("操作"))
+        self.editor_layout.addWidget(self.op_combo)
+        self.editor_layout.addWidget(self.params_edit)
+        self.editor_layout.addWidget(self.add_button)
+        self.editor_layout.addWidget(self.update_button)
+        self.editor_layout.addWidget(QLabel("步骤（按顺序执行）"))
+        self.editor_layout.addWidget(self.step_list)
+        move_layout = QHBoxLayout()
+        move_layout.addWidget(self.up_button)
+        move_layout.addWidget(self.down_button)
+        self.editor_layout.addLayout(move_layout)
+        self.editor_layout.addWidget(self.remove_button)
+        self.editor_layout.addWidget(self.status_label)
+        self.editor_layout.addStretch()
+
+    # -------------------------- 编辑步骤 --------------------------
+    def read_editor(self):
+        """读取编辑区的操作和参数，参数格式错误时返回None并提示"""
+        try:
+            params = parse_params(self.params_edit.text())
+        except ValueError as e:
+            self.status_label.setText(str(e))
+            return None
+        return self.op_combo.currentData(), params
+
+    def add_step(self):
+        """在末尾追加步骤"""
+        edited = self.read_editor()
+        if edited is None:
+            return
+        op, params = edited
+        self.pipeline.add_step(op, **params)
+        self.refresh_step_list(len(self.pipeline.steps) - 1)
+        self.run_pipeline()
+
+    def update_step(self):
+        """把编辑区的操作和参数写回选中的步骤（其上游步骤的结果直接复用缓存）"""
+        row = self.step_list.currentRow()
+        edited = self.read_editor()
+        if row < 0 or edited is None:
+            return
+        op, params = edited
+        self.pipeline.steps[row] = PipelineStep(op, **params)
+        self.refresh_step_list(row)
+        self.run_pipeline()
+
+    def remove_step(self):
+        """删除选中的步骤"""
+        row = self.step_list.currentRow()
+        if row < 0:
+            return
+        self.pipeline.remove_step(row)
+        self.refresh_step_list(min(row, len(self.pipeline.steps) - 1))
+        self.run_pipeline()
+
+    def move_step(self, offset):
+        """上移/下移选中的步骤"""
+        row = self.step_list.currentRow()
+        new_row = row + offset
+        if row < 0 or not 0 <= new_row < len(self.pipeline.steps):
+            return
+        self.pipeline.move_step(row, new_row)
+        self.refresh_step_list(new_row)
+        self.run_pipeline()
+
+    def refresh_step_list(self, select_row=-1):
+        """按流水线内容刷新步骤列表"""
+        self.step_list.blockSignals(True)
+        self.step_list.clear()
+        for index, step in enumerate(self.pipeline.steps):
+            self.step_list.addItem(f"{index + 1}. {self.OP_LABELS.get(step.op, step.op)}  {step.describe()}")
+        self.step_list.setCurrentRow(select_row)
+        self.step_list.blockSignals(False)
+
+    def load_selected_step(self, row):
+        """选中步骤时，把它的操作和参数填入编辑区"""
+        if row < 0 or row >= len(self.pipeline.steps):
+            return
+        step = self.pipeline.steps[row]
+        self.op_combo.setCurrentIndex(self.op_combo.findData(step.op))
+        self.params_edit.setText(",".join(f"{k}={v}" for k, v in sorted(step.params.items())))
+
+    # -------------------------- 执行 --------------------------
+    def run_pipeline(self):
+        """后台执行流水线（未变化的前缀步骤命中缓存）"""
+        if not self.main_window.image_store.has_image():
+            self.pipeline_result_label.setText("请先加载图片！")
+            return
+        if not self.pipeline.steps:
+            self.pipeline_result_label.setText("流水线结果会显示在这里")
+            self.status_label.setText("")
+            return
+        # 在界面线程取好步骤快照，工作线程只做计算
+        steps = list(self.pipeline.steps)
+        image_store = self.main_window.image_store
+        source_hash = f"image-v{image_store.version}"  # 图像版本号代替对原图做内容哈希
+
+        def compute():
+            with stage_profiler.run("流水线"):
+                outputs = self.pipeline.run(image_store.rgb(), source_hash, steps)
+                computed = list(self.pipeline.last_computed)
+                q_image = self.main_window.scaled_qimage(outputs[-1], 800, 600)
+            return q_image, computed, len(steps)
+
+        self.scheduler.request(compute, self.show_pipeline_result, self.show_pipeline_error)
+
+    def export_task(self):
+        """导出用的全分辨率结果函数（可在工作线程执行；未变化的步骤直接命中缓存），没有步骤时返回None"""
+        if not self.main_window.image_store.has_image() or not self.pipeline.steps:
+            return None
+        steps = list(self.pipeline.steps)
+        image_store = self.main_window.image_store
+        source_hash = f"image-v{image_store.version}"
+        return lambda: self.pipeline.run(image_store.rgb(), source_hash, steps)[-1]
+
+    def show_pipeline_result(self, result):
+        """显示最终结果和本次重算的步骤（界面线程）"""
+        q_image, computed, total = result
+        self.pipeline_result_label.setPixmap(QPixmap.fromImage(q_image))
+        if not computed:
+            self.status_label.setText(f"共{total}步，全部命中缓存")
+        else:
+            self.status_label.setText(f"共{total}步，重算第{computed[0] + 1}~{computed[-1] + 1}步，其余命中缓存")
+
+    def show_pipeline_error(self, message):
+        """显示流水线出错信息"""
+        self.pipeline_result_label.setText(f"流水线出错：{message}")
+
+    def sync_original_image(self):
+        """同步主窗口的原始图到Tab6，并对新图重新执行流水线"""
+        self.task_runner.invalidate()  # 旧图片的在途结果不再显示
+        self.pipeline.clear_cache()    # 旧图片的中间结果不再需要
+        if self.main_window.image_store.has_image():
+            self.show_original_image()
+            self.run_pipeline()
+
+    def show_original_image(self):
+        """显示原始图（取金字塔中最近的一层缩放，不缩放整幅原图）"""
+        with stage_profiler.run("流水线 原始图"):
+            q_image = self.main_window.scaled_qimage(self.main_window.image_store.display_level(800, 600), 800, 600)
+            with stage_profiler.stage("display"):
+                self.original_image_label_t6.setPixmap(QPixmap.fromImage(q_image))
+
+    def get_layout(self):
+        """返回Tab6布局（供主窗口调用）"""
+        return self.layout
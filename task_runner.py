@@ -0,0 +1,133 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, QElapsedTimer, pyqtSignal
+
+
+class _TaskSignals(QObject):
+    """后台任务完成信号（跨线程，自动排队回到界面线程）"""
+    finished = pyqtSignal(int, object)  # (任务编号, 计算结果)
+    failed = pyqtSignal(int, str)       # (任务编号, 错误信息)
+
+
+class _Task(QRunnable):
+    """在线程池中执行的计算任务（只做计算，不碰任何界面控件）"""
+
+    def __init__(self, token, func):
+        super().__init__()
+        self.token = token
+        self.func = func
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            result = self.func()
+        except Exception as e:
+            self.signals.failed.emit(self.token, str(e))
+            return
+        self.signals.finished.emit(self.token, result)
+
+
+class TaskRunner(QObject):
+    """后台计算执行器（每个Tab一个）
+
+    计算放到线程池里跑，结果通过信号回到界面线程；
+    每次提交都会生成新的任务编号，只有最新一次提交的结果会被送回，旧结果直接丢弃。
+    """
+    busy_changed = pyqtSignal(bool)     # 是否有任务在执行（用于显示“处理中”提示）
+    idle = pyqtSignal()                 # 所有任务执行完毕
+
+    def __init__(self, pool=None, parent=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._latest_token = 0          # 最新提交的任务编号
+        self._running = {}              # {任务编号: (任务, 完成回调, 出错回调)}
+
+    @property
+    def busy(self):
+        """是否还有任务在执行"""
+        return bool(self._running)
+
+    def submit(self, func, on_done, on_error=None):
+        """提交后台任务，返回任务编号
+
+        func为无参可调用对象，在工作线程执行；on_done(结果)/on_error(错误信息)在界面线程执行
+        """
+        self._latest_token += 1
+        token = self._latest_token
+        task = _Task(token, func)
+        task.setAutoDelete(False)       # 任务对象由本类持有，信号对象才不会被提前回收
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        was_busy = self.busy
+        self._running[token] = (task, on_done, on_error)
+        if not was_busy:
+            self.busy_changed.emit(True)
+        self.pool.start(task)
+        return token
+
+    def invalidate(self):
+        """作废所有在途任务的结果（例如加载了新图片）"""
+        self._latest_token += 1
+
+    def _on_finished(self, token, result):
+        _, on_done, _ = self._finish(token)
+        if token == self._latest_token:
+            on_done(result)
+        self._emit_idle()
+
+    def _on_failed(self, token, message):
+        _, _, on_error = self._finish(token)
+        if token == self._latest_token and on_error is not None:
+            on_error(message)
+        self._emit_idle()
+
+    def _finish(self, token):
+        """任务结束：从在途列表移除"""
+        return self._running.pop(token)
+
+    def _emit_idle(self):
+        if not self.busy:
+            self.busy_changed.emit(False)
+            self.idle.emit()
+
+
+class LatestWinsScheduler(QObject):
+    """参数变化合并调度器（每个Tab一个，包在TaskRunner外面）
+
+    同一时间只让一个任务在算；计算期间到来的新请求只保留最新一次，被覆盖的请求直接丢弃。
+    两次提交之间至少间隔min_interval_ms毫秒，拖动滑块时的响应时间只取决于单次计算的耗时。
+    """
+
+    def __init__(self, runner, min_interval_ms=30, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.min_interval_ms = min_interval_ms  # 两次提交的最小间隔（毫秒）
+        self._pending = None                    # 等待提交的最新请求：(计算函数, 完成回调, 出错回调)
+        self._clock = QElapsedTimer()           # 距上次提交的时间
+        self._timer = QTimer(self)              # 未到最小间隔时延迟提交
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+        self.runner.idle.connect(self._flush)   # 上一个任务算完后立即提交排队中的最新请求
+
+    def request(self, func, on_done, on_error=None):
+        """请求一次计算（参数同TaskRunner.submit），会覆盖尚未提交的旧请求"""
+        self._pending = (func, on_done, on_error)
+        self._flush()
+
+    def cancel(self):
+        """丢弃尚未提交的请求"""
+        self._pending = None
+        self._timer.stop()
+
+    def _flush(self):
+        """条件满足时提交排队中的请求：有请求、没有在途任务、已过最小间隔"""
+        if self._pending is None or self.runner.busy:
+            return
+        if self._clock.isValid():
+            wait_ms = self.min_interval_ms - self._clock.elapsed()
+            if wait_ms > 0:
+                if not self._timer.isActive():
+                    self._timer.start(int(wait_ms))
+                return
+        func, on_done, on_error = self._pending
+        self._pending = None
+        self._clock.restart()
+        self.runner.submit(func, on_done, on_error)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 模块都在仓库根目录（不是包），测试直接按模块名导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 无显示环境下也能创建Qt对象
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
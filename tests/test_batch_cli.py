@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+from PIL import Image
+
+import batch_cli
+import operations
+from exporter import ExportOptions
+from pipeline import PipelineStep
+
+
+@pytest.fixture
+def rgba_input(tmp_path):
+    rng = np.random.default_rng(0)
+    array = rng.integers(0, 256, (40, 60, 4), dtype=np.uint8)
+    path = tmp_path / "input.png"
+    Image.fromarray(array, "RGBA").save(path)
+    return str(path), array
+
+
+def test_steps_match_apply_operation(tmp_path, rgba_input):
+    path, array = rgba_input
+    steps = [PipelineStep("gaussian", radius=2), PipelineStep("erode", kernel_size=5)]
+    target = str(tmp_path / "out.png")
+    batch_cli.process_one(path, target, steps)
+    expected = operations.apply_operation("erode", operations.apply_operation("gaussian", array, radius=2),
+                                          kernel_size=5)
+    assert np.array_equal(np.asarray(Image.open(target)), expected)
+
+
+def test_rgba_to_jpeg_drops_alpha(tmp_path, rgba_input):
+    path, array = rgba_input
+    target = str(tmp_path / "out.jpg")
+    batch_cli.process_one(path, target, [PipelineStep("gaussian", radius=1)], ExportOptions(jpeg_quality=100))
+    written = Image.open(target)
+    assert written.mode == "RGB" and written.size == (60, 40)
+    expected = operations.apply_operation("gaussian", array, radius=1)[:, :, :3].astype(int)
+    assert np.abs(np.asarray(written).astype(int) - expected).mean() < 8
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+import operations
+import tiling
+from edge_engine import EdgeEngine
+
+
+@pytest.fixture(scope="module")
+def image():
+    """有纹理的RGB图：靠近边界处也有强边缘（边界导数不同时滞后连接会传播到内部）"""
+    rng = np.random.default_rng(1)
+    base = cv2.resize(rng.integers(0, 256, (24, 32, 3), dtype=np.uint8), (320, 240), interpolation=cv2.INTER_NEAREST)
+    noise = rng.normal(0, 12, base.shape)
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("color", [False, True])
+@pytest.mark.parametrize("thresholds", [(50, 150), (20, 60), (100, 300)])
+def test_canny_inc_matches_cv2_canny(image, color, thresholds):
+    low, high = thresholds
+    source = image if color else operations.to_gray(image)
+    expected = cv2.Canny(cv2.GaussianBlur(source, (3, 3), 0), low, high)
+    result = operations.apply_operation("canny_inc", image, color=color, canny_low=low, canny_high=high)
+    assert np.count_nonzero(expected) > 1000
+    assert np.array_equal(result, expected)
+    for border in (result[0], result[-1], result[:, 0], result[:, -1]):
+        assert np.any(border)  # 边界行列上也有边缘，比较覆盖到边界
+
+
+@pytest.mark.parametrize("replicate", [False, True])
+def test_tiled_gradients_match_whole_image(image, replicate):
+    gray = operations.to_gray(image)
+    blurred = operations.edge_blur(gray)
+    for axis in (0, 1):
+        whole = operations.sobel_derivative(blurred, 3, axis, replicate)
+        tiled = tiling.tiled_apply(blurred, lambda tile: operations.sobel_derivative(tile, 3, axis, replicate), 1,
+                                   tile_size=64)
+        assert np.array_equal(tiled, whole)
+
+
+@pytest.mark.parametrize("ksize", [1, 3, 5, 7])
+def test_sobel_views_use_default_border(image, ksize):
+    # Sobel各视图（包括边界行列）与默认参数的cv2.Sobel相同，不受增量Canny的复制边界导数影响
+    gray = operations.to_gray(image)
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    depth = cv2.CV_16S if ksize <= 5 else cv2.CV_32F
+    engine = EdgeEngine()
+    engine.run((1, "gray"), gray, "canny_inc")
+    for op, dx, dy in (("sobel_x", 1, 0), ("sobel_y", 0, 1)):
+        expected = cv2.convertScaleAbs(cv2.Sobel(blurred, depth, dx, dy, ksize=ksize))
+        assert np.array_equal(operations.apply_operation(op, gray, sobel_ksize=ksize), expected)
+        assert np.array_equal(engine.run((1, "gray"), gray, op, sobel_ksize=ksize), expected)
+
+
+def test_edge_engine_canny_inc_matches_batch(image):
+    gray = operations.to_gray(image)
+    engine = EdgeEngine()
+    result = engine.run((1, "gray"), gray, "canny_inc", canny_low=30, canny_high=90)
+    assert np.array_equal(result, operations.apply_operation("canny", gray, canny_low=30, canny_high=90))
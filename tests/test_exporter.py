@@ -0,0 +1,57 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+from exporter import ExportBatch
+
+
+def collect(jobs, **kwargs):
+    """运行一批导出，等待全部回调，返回{路径: (错误信息, 是否已取消)}"""
+    results = {}
+    finished = threading.Event()
+
+    def on_job_done(path, error, cancelled):
+        results[path] = (error, cancelled)
+        if len(results) == len(jobs):
+            finished.set()
+
+    batch = ExportBatch(jobs, on_job_done=on_job_done, **kwargs)
+    return batch, results, finished
+
+
+def test_every_job_reports_once(tmp_path):
+    image = np.zeros((8, 8), np.uint8)
+
+    def broken():
+        raise ValueError("boom")
+
+    jobs = [(str(tmp_path / f"{i}.png"), lambda: image) for i in range(3)]
+    jobs.append((str(tmp_path / "bad.png"), broken))
+    _, results, finished = collect(jobs)
+    assert finished.wait(10)
+    assert sorted(results) == sorted(path for path, _ in jobs)
+    for path, _ in jobs[:3]:
+        assert results[path] == (None, False)
+        assert os.path.exists(path)
+    error, cancelled = results[jobs[3][0]]
+    assert "boom" in error and not cancelled
+
+
+def test_cancel_reports_pending_jobs(tmp_path):
+    release = threading.Event()
+
+    def blocking():
+        release.wait(10)
+        return np.zeros((8, 8), np.uint8)
+
+    jobs = [(str(tmp_path / f"{i}.png"), blocking) for i in range(4)]
+    batch, results, finished = collect(jobs, workers=1)
+    batch.cancel()
+    release.set()
+    assert finished.wait(10)
+    cancelled = [path for path, (_, was_cancelled) in results.items() if was_cancelled]
+    assert len(cancelled) >= 3
+    assert all(not os.path.exists(path) for path in cancelled)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+import operations
+from freq_masks import FrequencyMaskEngine, ccs_half_magnitude, half_to_display
+
+# 奇数/偶数边长的各种组合；(17, 19)会被零填充到最优DFT尺寸(18, 20)
+SIZES = [(15, 9), (16, 12), (9, 16), (14, 15), (17, 19)]
+FILTERS = [("lpf", {"cutoff": 3}), ("hpf", {"cutoff": 2}), ("band_reject", {"center_freq": 4, "bandwidth": 2})]
+
+
+def image(h, w, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (h, w), dtype=np.uint8)
+
+
+def reference_filter(gray, filter_type, cutoff=30, center_freq=50, bandwidth=10):
+    """参考实现：零填充 → 完整复数FFT → fftshift → 中心化掩膜（按定义逐点计算）→ 逆变换取幅度 → 归一化"""
+    h, w = gray.shape
+    new_h, new_w = cv2.getOptimalDFTSize(h), cv2.getOptimalDFTSize(w)
+    padded = np.zeros((new_h, new_w))
+    padded[:h, :w] = gray
+    u, v = np.meshgrid(np.arange(new_h), np.arange(new_w), indexing="ij")
+    distance = np.sqrt((u - new_h // 2) ** 2 + (v - new_w // 2) ** 2)
+    lpf = np.exp(-distance ** 2 / (2 * cutoff ** 2))
+    if filter_type == "lpf":
+        mask = lpf
+    elif filter_type == "hpf":
+        mask = 1 - lpf
+    else:
+        sigma2 = 2 * (bandwidth / 2) ** 2
+        mask = 1 - (np.exp(-(distance - center_freq) ** 2 / sigma2) - np.exp(-(distance + center_freq) ** 2 / sigma2))
+    spectrum = np.fft.fftshift(np.fft.fft2(padded)) * mask
+    result = np.abs(np.fft.ifft2(np.fft.ifftshift(spectrum)))
+    result = (result - result.min()) / (result.max() - result.min()) * 255
+    return result[:h, :w]
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("filter_type, params", FILTERS)
+@pytest.mark.parametrize("half", [True, False])
+def test_filter_matches_shifted_complex_path(size, filter_type, params, half):
+    gray = image(*size)
+    result, _ = operations.frequency_filter(gray, filter_type, half=half, mask_engine=FrequencyMaskEngine(), **params)
+    expected = reference_filter(gray, filter_type, **params)
+    assert result.shape == gray.shape
+    assert np.abs(result.astype(float) - expected).max() <= 1
+
+
+@pytest.mark.parametrize("size", SIZES[:4])
+def test_ccs_half_magnitude_matches_complex_dft(size):
+    gray = image(*size, seed=1)
+    h, w = size
+    full = np.abs(np.fft.fft2(gray.astype(float)))
+    half = ccs_half_magnitude(cv2.dft(np.float32(gray)))
+    np.testing.assert_allclose(half, full[:, :w // 2 + 1], rtol=1e-4, atol=1e-2)
+
+
+@pytest.mark.parametrize("size", SIZES[:4])
+def test_half_to_display_equals_shifted_full_magnitude(size):
+    gray = image(*size, seed=2)
+    h, w = size
+    shifted = np.fft.fftshift(np.abs(np.fft.fft2(gray.astype(float))))
+    half = ccs_half_magnitude(cv2.dft(np.float32(gray)))
+    # 显示尺寸等于频谱尺寸时，应逐点等于中心化的完整幅度谱
+    np.testing.assert_allclose(half_to_display(half, h, w, (w, h)), shifted, rtol=1e-4, atol=1e-2)
+    # 缩小显示时，等于对完整幅度谱按相同位置最近邻取样
+    dw, dh = max(1, w // 2), max(1, h // 3)
+    ys = ((np.arange(dh) + 0.5) * h / dh).astype(int)
+    xs = ((np.arange(dw) + 0.5) * w / dw).astype(int)
+    np.testing.assert_allclose(half_to_display(half, h, w, (dw, dh)), shifted[np.ix_(ys, xs)], rtol=1e-4, atol=1e-2)
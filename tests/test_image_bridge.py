@@ -0,0 +1,35 @@
+import gc
+import numpy as np
+import pytest
+
+pytest.importorskip("PyQt5")
+from image_bridge import ndarray_to_qimage, scaled_qimage
+
+
+def qimage_bytes(q_image):
+    """QImage的像素数据（去掉行尾对齐）"""
+    ptr = q_image.constBits()
+    ptr.setsize(q_image.byteCount())
+    rows = np.frombuffer(ptr, np.uint8).reshape(q_image.height(), q_image.bytesPerLine())
+    return rows[:, :q_image.width() * q_image.depth() // 8].copy()
+
+
+@pytest.mark.parametrize("shape", [(600, 800, 3), (600, 800), (500, 800, 3)])
+def test_scaled_to_same_size_outlives_array(shape):
+    """缩放到原尺寸（scaled()为浅拷贝）时，结果在原数组释放后仍然有效"""
+    array = np.random.default_rng(0).integers(0, 256, size=shape, dtype=np.uint8)
+    expected = array.reshape(shape[0], -1).copy()
+    scaled = scaled_qimage(ndarray_to_qimage(array), 800, 600)
+    assert (scaled.width(), scaled.height()) == (shape[1], shape[0])
+    del array
+    gc.collect()
+    # 占用刚释放的内存，读到已释放内存时结果会不同
+    filler = [np.full(shape, 7, np.uint8) for _ in range(4)]
+    assert np.array_equal(qimage_bytes(scaled), expected)
+    del filler
+
+
+def test_scaled_down_keeps_aspect_ratio():
+    array = np.zeros((1200, 1600, 3), np.uint8)
+    scaled = scaled_qimage(ndarray_to_qimage(array), 800, 800, smooth=True)
+    assert (scaled.width(), scaled.height()) == (800, 600)
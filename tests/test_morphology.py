@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+import operations
+import tiling
+
+
+@pytest.fixture(scope="module")
+def smooth():
+    """灰度变化剧烈的平滑图（八边形近似误差最大的情形）"""
+    rng = np.random.default_rng(0)
+    blurred = cv2.GaussianBlur(rng.integers(0, 256, (240, 320), dtype=np.uint8), (0, 0), 4)
+    return cv2.normalize(blurred, None, 0, 255, cv2.NORM_MINMAX)
+
+
+def exact(gray, shape, kernel_size, dilate):
+    kernel = operations.structuring_element(shape, kernel_size)
+    return cv2.dilate(gray, kernel) if dilate else cv2.erode(gray, kernel)
+
+
+@pytest.mark.parametrize("kernel_size", [31, 51, 101, 151])
+@pytest.mark.parametrize("dilate", [False, True])
+def test_grayscale_disk_bounded_by_exact_disks(smooth, kernel_size, dilate):
+    # 八边形包含半径r-1的圆盘、含于半径ceil(r/cos22.5°)+1的圆盘内，结果应夹在两者的精确结果之间（包括边界）
+    half = kernel_size // 2
+    outer = int(np.ceil(half / np.cos(np.pi / 8))) + 1
+    op = "dilate" if dilate else "erode"
+    fast = operations.morphology(smooth, op, kernel_size=kernel_size, shape="disk")
+    inner_result = exact(smooth, "disk", 2 * (half - 1) + 1, dilate)
+    outer_result = exact(smooth, "disk", 2 * outer + 1, dilate)
+    low, high = (inner_result, outer_result) if dilate else (outer_result, inner_result)
+    assert np.all(fast >= low) and np.all(fast <= high)
+    # 与精确圆盘的平均差异很小（最大差异出现在灰度变化剧烈处）
+    assert np.abs(fast.astype(int) - exact(smooth, "disk", kernel_size, dilate)).mean() < 2
+
+
+@pytest.mark.parametrize("kernel_size", [31, 101])
+def test_binary_disk_and_ellipse_exact(smooth, kernel_size):
+    binary = np.where(smooth > 128, 255, 0).astype(np.uint8)
+    for dilate in (False, True):
+        op = "dilate" if dilate else "erode"
+        assert np.array_equal(operations.morphology(binary, op, kernel_size=kernel_size, shape="disk"),
+                              exact(binary, "disk", kernel_size, dilate))
+        assert np.array_equal(operations.morphology(smooth, op, kernel_size=kernel_size, shape="ellipse"),
+                              exact(smooth, "ellipse", kernel_size, dilate))
+
+
+@pytest.mark.parametrize("name", ["erode", "dilate"])
+def test_tiled_disk_matches_whole_image(smooth, name):
+    params = {"kernel_size": 101, "shape": "disk"}
+    whole = operations.apply_operation(name, smooth, **params)
+    tiled = tiling.tiled_operation(name, smooth, tile_size=64, **params)
+    assert np.array_equal(tiled, whole)
+
+
+def brute_force_reconstruction(marker, mask):
+    """参考实现：反复3×3测地膨胀直到不再变化"""
+    kernel = np.ones((3, 3), np.uint8)
+    result = cv2.min(marker, mask)
+    while True:
+        grown = cv2.min(cv2.dilate(result, kernel), mask)
+        if np.array_equal(grown, result):
+            return result
+        result = grown
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_reconstruction_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    h, w = rng.integers(1, 48, 2)
+    mask = rng.integers(0, 256, (h, w), dtype=np.uint8)
+    if seed % 2:
+        mask = cv2.GaussianBlur(mask, (5, 5), 0)
+    if seed % 3:
+        marker = rng.integers(0, 256, (h, w), dtype=np.uint8)
+    else:
+        marker = cv2.erode(mask, np.ones((5, 5), np.uint8))
+    assert np.array_equal(operations.reconstruct_by_dilation(marker, mask), brute_force_reconstruction(marker, mask))
+
+
+def test_reconstruction_follows_long_paths():
+    # 蛇形通道：各行交替在左右两端相连，测地路径（约1000像素）远长于图像边长，扫描时需要反复换向
+    mask = np.zeros((64, 64), np.uint8)
+    mask[::4] = 200
+    for i, row in enumerate(range(0, 60, 4)):
+        mask[row:row + 5, 63 if i % 2 == 0 else 0] = 200
+    marker = np.zeros_like(mask)
+    marker[60, 0 if mask[59, 0] else 63] = 200
+    expected = brute_force_reconstruction(marker, mask)
+    assert np.count_nonzero(expected) == np.count_nonzero(mask)
+    assert np.array_equal(operations.reconstruct_by_dilation(marker, mask), expected)
+
+
+def test_open_rec_color_matches_per_channel(smooth):
+    rgb = np.dstack([smooth, smooth[::-1], 255 - smooth])
+    result = operations.morphology(rgb, "open_rec", kernel_size=9)
+    for channel in range(3):
+        assert np.array_equal(result[:, :, channel], operations.morphology(rgb[:, :, channel], "open_rec", kernel_size=9))
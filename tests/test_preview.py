@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+from PyQt5.QtWidgets import QApplication, QPushButton
+from preview import PreviewController
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def shown(app):
+    return []
+
+
+@pytest.fixture
+def controller(shown):
+    return PreviewController(shown.append, lambda message: shown.append(("error", message)))
+
+
+def deliver_full(controller, result):
+    """模拟全分辨率结果回到界面线程（后台任务的输出为（耗时记录, 结果））"""
+    controller._on_full((None, result))
+
+
+def deliver_preview(controller, result):
+    controller._on_preview((None, result))
+
+
+def test_full_result_during_hover_shown_after_leave_without_preview(controller, shown):
+    """悬停期间全分辨率结果到达、预览结果还没到就移出：恢复显示新的全分辨率结果"""
+    button = QPushButton()
+    deliver_full(controller, "old")
+    controller.hover_enter(button, lambda: "preview")
+    deliver_full(controller, "new")
+    assert shown == ["old"]
+    controller.hover_leave(button)
+    assert shown == ["old", "new"]
+
+
+def test_preview_replaced_by_full_result_after_leave(controller, shown):
+    button = QPushButton()
+    deliver_full(controller, "full")
+    controller.hover_enter(button, lambda: "preview")
+    deliver_preview(controller, "preview")
+    controller.hover_leave(button)
+    assert shown == ["full", "preview", "full"]
+
+
+def test_leave_without_changes_does_not_redraw(controller, shown):
+    button = QPushButton()
+    deliver_full(controller, "full")
+    controller.hover_enter(button, lambda: "preview")
+    controller.hover_leave(button)
+    assert shown == ["full"]
@@ -0,0 +1,93 @@
+import inspect
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import operations
+
+# 可分块执行的操作（Canny的滞后阈值连接、形态学重建是全图范围的，分块结果无法与整图一致，不在此列；
+# 梯度方向图的HSV→RGB转换在OpenCV的SIMD/标量路径之间有±1的差异，结果与块的位置有关，也不分块）
+TILEABLE_OPERATIONS = ("erode", "dilate", "open", "close", "gradient", "tophat", "blackhat",
+                       "sobel_x", "sobel_y", "sobel_mag", "laplacian")
+
+
+def _param(func, params, name):
+    """取参数值，未指定时取函数的默认值（与直接调用时一致）"""
+    if name in params:
+        return params[name]
+    return inspect.signature(func).parameters[name].default
+
+
+def operation_halo(name, params):
+    """分块时每块四周需要多取的像素数（操作的总影响半径），不可分块的操作返回None
+
+    形态学：k×k核（任意形状）半径为k//2（大核圆盘见operations.morphology_reach），开/闭运算（及顶帽/黑帽）是两次操作，半径翻倍；
+    边缘检测：3×3高斯模糊（半径1）+ Sobel/Laplacian（ksize=1时也是3×3核，半径至少为1）
+    """
+    if name not in TILEABLE_OPERATIONS:
+        return None
+    kind, op = operations.OPERATIONS[name]
+    if kind == "morphology":
+        radius = operations.morphology_reach(_param(operations.morphology, params, "shape"),
+                                             _param(operations.morphology, params, "kernel_size"))
+        return 2 * radius if op in ("open", "close", "tophat", "blackhat") else radius
+    key = "laplacian_ksize" if op == "laplacian" else "sobel_ksize"
+    ksize = _param(operations.edge_detection, params, key)
+    return 1 + max(1, ksize // 2)
+
+
+def tile_ranges(length, tile, halo):
+    """把一个轴切成若干块，返回[(核心起点, 核心终点, 含边框起点, 含边框终点)]"""
+    ranges = []
+    for start in range(0, length, tile):
+        stop = min(start + tile, length)
+        ranges.append((start, stop, max(0, start - halo), min(length, stop + halo)))
+    return ranges
+
+
+def tiled_apply(image, func, halo, tile_size=2048, workers=None):
+    """分块执行逐像素邻域操作并拼接结果，与整图直接执行逐位一致
+
+    每块四周多取halo个像素（图像边缘处不取），块内计算后只把核心区域写入输出；
+    func(块)须返回与输入块同尺寸的数组。各块在线程池中并行（OpenCV计算时释放GIL），
+    每块算完立即写入输出，临时内存只与块大小和线程数有关，与整图大小无关。
+    """
+    h, w = image.shape[:2]
+    if h <= tile_size and w <= tile_size:
+        return func(image)
+    tiles = [(r, c) for r in tile_ranges(h, tile_size, halo) for c in tile_ranges(w, tile_size, halo)]
+
+    def compute_core(tile):
+        (y0, y1, hy0, hy1), (x0, x1, hx0, hx1) = tile
+        result = func(image[hy0:hy1, hx0:hx1])
+        return result[y0 - hy0:y1 - hy0, x0 - hx0:x1 - hx0]
+
+    def write_tile(tile, core):
+        (y0, y1, _, _), (x0, x1, _, _) = tile
+        out[y0:y1, x0:x1] = core
+
+    # 第一块在当前线程计算，确定输出类型后再分配整图输出
+    first = compute_core(tiles[0])
+    out = np.empty((h, w) + first.shape[2:], dtype=first.dtype)
+    write_tile(tiles[0], first)
+    del first
+    # 其余块并行计算，各自写入不重叠的区域（不返回结果，算完的块立即释放）
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(lambda tile: write_tile(tile, compute_core(tile)), tiles[1:]):
+            pass
+    return out
+
+
+def tiled_operation(name, gray, tile_size=2048, workers=None, **params):
+    """按名称执行形态学/边缘检测操作：可分块的操作分块并行执行，其余直接整图执行"""
+    halo = operation_halo(name, params)
+    if halo is None:
+        return operations.apply_operation(name, gray, **params)
+    if operations.OPERATIONS[name][0] == "morphology" and params.get("shape") == "disk" \
+            and "binary" not in params:
+        # 是否为二值图决定圆盘的计算方法，须对整图判断一次，否则各块结果可能不一致
+        params = dict(params, binary=operations.is_binary(gray))
+    # 核心区域至少要比边框大，否则边框开销超过分块收益
+    tile_size = max(tile_size, 4 * halo)
+    return tiled_apply(gray, lambda tile: operations.apply_operation(name, tile, **params),
+                       halo, tile_size, workers)
@@ -0,0 +1,227 @@
+# 启动耗时统计 + 分阶段耗时统计（本模块应最先导入：导入时刻作为计时起点）
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    """启动耗时统计：记录各时间点距计时起点的毫秒数和各阶段耗时，首次绘制完成后输出报告
+
+    环境变量IMG_TOOL_STARTUP_REPORT控制输出：未设置时不输出；为1时打印到标准输出；
+    为文件路径时以JSON行的形式追加写入（便于持续跟踪启动时间）
+    """
+    ENV_VAR = "IMG_TOOL_STARTUP_REPORT"
+
+    def __init__(self, start=PROCESS_START):
+        self.start = start
+        self.marks = {}         # {时间点名称: 距起点毫秒数}
+        self.durations = {}     # {阶段名称: 耗时毫秒数}
+        self.reported = False
+        self._paint_watcher = None
+
+    def elapsed_ms(self):
+        """距计时起点的毫秒数"""
+        return (time.perf_counter() - self.start) * 1000
+
+    def mark(self, name):
+        """记录一个时间点（只记第一次）"""
+        self.marks.setdefault(name, round(self.elapsed_ms(), 1))
+
+    @contextmanager
+    def measure(self, name):
+        """统计一个阶段的耗时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = round((time.perf_counter() - begin) * 1000, 1)
+
+    def watch_first_paint(self, widget):
+        """窗口第一次绘制完成（回到事件循环）时记录first_paint并输出报告"""
+        from PyQt5.QtCore import QObject, QEvent, QTimer
+
+        timer = self
+
+        class _FirstPaintWatcher(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Paint:
+                    obj.removeEventFilter(self)
+                    # 绘制事件处理完、回到事件循环后才算画完
+                    QTimer.singleShot(0, timer._on_first_paint)
+                return False
+
+        self._paint_watcher = _FirstPaintWatcher(widget)
+        widget.installEventFilter(self._paint_watcher)
+
+    def _on_first_paint(self):
+        self.mark("first_paint")
+        self.report()
+
+    def summary(self):
+        """报告内容（dict）"""
+        return {"marks_ms": dict(self.marks), "durations_ms": dict(self.durations)}
+
+    def report(self):
+        """按环境变量设置输出报告（只输出一次）"""
+        if self.reported:
+            return
+        self.reported = True
+        target = os.environ.get(self.ENV_VAR)
+        if not target:
+            return
+        summary = self.summary()
+        if target == "1":
+            marks = "，".join(f"{name} {ms:.1f} ms" for name, ms in summary["marks_ms"].items())
+            print(f"启动耗时：{marks}", file=sys.stdout)
+            for name, ms in summary["durations_ms"].items():
+                print(f"  {name}: {ms:.1f} ms", file=sys.stdout)
+            return
+        try:
+            with open(target, "a", encoding="utf-8") as f:
+                f.write(json.dumps(dict(summary, timestamp=time.time()), ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"写入启动耗时报告失败: {str(e)}")
+
+
+class StageProfiler:
+    """分阶段耗时统计：一次操作（run）由若干阶段（stage）组成，记录各阶段耗时，可导出Chrome/Perfetto跟踪文件
+
+    run和stage都按线程记录，可在工作线程中使用；stage不在任何run中时只写入跟踪事件。
+    同一次操作跨线程时（工作线程计算 + 界面线程显示），把run返回的记录传回run(record=...)继续累计。
+    每次最外层run结束时回调监听者（在结束run的线程中调用）。
+    """
+    MAX_EVENTS = 50000      # 跟踪事件上限（超过后丢弃最早的事件）
+
+    def __init__(self, start=PROCESS_START):
+        self.start = start
+        self.enabled = True
+        self.events = deque(maxlen=self.MAX_EVENTS)  # Chrome跟踪格式的完整事件（ph="X"）
+        self.thread_names = {}      # {线程编号: 线程名称}
+        self.last_run = None        # 最近一次完成的操作记录
+        self._listeners = []
+        self._local = threading.local()
+
+    def add_listener(self, callback):
+        """注册回调callback(记录)，每次操作结束时调用"""
+        self._listeners.append(callback)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def run(self, name, record=None):
+        """统计一次完整操作，返回记录dict：{"name", "total_ms", "stages": {阶段: 毫秒}}
+
+        record为之前（可能在另一线程中）开始的同一次操作的记录时，本段耗时并入该记录
+        """
+        if not self.enabled:
+            yield record
+            return
+        if record is None:
+            record = {"name": name, "total_ms": 0.0, "stages": {}}
+        stack = self._stack()
+        stack.append({"record": record, "depth": 0})
+        begin = time.perf_counter()
+        try:
+            yield record
+        finally:
+            end = time.perf_counter()
+            stack.pop()
+            record["total_ms"] = round(record["total_ms"] + (end - begin) * 1000, 2)
+            self._add_event(name, "run", begin, end)
+            if stack:
+                # 嵌套的操作在外层操作中算作一个阶段
+                self._add_stage(stack[-1], name, (end - begin) * 1000)
+            else:
+                self._finish(record)
+
+    def add_run(self, name, begin, end):
+        """记录一次已经结束的操作（begin/end为time.perf_counter()的值）
+
+        用于跨越事件循环的异步操作（例如导出）：run()按线程嵌套统计，在界面线程中一直打开会把
+        期间处理的其他操作并进来，这类操作只记起止时间
+        """
+        if not self.enabled:
+            return
+        self._add_event(name, "run", begin, end)
+        self._finish({"name": name, "total_ms": round((end - begin) * 1000, 2), "stages": {}})
+
+    def _finish(self, record):
+        """一次操作结束：保存并回调监听者（回调拿到的是快照，记录之后还可能在其他线程继续累计）"""
+        snapshot = dict(record, stages=dict(record["stages"]))
+        self.last_run = snapshot
+        for callback in list(self._listeners):
+            callback(snapshot)
+
+    @contextmanager
+    def stage(self, name):
+        """统计一个阶段（可嵌套，操作记录中只汇总最外层的阶段，跟踪文件中保留完整层次）"""
+        if not self.enabled:
+            yield
+            return
+        stack = self._stack()
+        frame = stack[-1] if stack else None
+        if frame is not None:
+            frame["depth"] += 1
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._add_event(name, "stage", begin, end)
+            if frame is not None:
+                frame["depth"] -= 1
+                if frame["depth"] == 0:
+                    self._add_stage(frame, name, (end - begin) * 1000)
+
+    @staticmethod
+    def _add_stage(frame, name, ms):
+        stages = frame["record"]["stages"]
+        stages[name] = round(stages.get(name, 0.0) + ms, 2)
+
+    def _add_event(self, name, category, begin, end):
+        thread = threading.current_thread()
+        self.thread_names.setdefault(thread.ident, thread.name)
+        self.events.append({
+            "name": name, "cat": category, "ph": "X",
+            "ts": round((begin - self.start) * 1e6, 1), "dur": round((end - begin) * 1e6, 1),
+            "pid": os.getpid(), "tid": thread.ident,
+        })
+
+    @staticmethod
+    def format_run(record):
+        """一行文字描述（状态栏显示）：操作名 总耗时：各阶段耗时（从大到小），其余未细分的计入“其他”"""
+        stages = sorted(record["stages"].items(), key=lambda item: item[1], reverse=True)
+        other = record["total_ms"] - sum(ms for _, ms in stages)
+        parts = [f"{name} {ms:.1f}" for name, ms in stages]
+        if other >= 0.1:
+            parts.append(f"其他 {other:.1f}")
+        return f"{record['name']} {record['total_ms']:.1f} ms：" + " · ".join(parts)
+
+    def trace(self):
+        """Chrome/Perfetto跟踪格式（chrome://tracing 或 ui.perfetto.dev 打开）"""
+        pid = os.getpid()
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self.thread_names.items())
+        ]
+        return {"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"}
+
+    def dump_trace(self, path):
+        """把本次会话记录的全部事件写入跟踪文件"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.trace(), f, ensure_ascii=False)
+
+
+# 全局实例（main.py / main_window.py / 各Tab共用）
+startup_timer = StartupTimer()
+stage_profiler = StageProfiler()